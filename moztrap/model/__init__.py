@@ -2,25 +2,45 @@
 All models.
 
 """
+from django.core.signals import request_started, request_finished
 from django.db.models import ProtectedError, signals
 from django.dispatch import receiver
 
 from registration.models import RegistrationProfile
 
-from .mtmodel import ConcurrencyError
-from .core.models import MTModel, Product, ProductVersion, ApiKey
+from .mtmodel import ConcurrencyError, soft_delete_cascaded, bulk_cloned
+from .core.models import (
+    MTModel, Product, ProductVersion, ApiKey, Job, CacheGeneration)
 from .core.auth import User, Role, Permission
 from .environments.models import Environment, Profile, Element, Category
-from .execution.models import Run, RunSuite, RunCaseVersion, Result, StepResult
+from .execution.models import (
+    Run, RunSuite, RunCaseVersion, Result, StepResult, RunRollup,
+    LatestResult, ResultUpload)
 from .library.bulk import BulkParser
 from .library.models import (
-    Case, CaseVersion, CaseAttachment, CaseStep, Suite, SuiteCase)
+    Case, CaseVersion, CaseAttachment, CaseStep, Suite, SuiteCase,
+    SearchToken)
 from .tags.models import Tag
 
 # version of the REST endpoint APIs for TastyPie
 API_VERSION = "v1"
 
 
+# fields the choices of a ModelFilter of each model are labeled, ordered or
+# selected by; saving only other fields (e.g. User.last_login on each login)
+# leaves the choices as they were
+CHOICE_FIELDS = {
+    Tag: {"name"},
+    User: {"username"},
+    Role: {"name"},
+    Element: {"name"},
+    Suite: {"name"},
+    Run: {"name", "is_series"},
+    Product: {"name"},
+    ProductVersion: {"product", "version", "order"},
+    }
+
+
 @receiver(signals.post_save, sender=Tag)
 @receiver(signals.post_save, sender=User)
 @receiver(signals.post_save, sender=Role)
@@ -29,11 +49,92 @@ API_VERSION = "v1"
 @receiver(signals.post_save, sender=Run)
 @receiver(signals.post_save, sender=Product)
 @receiver(signals.post_save, sender=ProductVersion)
-def invalidate_model_choices(sender, instance, **kwargs):
+@receiver(signals.post_delete, sender=Tag)
+@receiver(signals.post_delete, sender=User)
+@receiver(signals.post_delete, sender=Role)
+@receiver(signals.post_delete, sender=Element)
+@receiver(signals.post_delete, sender=Suite)
+@receiver(signals.post_delete, sender=Run)
+@receiver(signals.post_delete, sender=Product)
+@receiver(signals.post_delete, sender=ProductVersion)
+@receiver(soft_delete_cascaded, sender=Tag)
+@receiver(soft_delete_cascaded, sender=User)
+@receiver(soft_delete_cascaded, sender=Role)
+@receiver(soft_delete_cascaded, sender=Element)
+@receiver(soft_delete_cascaded, sender=Suite)
+@receiver(soft_delete_cascaded, sender=Run)
+@receiver(soft_delete_cascaded, sender=Product)
+@receiver(soft_delete_cascaded, sender=ProductVersion)
+def invalidate_model_choices(sender, **kwargs):
     """This makes sure that the model choices for forms related to these
     are invalidated when changes are made.
 
-    The place where the caching is set is in
-    moztrap.view.lists.filters.ModelFilter
+    The choices are cached in each process by
+    moztrap.view.lists.filters.ModelFilter, until the model's generation
+    is bumped.
     """
-    MTModel.delete_modelfilter_choices_cache(sender)
+    update_fields = kwargs.get("update_fields")
+    if update_fields is not None and not (
+            CHOICE_FIELDS[sender].union(["deleted_on"]) & set(update_fields)):
+        return
+    CacheGeneration.bump(sender)
+
+
+
+@receiver(request_started)
+def defer_cache_generation_bumps(sender, **kwargs):
+    """Write generation bumps only once the request's work is committed."""
+    CacheGeneration.defer_bumps()
+
+
+
+@receiver(request_finished)
+def flush_cache_generation_bumps(sender, **kwargs):
+    """Write the generation bumps made during the request."""
+    CacheGeneration.flush_bumps()
+
+
+
+@receiver(soft_delete_cascaded, sender=RunCaseVersion)
+@receiver(soft_delete_cascaded, sender=Result)
+def invalidate_run_rollups(sender, queryset, **kwargs):
+    """Drop rollups for runs whose results/runcaseversions were (un)deleted.
+
+    The rollups are rebuilt the next time they are needed; see
+    moztrap.model.execution.models.RunRollup
+
+    """
+    if sender is Result:
+        runs = queryset.values("runcaseversion__run")
+    else:
+        runs = queryset.values("run")
+    RunRollup.invalidate(runs)
+
+
+
+@receiver(signals.post_save, sender=CaseVersion)
+@receiver(signals.post_save, sender=CaseStep)
+def update_search_tokens(sender, instance, raw=False, **kwargs):
+    """Rebuild the search tokens for the saved caseversion or step's text.
+
+    The tokens are used by keyword filters; see
+    moztrap.model.library.models.SearchToken
+
+    """
+    if raw:
+        return
+    if sender is CaseVersion:
+        SearchToken.index(
+            [instance.id], SearchToken.CASEVERSION_FIELDS)
+    else:
+        SearchToken.index(
+            [instance.caseversion_id], SearchToken.STEP_FIELDS)
+
+
+
+@receiver(bulk_cloned, sender=CaseStep)
+def index_cloned_steps(sender, queryset, **kwargs):
+    """Build the search tokens for the text of bulk-cloned steps."""
+    SearchToken.index(
+        queryset.values_list("caseversion", flat=True).distinct(),
+        SearchToken.STEP_FIELDS)
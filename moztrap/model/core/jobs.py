@@ -0,0 +1,128 @@
+"""
+A simple database-backed background job queue.
+
+Jobs are opt-in: when ``settings.ASYNC_JOBS`` is False (the default),
+``enqueue`` runs the task immediately instead of queueing it. Otherwise a
+``Job`` row is created, to be claimed and run by ``manage.py run_jobs``;
+no external broker is needed.
+
+A task is any module-level function taking JSON-serializable arguments.
+
+A job left running for longer than ``settings.JOB_TIMEOUT`` seconds (e.g.
+because its worker died) is queued again by the next ``claim``.
+
+"""
+import datetime
+import json
+import traceback
+
+from django.conf import settings
+from django.utils.module_loading import import_by_path
+
+from ..mtmodel import utcnow
+from .models import Job
+
+
+
+def is_async():
+    """Return True if tasks should be queued rather than run immediately."""
+    return getattr(settings, "ASYNC_JOBS", False)
+
+
+
+def task_name(func):
+    """Return the dotted path by which ``func`` is stored in a job."""
+    return "{0}.{1}".format(func.__module__, func.__name__)
+
+
+
+def enqueue(func, *args, **kwargs):
+    """
+    Queue a job to call ``func(*args)``; return the ``Job``.
+
+    If an identical job is already waiting or running, it is returned instead
+    of queueing another. If jobs aren't asynchronous, ``func`` is called now and
+    None is returned.
+
+    """
+    user = kwargs.pop("user", None)
+    if not is_async():
+        func(*args)
+        return None
+
+    name = task_name(func)
+    args = json.dumps(args)
+    try:
+        return Job.objects.filter(
+            task=name,
+            args=args,
+            status__in=[Job.STATUS.queued, Job.STATUS.running],
+            )[0]
+    except IndexError:
+        return Job.objects.create(task=name, args=args, user=user)
+
+
+
+def is_queued(func, *args):
+    """Return True if a job to call ``func(*args)`` is waiting to be run."""
+    return Job.objects.filter(
+        task=task_name(func),
+        args=json.dumps(args),
+        status=Job.STATUS.queued,
+        ).exists()
+
+
+
+def requeue_stale():
+    """Queue again any jobs running for longer than ``JOB_TIMEOUT``."""
+    timeout = getattr(settings, "JOB_TIMEOUT", 3600)
+    cutoff = utcnow() - datetime.timedelta(seconds=timeout)
+    return Job.objects.filter(
+        status=Job.STATUS.running, started_on__lt=cutoff).update(
+            status=Job.STATUS.queued, started_on=None)
+
+
+
+def claim():
+    """
+    Mark the oldest queued job as running, and return it.
+
+    Safe against other workers claiming the same job; returns None if there
+    are no queued jobs. Stale running jobs are queued again first.
+
+    """
+    requeue_stale()
+    while True:
+        queued = list(
+            Job.objects.filter(status=Job.STATUS.queued).order_by(
+                "id").values_list("id", flat=True)[:1])
+        if not queued:
+            return None
+        claimed = Job.objects.filter(
+            pk=queued[0], status=Job.STATUS.queued).update(
+                status=Job.STATUS.running, started_on=utcnow())
+        if claimed:
+            return Job.objects.get(pk=queued[0])
+
+
+
+def run(job_id):
+    """
+    Run the claimed job with id ``job_id``, recording its outcome.
+
+    Returns True if the job succeeded.
+
+    """
+    job = Job.objects.get(pk=job_id)
+    try:
+        import_by_path(job.task)(*json.loads(job.args))
+    except Exception:
+        Job.objects.filter(pk=job_id).update(
+            status=Job.STATUS.failed,
+            error=traceback.format_exc(),
+            finished_on=utcnow(),
+            )
+        return False
+    Job.objects.filter(pk=job_id).update(
+        status=Job.STATUS.done, finished_on=utcnow())
+    return True
@@ -0,0 +1,86 @@
+"""
+Management command to archive (or restore) the results of disabled runs.
+
+Archived results are moved out of the live tables to a compressed file per
+run; the runs' rollups are kept, so their completion and result summaries
+still show. See ``moztrap.model.execution.archive``.
+
+"""
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from moztrap.model.execution import archive
+from moztrap.model.execution.models import Run
+from moztrap.model.mtmodel import utcnow
+
+from .purge_deleted import parse_age
+
+
+
+class Command(BaseCommand):
+    args = "[<run_id> <run_id> ...]"
+    help = (
+        "Archive the results of the given disabled runs, or of all disabled "
+        "runs not modified for --older-than (e.g. 365d); or restore the "
+        "results of the given runs with --restore.")
+
+    option_list = BaseCommand.option_list + (
+        make_option("--older-than",
+                    action="store",
+                    dest="older_than",
+                    default=None,
+                    help="Archive all disabled runs not modified for this "
+                    "long: a number followed by d, h, m or s (e.g. 365d)."),
+        make_option("--restore",
+                    action="store_true",
+                    dest="restore",
+                    default=False,
+                    help="Restore the archived results of the given runs."),
+        )
+
+
+    def handle(self, *args, **options):
+        try:
+            run_ids = [int(a) for a in args]
+        except ValueError:
+            raise CommandError("Usage: {0}".format(self.args))
+
+        if options["restore"]:
+            if not run_ids or options["older_than"] is not None:
+                raise CommandError("--restore takes run ids only.")
+            for run in Run.everything.filter(pk__in=run_ids):
+                try:
+                    count = archive.restore_run(run)
+                except ValueError as e:
+                    raise CommandError(str(e))
+                self.stdout.write(
+                    "Restored {0} results of run {1}.\n".format(
+                        count, run.pk))
+            return
+
+        if options["older_than"] is not None:
+            if run_ids:
+                raise CommandError(
+                    "Give either run ids or --older-than, not both.")
+            try:
+                age = parse_age(options["older_than"])
+            except ValueError as e:
+                raise CommandError(str(e))
+            runs = Run.everything.filter(
+                status=Run.STATUS.disabled,
+                is_series=False,
+                modified_on__lt=utcnow() - age,
+                ).exclude(rollups__frozen=True)
+        elif run_ids:
+            runs = Run.everything.filter(pk__in=run_ids)
+        else:
+            raise CommandError("Give run ids or --older-than.")
+
+        for run in runs.order_by("pk"):
+            try:
+                count = archive.archive_run(run)
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(
+                "Archived {0} results of run {1}.\n".format(count, run.pk))
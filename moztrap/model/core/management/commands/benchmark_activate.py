@@ -0,0 +1,135 @@
+"""
+Management command to benchmark locking in the runcaseversions of a run.
+
+Builds a synthetic run with many cases and environments, activates it, and
+reports the number of SQL statements and the wall time the activation took.
+The activation always locks in the runcaseversions synchronously, even with
+``ASYNC_JOBS`` set. All the data created is rolled back afterwards.
+
+"""
+from optparse import make_option
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from moztrap.model.core.models import Product, ProductVersion
+from moztrap.model.environments.models import Category, Element, Environment
+from moztrap.model.execution.models import Run, RunSuite
+from moztrap.model.library.models import Case, CaseVersion, Suite, SuiteCase
+
+
+
+class Rollback(Exception):
+    """Raised to roll back the synthetic benchmark data."""
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Activate a synthetic run with many cases and environments and "
+        "report SQL statement count and wall time; all data is rolled back.")
+
+    option_list = BaseCommand.option_list + (
+        make_option("--cases",
+                    action="store",
+                    type="int",
+                    dest="cases",
+                    default=10000,
+                    help="Number of cases in the run (default 10000)."),
+        make_option("--envs",
+                    action="store",
+                    type="int",
+                    dest="envs",
+                    default=20,
+                    help="Number of environments in the run (default 20)."),
+        )
+
+    batch_size = 1000
+
+
+    def handle(self, *args, **options):
+        num_cases = options["cases"]
+        num_envs = options["envs"]
+        if num_cases < 1 or num_envs < 1:
+            raise CommandError("--cases and --envs must be positive.")
+
+        try:
+            with transaction.atomic():
+                run = self.create_run(num_cases, num_envs)
+
+                # measure the locking itself, not just queueing a job for it
+                with override_settings(ASYNC_JOBS=False), \
+                        CaptureQueriesContext(connection) as queries:
+                    start = time.time()
+                    run.activate()
+                    elapsed = time.time() - start
+
+                raise Rollback()
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            "Activated run with {0} cases x {1} environments: "
+            "{2} statements in {3:.2f} seconds.\n".format(
+                num_cases, num_envs, len(queries), elapsed)
+            )
+
+
+    def create_run(self, num_cases, num_envs):
+        """Create and return a draft run with given numbers of cases/envs."""
+        product = Product.objects.create(name="Benchmark product")
+        pv = ProductVersion.objects.create(product=product, version="1.0")
+
+        category = Category.objects.create(name="Benchmark category")
+        envs = []
+        for i in range(num_envs):
+            element = Element.objects.create(
+                category=category, name="Element {0}".format(i))
+            env = Environment.objects.create()
+            env.elements.add(element)
+            envs.append(env)
+        pv.environments.add(*envs)
+
+        Case.objects.bulk_create(
+            [Case(product=product) for i in range(num_cases)],
+            batch_size=self.batch_size,
+            )
+        case_ids = list(
+            Case.objects.filter(product=product).order_by("id").values_list(
+                "id", flat=True)
+            )
+
+        CaseVersion.objects.bulk_create(
+            [
+                CaseVersion(
+                    productversion=pv,
+                    case_id=case_id,
+                    name="Case {0}".format(case_id),
+                    status=CaseVersion.STATUS.active,
+                    latest=True,
+                    )
+                for case_id in case_ids
+                ],
+            batch_size=self.batch_size,
+            )
+
+        suite = Suite.objects.create(
+            product=product,
+            name="Benchmark suite",
+            status=Suite.STATUS.active,
+            )
+        SuiteCase.objects.bulk_create(
+            [
+                SuiteCase(suite=suite, case_id=case_id, order=i)
+                for i, case_id in enumerate(case_ids)
+                ],
+            batch_size=self.batch_size,
+            )
+
+        run = Run.objects.create(productversion=pv, name="Benchmark run")
+        run.environments.add(*envs)
+        RunSuite.objects.create(run=run, suite=suite)
+
+        return run
@@ -0,0 +1,114 @@
+"""
+Management command to benchmark reordering the versions of a product.
+
+Builds a synthetic product with many versions, and cases with a version for
+each of them, none of them ordered or marked latest yet; reorders the
+product's versions, and reports the number of SQL statements and the wall
+time that took. All the data created is rolled back afterwards.
+
+"""
+from optparse import make_option
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from moztrap.model.core.models import Product, ProductVersion
+from moztrap.model.library.models import Case, CaseVersion
+
+
+
+class Rollback(Exception):
+    """Raised to roll back the synthetic benchmark data."""
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Reorder the versions of a synthetic product with many versions and "
+        "cases and report SQL statement count and wall time; all data is "
+        "rolled back.")
+
+    option_list = BaseCommand.option_list + (
+        make_option("--cases",
+                    action="store",
+                    type="int",
+                    dest="cases",
+                    default=10000,
+                    help="Number of cases in the product (default 10000)."),
+        make_option("--versions",
+                    action="store",
+                    type="int",
+                    dest="versions",
+                    default=10,
+                    help="Number of versions of the product (default 10)."),
+        )
+
+    batch_size = 1000
+
+
+    def handle(self, *args, **options):
+        num_cases = options["cases"]
+        num_versions = options["versions"]
+        if num_cases < 1 or num_versions < 1:
+            raise CommandError("--cases and --versions must be positive.")
+
+        try:
+            with transaction.atomic():
+                product = self.create_product(num_cases, num_versions)
+
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.time()
+                    product.reorder_versions()
+                    elapsed = time.time() - start
+
+                raise Rollback()
+        except Rollback:
+            pass
+
+        self.stdout.write(
+            "Reordered {0} versions with {1} cases: "
+            "{2} statements in {3:.2f} seconds.\n".format(
+                num_versions, num_cases, len(queries), elapsed)
+            )
+
+
+    def create_product(self, num_cases, num_versions):
+        """Create and return a product with given numbers of versions/cases."""
+        product = Product.objects.create(name="Benchmark product")
+
+        # newest first, so that reordering has to move all of them
+        ProductVersion.objects.bulk_create(
+            [
+                ProductVersion(product=product, version="1.{0}".format(i))
+                for i in reversed(range(num_versions))
+                ],
+            batch_size=self.batch_size,
+            )
+        pv_ids = list(
+            ProductVersion.objects.filter(product=product).values_list(
+                "id", flat=True)
+            )
+
+        Case.objects.bulk_create(
+            [Case(product=product) for i in range(num_cases)],
+            batch_size=self.batch_size,
+            )
+        case_ids = list(
+            Case.objects.filter(product=product).values_list("id", flat=True))
+
+        CaseVersion.objects.bulk_create(
+            [
+                CaseVersion(
+                    productversion_id=pv_id,
+                    case_id=case_id,
+                    name="Case {0}".format(case_id),
+                    )
+                for case_id in case_ids
+                for pv_id in pv_ids
+                ],
+            batch_size=self.batch_size,
+            )
+
+        return product
@@ -17,8 +17,9 @@ class Command(BaseCommand):
         make_option('--permanent',
                     action='store_true',
                     dest='permanent',
-                    default=True,
-                    help='Permanently delete records?'),)
+                    default=False,
+                    help='Permanently delete records, rather than '
+                    'soft-deleting them (with their dependents).'),)
 
     def handle(self, *args, **options):
         for model in (core_models.Product,
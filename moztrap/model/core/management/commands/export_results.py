@@ -0,0 +1,75 @@
+"""
+Management command to export the results of a run, series or product version.
+
+"""
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from moztrap.model.execution import export
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Write the results of a run, series or product version to stdout, "
+        "as CSV or newline-delimited JSON.")
+
+    option_list = BaseCommand.option_list + (
+        make_option("--run",
+                    action="store",
+                    type="int",
+                    dest="run",
+                    default=None,
+                    help="Id of the run to export results of."),
+        make_option("--series",
+                    action="store",
+                    type="int",
+                    dest="series",
+                    default=None,
+                    help="Id of the series run to export results of."),
+        make_option("--productversion",
+                    action="store",
+                    type="int",
+                    dest="productversion",
+                    default=None,
+                    help="Id of the product version to export results of."),
+        make_option("--format",
+                    action="store",
+                    dest="format",
+                    default="csv",
+                    help="Output format: csv (the default) or ndjson."),
+        make_option("--chunk-size",
+                    action="store",
+                    type="int",
+                    dest="chunk_size",
+                    default=None,
+                    help="Results read per query (default "
+                    "RESULT_EXPORT_CHUNK_SIZE setting)."),
+        )
+
+
+    def handle(self, *args, **options):
+        if options["format"] not in export.FORMATS:
+            raise CommandError(
+                "--format must be one of: {0}.".format(
+                    ", ".join(sorted(export.FORMATS))))
+        chunk_size = options["chunk_size"]
+        if chunk_size is None:
+            chunk_size = settings.RESULT_EXPORT_CHUNK_SIZE
+        if chunk_size < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+
+        try:
+            results = export.results_for(
+                run=options["run"],
+                series=options["series"],
+                productversion=options["productversion"],
+                )
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        lines = export.FORMATS[options["format"]][0]
+        for line in lines(export.iter_results(results, chunk_size)):
+            self.stdout.write(line, ending="")
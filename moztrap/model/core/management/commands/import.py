@@ -28,13 +28,24 @@ The data must be in JSON format and structured like this::
         ]
     }
 
+The file is parsed incrementally, so only one batch of cases is held in
+memory at a time, and each batch of cases is committed in its own
+transaction. With ``--checkpoint``, progress is saved to a checkpoint file
+after each batch; running the same import again with the same checkpoint
+file resumes after the last committed case.
+
 """
 
+from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
 from optparse import make_option
+import itertools
 import json
+import os
 import os.path
+import re
+import time
 
 from moztrap.model.core.models import Product, ProductVersion
 from moztrap.model.library.importer import Importer
@@ -56,6 +67,21 @@ class Command(BaseCommand):
             default=False,
             help="Force importing cases, even if the case name is a"
             " duplicate"),
+        make_option(
+            "--batch-size",
+            action="store",
+            type="int",
+            dest="batch_size",
+            default=None,
+            help="Number of cases committed in each transaction (default "
+            "IMPORT_BATCH_SIZE setting)."),
+        make_option(
+            "--checkpoint",
+            action="store",
+            dest="checkpoint",
+            default=None,
+            help="Save progress to this file after each batch, and resume "
+            "from it if it exists; it is removed when the import is done."),
 
         )
 
@@ -64,6 +90,12 @@ class Command(BaseCommand):
             raise CommandError("Usage: {0}".format(self.args))
 
         force_dupes = options.get("force_dupes")
+        verbosity = int(options.get("verbosity", 1))
+        batch_size = options.get("batch_size")
+        if batch_size is None:
+            batch_size = settings.IMPORT_BATCH_SIZE
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
 
         try:
             product = Product.objects.get(name=args[0])
@@ -79,6 +111,8 @@ class Command(BaseCommand):
                     args[1], args[0])
                 )
 
+        checkpoint = Checkpoint(options.get("checkpoint"))
+
         try:
             files = []
             # if this is a directory, import all files in it
@@ -91,11 +125,24 @@ class Command(BaseCommand):
 
             results_for_files = None
             for file in files:
-                with open(file) as fh:
+                if checkpoint.is_done(file):
+                    if verbosity > 1:
+                        self.stdout.write(
+                            "Skipping {0}, already imported.\n".format(file))
+                    continue
+
+                with open(file, "rb") as fh:
 
                     # try to import this as JSON
                     try:
-                        case_data = json.load(fh)   # pragma: no branch
+                        result = self.import_file(
+                            fh,
+                            product_version,
+                            force_dupes,
+                            batch_size,
+                            checkpoint,
+                            verbosity,
+                            )
                     except ValueError as e:
                         raise CommandError(
                             "Could not parse JSON: {0}: {1}".format(
@@ -106,15 +153,14 @@ class Command(BaseCommand):
                     # @@@: support importing as CSV.  Rather than returning an
                     # error above, just try CSV import instead.
 
-                    result = Importer().import_data(
-                        product_version, case_data, force_dupes=force_dupes)
-
                     # append this result to those for any of the other files.
                     if not results_for_files:
                         results_for_files = result
                     else:
                         results_for_files.append(result)  # pragma: no branch
 
+            checkpoint.remove()
+
             if results_for_files:
                 result_list = results_for_files.get_as_list()
                 result_list.append("")
@@ -128,3 +174,286 @@ class Command(BaseCommand):
                 'Could not open "{0}", I/O error {1}: {2}'.format(
                     args[2], errno, strerror)
                 )
+
+
+    def import_file(self, fh, productversion, force_dupes, batch_size,
+                    checkpoint, verbosity):
+        """
+        Import cases and suites from open file ``fh``; return ImportResult.
+
+        Cases are parsed from the file as they are imported, ``batch_size``
+        at a time, and cases already committed according to ``checkpoint``
+        are skipped. Raises ValueError if the file isn't valid JSON; batches
+        committed before the error stay committed (and checkpointed).
+
+        """
+        items = iter_import_data(fh)
+
+        # suites listed before the cases are created with the first batch;
+        # any listed after them are created at the end
+        suites = []
+        first = []
+        for key, value in items:
+            if key == "case":
+                first.append(value)
+                break
+            elif key == "suites":
+                suites.extend(value)
+        late_suites = []
+
+        # number of cases read from the file
+        read = [0]
+
+        def cases():
+            for value in itertools.chain(first, _cases(items, late_suites)):
+                read[0] += 1
+                yield value
+
+        skip = checkpoint.get(fh.name)
+        importer = Importer()
+        result = None
+        start = time.time()
+        for batch_result in importer.import_batches(
+                productversion,
+                itertools.islice(cases(), skip, None),
+                suites,
+                force_dupes=force_dupes,
+                batch_size=batch_size,
+                ):
+            checkpoint.save(fh.name, read[0])
+            if result is None:
+                result = batch_result
+            else:
+                result.append(batch_result)
+            if verbosity > 1:
+                elapsed = max(time.time() - start, 0.001)
+                self.stdout.write(
+                    "{0}: read {1} cases, imported {2} "
+                    "({3:.1f} cases/s)\n".format(
+                        fh.name,
+                        read[0],
+                        result.num_cases,
+                        result.num_cases / elapsed,
+                        )
+                    )
+
+        if late_suites:
+            result.append(
+                importer.import_data(productversion, {"suites": late_suites}))
+
+        checkpoint.save(fh.name, read[0], done=True)
+        return result
+
+
+
+def _cases(items, late_suites):
+    """Yield case values from ``items``; collect later suites' values."""
+    for key, value in items:
+        if key == "case":
+            yield value
+        elif key == "suites":
+            late_suites.extend(value)
+
+
+
+class Checkpoint(object):
+    """
+    Import progress, saved to a JSON file after each committed batch.
+
+    The file maps each imported file name to the number of cases read from
+    it so far (including any skipped), and whether it's done.
+
+    """
+
+    def __init__(self, path):
+        """Load checkpoint from file at ``path``; if None, don't save any."""
+        self.path = path
+        self.files = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as fh:
+                try:
+                    self.files = json.load(fh)
+                except ValueError as e:
+                    raise CommandError(
+                        "Could not parse checkpoint {0}: {1}".format(
+                            path, str(e)))
+
+
+    def get(self, name):
+        """Return the number of cases of file ``name`` already committed."""
+        return self.files.get(name, {}).get("cases", 0)
+
+
+    def is_done(self, name):
+        """Return True if file ``name`` has been completely imported."""
+        return self.files.get(name, {}).get("done", False)
+
+
+    def save(self, name, cases, done=False):
+        """Record ``cases`` of file ``name`` committed; write if saving."""
+        self.files[name] = {"cases": cases, "done": done}
+        if self.path is not None:
+            # replace the checkpoint file atomically
+            tmp = "{0}.tmp".format(self.path)
+            with open(tmp, "w") as fh:
+                json.dump(self.files, fh)
+            os.rename(tmp, self.path)
+
+
+    def remove(self):
+        """Remove the checkpoint file, if any; the import is complete."""
+        if self.path is not None and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+
+def iter_import_data(fh, read_size=64 * 1024):
+    """
+    Parse top-level JSON object in file ``fh`` incrementally.
+
+    Yields ``("case", <case dict>)`` for each element of the ``cases``
+    array, and ``(<key>, <value>)`` for other keys of the object (e.g.
+    ``suites``); only the value being parsed is held in memory. Raises
+    ValueError if the file isn't a valid JSON object.
+
+    """
+    reader = _JSONReader(fh, read_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.expect("}")
+    else:
+        while True:
+            key = reader.decode()
+            reader.expect(":")
+            if key == "cases" and reader.peek() == "[":
+                reader.expect("[")
+                if reader.peek() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield "case", reader.decode()
+                        if reader.expect(",", "]") == "]":
+                            break
+            else:
+                yield key, reader.decode()
+            if reader.expect(",", "}") == "}":
+                break
+    if not reader.at_end():
+        raise ValueError("Extra data after the top-level object")
+
+
+
+class _JSONReader(object):
+    """Reads JSON tokens and values from a file, a buffer at a time."""
+
+    WHITESPACE = re.compile(r"[ \t\n\r]*")
+    # where a scan of a value next needs to look, outside and inside strings
+    STRUCTURE = re.compile(r'["\[\]{}]')
+    STRING_END = re.compile(r'["\\]')
+    # what may follow a number or literal
+    LITERAL_END = re.compile(r"[ \t\n\r,:\]}]")
+
+
+    def __init__(self, fh, read_size):
+        """Read from ``fh``, ``read_size`` bytes at a time."""
+        self.fh = fh
+        self.read_size = read_size
+        self.decoder = json.JSONDecoder()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+
+    def fill(self):
+        """Read more of the file into the buffer, dropping what's parsed."""
+        data = self.fh.read(self.read_size)
+        if not data:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+
+
+    def at_end(self):
+        """Return True if there is nothing but whitespace left."""
+        while True:
+            self.pos = self.WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return False
+            if self.eof:
+                return True
+            self.fill()
+
+
+    def peek(self):
+        """Return the next non-whitespace character, without consuming it."""
+        if self.at_end():
+            raise ValueError("Unexpected end of data")
+        return self.buffer[self.pos]
+
+
+    def expect(self, *chars):
+        """Consume and return next character, which must be one of chars."""
+        char = self.peek()
+        if char not in chars:
+            raise ValueError(
+                "Expected {0} at {1!r}".format(
+                    " or ".join(chars), self.buffer[self.pos:self.pos + 20]))
+        self.pos += 1
+        return char
+
+
+    def decode(self):
+        """Consume and return the next JSON value."""
+        self.peek()
+        # read on until the whole value is in the buffer, then decode it
+        state = (0, 0, False)
+        while True:
+            complete, state = self.scan(*state)
+            if complete or self.eof:
+                break
+            self.fill()
+        value, self.pos = self.decoder.raw_decode(self.buffer, self.pos)
+        return value
+
+
+    def scan(self, offset, depth, in_string):
+        """
+        Scan the value starting at ``pos`` for its end, as far as buffered.
+
+        The scan resumes ``offset`` characters into the value, nested
+        ``depth`` arrays or objects deep, and inside a string if
+        ``in_string``. Returns ``(complete, state)``: whether the end of the
+        value is in the buffer and, if not, the state to resume from once
+        more is read. Only the structure is followed, not checked; the
+        decoder reports invalid JSON.
+
+        """
+        buffer = self.buffer
+        if buffer[self.pos] not in '"[{':
+            # numbers and literals end before a delimiter
+            match = self.LITERAL_END.search(buffer, self.pos)
+            return match is not None, (offset, depth, in_string)
+
+        i = self.pos + offset
+        while True:
+            pattern = self.STRING_END if in_string else self.STRUCTURE
+            match = pattern.search(buffer, i)
+            if match is None:
+                return False, (len(buffer) - self.pos, depth, in_string)
+            i = match.start()
+            char = buffer[i]
+            if char == "\\":
+                # skip the escaped character, once it's read
+                if i + 1 == len(buffer):
+                    return False, (i - self.pos, depth, in_string)
+                i += 2
+                continue
+            i += 1
+            if char == '"':
+                in_string = not in_string
+            elif char in "[{":
+                depth += 1
+            else:
+                depth -= 1
+            if not depth and not in_string:
+                return True, None
@@ -0,0 +1,113 @@
+"""
+Management command to permanently remove long soft-deleted rows.
+
+Rows soft-deleted before the ``--older-than`` age are removed in dependency
+order, in batches; see ``moztrap.model.purge``. With ``--archive-dir``, the
+rows (of all tables) are first written to a gzipped newline-delimited JSON
+file per table in that directory. Prints the number of rows removed from
+each table.
+
+"""
+from optparse import make_option
+import datetime
+import os
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from moztrap.model.mtmodel import utcnow
+from moztrap.model.purge import Archive, Purger
+
+
+
+# unit suffix: timedelta keyword argument
+UNITS = {"d": "days", "h": "hours", "m": "minutes", "s": "seconds"}
+
+
+
+def parse_age(age):
+    """Return timedelta for an age like "90d", "12h", "30m" or "45s"."""
+    match = re.match(r"^(\d+)([dhms])$", age.strip())
+    if match is None:
+        raise ValueError(
+            "Age must be a number followed by d, h, m or s (e.g. 90d).")
+    return datetime.timedelta(
+        **{UNITS[match.group(2)]: int(match.group(1))})
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Permanently remove rows soft-deleted more than --older-than ago "
+        "(e.g. 90d), optionally archiving them first.")
+
+    option_list = BaseCommand.option_list + (
+        make_option("--older-than",
+                    action="store",
+                    dest="older_than",
+                    default=None,
+                    help="Age of deletions to purge: a number followed by "
+                    "d, h, m or s (e.g. 90d). Required."),
+        make_option("--batch-size",
+                    action="store",
+                    type="int",
+                    dest="batch_size",
+                    default=None,
+                    help="Rows deleted per transaction (default "
+                    "PURGE_BATCH_SIZE setting)."),
+        make_option("--pause",
+                    action="store",
+                    type="float",
+                    dest="pause",
+                    default=None,
+                    help="Seconds to pause after each batch (default "
+                    "PURGE_PAUSE setting)."),
+        make_option("--archive-dir",
+                    action="store",
+                    dest="archive_dir",
+                    default=None,
+                    help="Directory to write the purged rows to, as a "
+                    "gzipped NDJSON file per table."),
+        )
+
+
+    def handle(self, *args, **options):
+        if options["older_than"] is None:
+            raise CommandError("--older-than is required.")
+        try:
+            age = parse_age(options["older_than"])
+        except ValueError as e:
+            raise CommandError(str(e))
+        batch_size = options["batch_size"]
+        if batch_size is None:
+            batch_size = settings.PURGE_BATCH_SIZE
+        if batch_size < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        pause = options["pause"]
+        if pause is None:
+            pause = settings.PURGE_PAUSE
+
+        now = utcnow()
+        archive = None
+        if options["archive_dir"] is not None:
+            if not os.path.isdir(options["archive_dir"]):
+                raise CommandError(
+                    "--archive-dir {0} is not a directory.".format(
+                        options["archive_dir"]))
+            archive = Archive(
+                options["archive_dir"], now.strftime("%Y%m%dT%H%M%S"))
+
+        purger = Purger(
+            now - age, batch_size=batch_size, pause=pause, archive=archive)
+        try:
+            counts = purger.purge()
+        finally:
+            if archive is not None:
+                archive.close()
+
+        for table in sorted(counts):
+            self.stdout.write(
+                "{0}: {1} rows purged.\n".format(table, counts[table]))
+        self.stdout.write(
+            "Purged {0} rows.\n".format(sum(counts.values())))
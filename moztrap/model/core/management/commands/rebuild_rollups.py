@@ -0,0 +1,40 @@
+"""
+Management command to rebuild the denormalized per-run result rollups.
+
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from moztrap.model.execution.models import Run, RunRollup
+
+
+
+class Command(BaseCommand):
+    args = "[<run_id> <run_id> ...]"
+    help = (
+        "Rebuild result rollups for the given runs, or for all non-series "
+        "runs if none are given; runs with archived results are skipped.")
+
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get("verbosity", 1))
+
+        try:
+            run_ids = [int(a) for a in args]
+        except ValueError:
+            raise CommandError("Usage: {0}".format(self.args))
+
+        # frozen rollups of archived runs can't be rebuilt
+        runs = Run.objects.filter(is_series=False).exclude(
+            rollups__frozen=True)
+        if run_ids:
+            runs = runs.filter(pk__in=run_ids)
+
+        count = 0
+        for run_id in runs.values_list("id", flat=True).iterator():
+            RunRollup.rebuild(run_id)
+            count += 1
+            if verbosity > 1:
+                self.stdout.write("Rebuilt rollups for run {0}\n".format(run_id))
+
+        if verbosity:
+            self.stdout.write("Rebuilt rollups for {0} run(s).\n".format(count))
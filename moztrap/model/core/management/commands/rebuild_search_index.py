@@ -0,0 +1,59 @@
+"""
+Management command to rebuild the search tokens for case text.
+
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from moztrap.model.library.models import CaseVersion, SearchToken
+
+
+
+# caseversions to index at once
+BATCH_SIZE = 500
+
+
+
+class Command(BaseCommand):
+    args = "[<caseversion_id> <caseversion_id> ...]"
+    help = (
+        "Rebuild keyword search tokens for the given caseversions, or for all "
+        "caseversions if none are given.")
+
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get("verbosity", 1))
+
+        try:
+            cv_ids = [int(a) for a in args]
+        except ValueError:
+            raise CommandError("Usage: {0}".format(self.args))
+
+        caseversions = CaseVersion.everything.all()
+        if cv_ids:
+            caseversions = caseversions.filter(pk__in=cv_ids)
+
+        count = 0
+        batch = []
+        for cv_id in caseversions.values_list("id", flat=True).iterator():
+            batch.append(cv_id)
+            if len(batch) >= BATCH_SIZE:
+                count += self.index(batch, verbosity)
+                batch = []
+        if batch:
+            count += self.index(batch, verbosity)
+
+        if verbosity:
+            self.stdout.write(
+                "Rebuilt search tokens for {0} caseversion(s).\n".format(count))
+
+
+    def index(self, cv_ids, verbosity):
+        """Index a batch of caseversions; return the number indexed."""
+        with transaction.commit_on_success():
+            SearchToken.index(cv_ids)
+        if verbosity > 1:
+            self.stdout.write(
+                "Rebuilt search tokens for caseversions {0}-{1}\n".format(
+                    cv_ids[0], cv_ids[-1]))
+        return len(cv_ids)
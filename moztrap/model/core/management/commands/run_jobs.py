@@ -0,0 +1,84 @@
+"""
+Management command to run queued background jobs.
+
+"""
+from optparse import make_option
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from moztrap.model.core import jobs
+
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs, polling for new ones until stopped "
+        "(or until the queue is empty, with --once).")
+
+    option_list = BaseCommand.option_list + (
+        make_option("--workers",
+                    action="store",
+                    type="int",
+                    dest="workers",
+                    default=None,
+                    help="Number of worker processes (default JOB_WORKERS "
+                    "setting); with 1, jobs run in this process."),
+        make_option("--poll",
+                    action="store",
+                    type="float",
+                    dest="poll",
+                    default=2.0,
+                    help="Seconds to wait between checks for new jobs."),
+        make_option("--once",
+                    action="store_true",
+                    dest="once",
+                    default=False,
+                    help="Exit once there are no more queued jobs."),
+        )
+
+
+    def handle(self, *args, **options):
+        verbosity = int(options.get("verbosity", 1))
+        workers = options["workers"]
+        if workers is None:
+            workers = getattr(settings, "JOB_WORKERS", 1)
+        if workers < 1:
+            raise CommandError("--workers must be at least 1.")
+
+        pool = None
+        if workers > 1:
+            # don't share the parent's database connection with the workers
+            connection.close()
+            pool = multiprocessing.Pool(workers, connection.close)
+
+        pending = []
+        count = 0
+        try:
+            while True:
+                pending = [p for p in pending if not p.ready()]
+                job = jobs.claim() if len(pending) < workers else None
+                if job is None:
+                    if options["once"] and not pending:
+                        break
+                    time.sleep(options["poll"] if not pending else 0.1)
+                    continue
+
+                count += 1
+                if verbosity > 1:
+                    self.stdout.write("Running job {0}: {1}\n".format(
+                        job.id, job.task))
+                if pool is None:
+                    jobs.run(job.id)
+                else:
+                    pending.append(pool.apply_async(jobs.run, [job.id]))
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        if verbosity:
+            self.stdout.write("Ran {0} job(s).\n".format(count))
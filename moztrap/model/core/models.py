@@ -2,16 +2,20 @@
 Core MozTrap models (Product).
 
 """
+import threading
+import time
 import uuid
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.db import models
+from django.db import connection, models
 
+from model_utils import Choices
 from pkg_resources import parse_version
 from preferences.models import Preferences
 
 from ..environments.models import HasEnvironmentsModel
-from ..mtmodel import MTModel, MTManager, TeamModel
+from ..mtmodel import MTModel, MTManager, TeamModel, utcnow
 from ..auth.models import Role, User
 
 
@@ -51,19 +55,48 @@ class Product(MTModel, TeamModel):
         If an ``update_instance`` is given, update it with new order and
         ``latest`` flag.
 
+        Versions whose order or ``latest`` flag change are updated in one
+        statement, then the latest version of every case of the product is
+        recomputed in another.
+
         """
         ordered = sorted(self.versions.all(), key=by_version)
+        # id: (order, latest) for versions that need updating
+        changes = {}
         for i, version in enumerate(ordered, 1):
-            version.order = i
-            version.latest = (i == len(ordered))
-            version.save(force_update=True, skip_reorder=True, notrack=True)
-            if version == update_instance:
-                update_instance.order = version.order
-                update_instance.latest = version.latest
-                update_instance.cc_version += 1
-        # now we have to update latest caseversions too, @@@ too slow?
-        for case in self.cases.all():
-            case.set_latest_version()
+            latest = (i == len(ordered))
+            if (version.order, version.latest) != (i, latest):
+                changes[version.id] = (i, latest)
+                if version == update_instance:
+                    update_instance.order = i
+                    update_instance.latest = latest
+                    update_instance.cc_version += 1
+
+        if changes:
+            qn = connection.ops.quote_name
+            ids = sorted(changes)
+            cursor = connection.cursor()
+            cursor.execute(
+                "UPDATE {0} SET {1} = CASE {2} {3} END, "
+                "{4} = CASE {2} {3} END, {5} = {5} + 1 "
+                "WHERE {2} IN ({6})".format(
+                    qn(ProductVersion._meta.db_table),
+                    qn("order"),
+                    qn("id"),
+                    " ".join(["WHEN %s THEN %s"] * len(ids)),
+                    qn("latest"),
+                    qn("cc_version"),
+                    ", ".join(["%s"] * len(ids)),
+                    ),
+                [x for i in ids for x in (i, changes[i][0])] +
+                [x for i in ids for x in (i, changes[i][1])] +
+                ids
+                )
+            # version choices are listed in order
+            CacheGeneration.bump(ProductVersion)
+
+        # now we have to update latest caseversions too
+        self.cases.model.set_latest_versions(self)
 
 
 
@@ -147,12 +180,13 @@ class ProductVersion(MTModel, TeamModel, HasEnvironmentsModel):
         CaseVersion = cls.caseversions.related.model
 
         runs = Run.objects.filter(productversion__in=objs)
-        caseversions = CaseVersion.objects.filter(productversion__in=objs)
 
+        # non-narrowed caseversions inherit additions without storing them,
+        # and narrowed ones don't get them
         if adding:
-            runs = runs.filter(status=Run.STATUS.draft)
-            caseversions = caseversions.filter(envs_narrowed=False)
+            return {Run: runs.filter(status=Run.STATUS.draft)}
 
+        caseversions = CaseVersion.objects.filter(productversion__in=objs)
         return {Run: runs, CaseVersion: caseversions}
 
 
@@ -226,3 +260,132 @@ class ApiKey(MTModel):
 
         return cls.objects.create(
             owner=owner, user=user, key=unicode(uuid.uuid4()))
+
+
+
+class Job(models.Model):
+    """
+    A unit of background work, queued in the database.
+
+    ``task`` is the dotted path of a module-level function, ``args`` a JSON
+    list of its arguments. Jobs are claimed and run by ``manage.py run_jobs``;
+    see ``moztrap.model.core.jobs``.
+
+    """
+    STATUS = Choices("queued", "running", "done", "failed")
+
+    task = models.CharField(max_length=200)
+    args = models.TextField(default="[]")
+    status = models.CharField(
+        max_length=30, db_index=True, choices=STATUS, default=STATUS.queued)
+    error = models.TextField(blank=True)
+    user = models.ForeignKey(
+        User, blank=True, null=True, related_name="+",
+        on_delete=models.SET_NULL)
+    created_on = models.DateTimeField(default=utcnow)
+    started_on = models.DateTimeField(blank=True, null=True)
+    finished_on = models.DateTimeField(blank=True, null=True)
+
+
+    def __unicode__(self):
+        """Return unicode representation."""
+        return u"{0}({1}) [{2}]".format(self.task, self.args, self.status)
+
+
+
+class CacheGeneration(models.Model):
+    """
+    A counter bumped on each change to the rows of a model's table.
+
+    Processes caching data derived from a model's table (e.g. the options of
+    a ``ModelFilter``) keep the generation it was built at, and rebuild it
+    once the model's generation moves on. The counters live in the database
+    so a change made in one process is seen by all of them.
+
+    Within a request, bumps are only written to the database once it ends
+    (see ``defer_bumps``), after its transaction has committed; otherwise
+    the bumped row stays locked, holding up other requests bumping it, until
+    the commit.
+
+    """
+    name = models.CharField(max_length=100, unique=True)
+    generation = models.IntegerField(default=0)
+
+
+    # this process's copy of all generations: (time read, {name: generation})
+    _snapshot = (0, {})
+    # name: number of bumps made by this process
+    _local = {}
+    # ``names``: set of names with bumps not yet written, if deferring
+    _pending = threading.local()
+
+
+    def __unicode__(self):
+        """Return unicode representation."""
+        return u"{0} [{1}]".format(self.name, self.generation)
+
+
+    @staticmethod
+    def name_for(model):
+        """Return generation name for ``model``'s table."""
+        return u"model:{0}".format(model._meta)
+
+
+    @classmethod
+    def current(cls, model):
+        """
+        Return the current generation of ``model``, as an opaque value.
+
+        All the generations are read in one query, and reused for up to
+        ``CACHE_GENERATION_TTL`` seconds, so a change made by another process
+        may take that long to be seen. Changes made by this process are seen
+        immediately, even those not yet committed or since rolled back.
+
+        """
+        name = cls.name_for(model)
+        read_on, generations = cls._snapshot
+        now = time.time()
+        if now - read_on >= settings.CACHE_GENERATION_TTL:
+            generations = dict(cls.objects.values_list("name", "generation"))
+            cls._snapshot = (now, generations)
+        return (generations.get(name, 0), cls._local.get(name, 0))
+
+
+    @classmethod
+    def bump(cls, model):
+        """Move on the generation of ``model``, in all processes."""
+        name = cls.name_for(model)
+        pending = getattr(cls._pending, "names", None)
+        if pending is None:
+            cls._write(name)
+        else:
+            pending.add(name)
+        cls._local[name] = cls._local.get(name, 0) + 1
+        cls._snapshot = (0, {})
+
+
+    @classmethod
+    def defer_bumps(cls):
+        """Hold this thread's bumps back from the database until flushed."""
+        cls._pending.names = set()
+
+
+    @classmethod
+    def flush_bumps(cls):
+        """Write any held-back bumps to the database, and stop deferring."""
+        names = getattr(cls._pending, "names", None) or set()
+        cls._pending.names = None
+        for name in sorted(names):
+            cls._write(name)
+
+
+    @classmethod
+    def _write(cls, name):
+        """Increment the stored generation ``name``."""
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO {0} (name, generation) VALUES (%s, 1) "
+            "ON DUPLICATE KEY UPDATE generation = generation + 1".format(
+                cls._meta.db_table),
+            [name],
+            )
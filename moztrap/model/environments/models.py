@@ -5,7 +5,8 @@ Models for environments.
 import itertools
 from collections import defaultdict
 
-from django.db import models
+from django.db import connection, models
+from django.db.models.query import QuerySet
 
 from ..mtmodel import MTModel
 
@@ -223,7 +224,8 @@ class HasEnvironmentsModel(models.Model):
     Base for models that inherit/cascade environments to/from parents/children.
 
     Subclasses should implement ``parent`` property and ``cascade_envs_to``
-    classmethod.
+    classmethod. Subclasses whose instances may inherit their parent's
+    environments without storing them should override ``inherits_envs``.
 
     """
     environments = models.ManyToManyField(
@@ -242,7 +244,8 @@ class HasEnvironmentsModel(models.Model):
 
         ret = super(HasEnvironmentsModel, self).save(*args, **kwargs)
 
-        if adding and isinstance(self.parent, HasEnvironmentsModel):
+        if (adding and not self.inherits_envs and
+                isinstance(self.parent, HasEnvironmentsModel)):
             self.environments.add(*self.parent.environments.all())
 
         return ret
@@ -257,22 +260,90 @@ class HasEnvironmentsModel(models.Model):
         return None
 
 
+    @property
+    def inherits_envs(self):
+        """
+        True if this object's environments are read from its parent.
+
+        Such an object has no ``environments`` of its own (it isn't given its
+        parent's when created); ``effective_environments`` are its parent's.
+
+        """
+        return False
+
+
+    @property
+    def effective_environments(self):
+        """Queryset of the environments of this object's profile."""
+        if self.inherits_envs:
+            return self.parent.effective_environments
+        return self.environments.all()
+
+
     @classmethod
     def cascade_envs_to(cls, objs, adding):
         """
         Return model instances to cascade env profile changes to.
 
-        Return value should be a dictionary mapping model classes to iterables
+        Return value should be a dictionary mapping model classes to querysets
         of model instances to cascade to.
 
-        ``objs`` arg is list of objs`` of this class to cascade from;
-        ``adding`` arg is True if cascading for an addition of envs to the
-        profile, False if cascading a removal.
+        ``objs`` arg is a list or queryset of objs of this class to cascade
+        from; ``adding`` arg is True if cascading for an addition of envs to
+        the profile, False if cascading a removal.
 
         """
         return {}
 
 
+    @classmethod
+    def _add_envs(cls, objs, envs):
+        """
+        Add one or more environments to one or more objects of this class.
+
+        Each level of the cascade is a single ``INSERT ... SELECT`` of the
+        missing through rows, with ``objs`` as a subquery; so the number of
+        statements doesn't depend on the number of objects cascaded to.
+
+        """
+        env_ids = [getattr(e, "pk", e) for e in envs]
+        if not env_ids:
+            return
+        if not isinstance(objs, QuerySet):
+            objs = cls._base_manager.filter(
+                pk__in=[getattr(o, "pk", o) for o in objs])
+        objs_sql, objs_params = objs.order_by().values(
+            "pk").query.sql_with_params()
+
+        field = cls.environments.field
+        qn = connection.ops.quote_name
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO {through} ({obj_id}, {env_id}) "
+            "SELECT o.{pk}, e.{env_pk} "
+            "FROM {table} o CROSS JOIN {env_table} e "
+            "WHERE o.{pk} IN ({objs}) AND e.{env_pk} IN ({envs}) "
+            "AND NOT EXISTS ("
+            "SELECT 1 FROM {through} t "
+            "WHERE t.{obj_id} = o.{pk} AND t.{env_id} = e.{env_pk}"
+            ")".format(
+                through=qn(field.m2m_db_table()),
+                obj_id=qn(field.m2m_column_name()),
+                env_id=qn(field.m2m_reverse_name()),
+                table=qn(cls._meta.db_table),
+                pk=qn(cls._meta.pk.column),
+                env_table=qn(field.rel.to._meta.db_table),
+                env_pk=qn(field.rel.to._meta.pk.column),
+                objs=objs_sql,
+                envs=", ".join(["%s"] * len(env_ids)),
+                ),
+            list(objs_params) + env_ids,
+            )
+
+        for model, instances in cls.cascade_envs_to(objs, adding=True).items():
+            model._add_envs(instances, env_ids)
+
+
     @classmethod
     def _remove_envs(cls, objs, envs):
         """Remove one or environments from one or more objects of this class."""
@@ -294,9 +365,4 @@ class HasEnvironmentsModel(models.Model):
 
     def add_envs(self, *envs):
         """Add one or more environments to this object's profile."""
-        # @@@ optimize this to reduce queries once we have bulk insert in 1.4
-        self.environments.add(*envs)
-        for model, instances in self.cascade_envs_to(
-                [self], adding=True).items():
-            for instance in instances:
-                instance.add_envs(*envs)
+        self._add_envs([self], envs)
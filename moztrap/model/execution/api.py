@@ -3,12 +3,19 @@ from tastypie.resources import ModelResource, ALL_WITH_RELATIONS
 from tastypie import http, fields
 from tastypie.exceptions import ImmediateHttpResponse
 from tastypie.bundle import Bundle
+from tastypie.utils import trailing_slash
 
 import json
 
+from django.conf import settings
+from django.conf.urls import url
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import HttpResponse, StreamingHttpResponse
 
+from .archive import is_archived
+from .bulk import record_results, ingest_stream
+from . import export
 from .models import Run, RunCaseVersion, RunSuite, Result
 from ..mtapi import MTResource, MTApiKeyAuthentication, MTAuthorization
 from ..core.api import (ProductVersionResource, ProductResource,
@@ -16,7 +23,8 @@ from ..core.api import (ProductVersionResource, ProductResource,
 from ..environments.api import EnvironmentResource
 from ..environments.models import Environment
 from ..library.api import (CaseVersionResource, BaseSelectionResource,
-                           SuiteResource)
+                           SuiteResource, USER_FIELDS)
+from .. import fastlist as fl
 from ..library.models import CaseVersion, Suite
 
 from ...view.lists.filters import filter_url
@@ -248,6 +256,27 @@ class ResultResource(ModelResource):
             ]
         }
 
+    Large batches should instead be POSTed, in the same form, to
+    ``result/bulk/``. This resolves and records all the results in a fixed
+    number of queries, and responds with an outcome for each submitted
+    object, in order: ``{"created": <number of results>}`` or
+    ``{"error": <message>}``. Objects with errors don't prevent the rest of
+    the batch from being recorded.
+
+    Very large uploads can be POSTed to ``result/stream/`` as
+    newline-delimited JSON (one result object per line, content type
+    ``application/x-ndjson``). Lines are parsed as they arrive and committed
+    in chunks of ``chunk_size`` lines (default ``RESULT_STREAM_CHUNK_SIZE``),
+    and a newline-delimited JSON report is streamed back for each chunk. Pass
+    an ``upload_key`` to be able to resume: sending the same upload again
+    with the same key skips the lines that were already committed.
+
+    The results of a run, series or product version can be exported with a
+    GET of ``result/export/`` with a ``run``, ``series`` or
+    ``productversion`` id, and ``format`` ``csv`` (the default) or
+    ``ndjson``. The export is streamed, reading ``RESULT_EXPORT_CHUNK_SIZE``
+    results at a time.
+
     """
 
     class Meta:
@@ -263,6 +292,139 @@ class ResultResource(ModelResource):
         authorization = ReportResultsAuthorization()
 
 
+    def prepend_urls(self):
+        """Add the bulk and streaming result submission, and export, URLs."""
+        return [
+            url(r"^(?P<resource_name>{0})/bulk{1}$".format(
+                    self._meta.resource_name, trailing_slash()),
+                self.wrap_view("dispatch_bulk"),
+                name="api_result_bulk"),
+            url(r"^(?P<resource_name>{0})/stream{1}$".format(
+                    self._meta.resource_name, trailing_slash()),
+                self.wrap_view("dispatch_stream"),
+                name="api_result_stream"),
+            url(r"^(?P<resource_name>{0})/export{1}$".format(
+                    self._meta.resource_name, trailing_slash()),
+                self.wrap_view("dispatch_export"),
+                name="api_result_export"),
+            ]
+
+
+    def dispatch_bulk(self, request, **kwargs):
+        """Record a POSTed batch of results; see ``record_results``."""
+        self.method_check(request, allowed=["post"])
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        data = self.deserialize(
+            request,
+            request.body,
+            format=request.META.get("CONTENT_TYPE", "application/json"),
+            )
+        objects = data.get("objects") if isinstance(data, dict) else None
+        if not isinstance(objects, list):
+            raise ImmediateHttpResponse(
+                response=http.HttpBadRequest(
+                    "Submit a list of result objects as \"objects\"."))
+
+        with transaction.commit_on_success():
+            outcomes = record_results(
+                objects, request.user, self._create_authorizer(request))
+        self.log_throttled_access(request)
+        return self.create_response(request, {"objects": outcomes})
+
+
+    def dispatch_stream(self, request, **kwargs):
+        """Record POSTed newline-delimited results; see ``ingest_stream``."""
+        self.method_check(request, allowed=["post"])
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        try:
+            chunk_size = int(request.GET.get(
+                "chunk_size", settings.RESULT_STREAM_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = 0
+        if chunk_size < 1:
+            raise ImmediateHttpResponse(
+                response=http.HttpBadRequest(
+                    "chunk_size must be a positive integer."))
+
+        upload_key = request.GET.get("upload_key") or None
+        if upload_key is not None and len(upload_key) > 100:
+            raise ImmediateHttpResponse(
+                response=http.HttpBadRequest(
+                    "upload_key must be at most 100 characters."))
+
+        # the request body is read line by line as the response is streamed
+        reports = ingest_stream(
+            request,
+            request.user,
+            chunk_size,
+            self._create_authorizer(request),
+            upload_key,
+            )
+        self.log_throttled_access(request)
+        return StreamingHttpResponse(
+            (json.dumps(report) + "\n" for report in reports),
+            content_type="application/x-ndjson",
+            )
+
+
+    def dispatch_export(self, request, **kwargs):
+        """Stream the results of a run, series or product version."""
+        self.method_check(request, allowed=["get"])
+        self.is_authenticated(request)
+        self.throttle_check(request)
+
+        format = request.GET.get("format", "csv")
+        if format not in export.FORMATS:
+            raise ImmediateHttpResponse(
+                response=http.HttpBadRequest(
+                    "format must be one of: {0}.".format(
+                        ", ".join(sorted(export.FORMATS)))))
+        try:
+            given = dict(
+                (k, int(request.GET[k]))
+                for k in ["run", "series", "productversion"]
+                if k in request.GET
+                )
+        except ValueError:
+            given = {}
+        if len(given) != 1:
+            raise ImmediateHttpResponse(
+                response=http.HttpBadRequest(
+                    "Give the integer id of exactly one run, series or "
+                    "productversion to export."))
+        try:
+            results = export.results_for(**given)
+        except ValueError as e:
+            raise ImmediateHttpResponse(
+                response=http.HttpBadRequest(str(e)))
+
+        lines, content_type = export.FORMATS[format]
+        self.log_throttled_access(request)
+        return StreamingHttpResponse(
+            lines(export.iter_results(
+                    results, settings.RESULT_EXPORT_CHUNK_SIZE)),
+            content_type=content_type,
+            )
+
+
+    def _create_authorizer(self, request):
+        """Return function checking the user may create results for rcvs."""
+        bundle = self.build_bundle(request=request)
+
+        def authorize(rcvs):
+            try:
+                self.authorized_create_detail(rcvs, bundle)
+            except ImmediateHttpResponse:
+                return False
+            return True
+
+        return authorize
+
+
     def obj_create(self, bundle, request=None, **kwargs):
         """
         Manually create the proper results objects.
@@ -292,7 +454,7 @@ class ResultResource(ModelResource):
         data["environment"] = env
 
         try:
-            rcv = RunCaseVersion.objects.get(
+            rcv = RunCaseVersion.objects.select_related("run").get(
                 run__id=run,
                 caseversion__case__id=case,
                 environments=env,
@@ -303,6 +465,16 @@ class ResultResource(ModelResource):
                 "RunCaseVersion not found for run: {0}, case: {1}, environment: {2}:\nError {3}".format(
                         str(run), str(case), str(env), e))
 
+        if rcv.run.is_locking:
+            raise ValidationError(
+                "Run {0} is still being prepared for testing; "
+                "results can be reported once it is ready.".format(run))
+
+        if is_archived(rcv.run):
+            raise ValidationError(
+                "Run {0} is archived; results can be reported once it is "
+                "activated again.".format(run))
+
         self.authorized_create_detail([rcv], bundle)
         data["user"] = request.user
 
@@ -393,6 +565,23 @@ class SuiteSelectionResource(BaseSelectionResource):
         ordering = ["runs"]
 
 
+    fast_list = fl.FastList(
+        fl.Value("id"),
+        fl.Value("name"),
+        fl.Uri("resource_uri"),
+        fl.Uri("product", "product", ProductResource),
+        fl.ToMany("runs", "runs", RunResource),
+        fl.ToOne("created_by", "created_by", UserResource, USER_FIELDS),
+        fl.Value("suite_id", "id"),
+        fl.Value("case_count"),
+        fl.Value(
+            "filter_cases",
+            "id",
+            lambda pk: filter_url("manage_cases", Suite(pk=pk)),
+            ),
+        )
+
+
     def dehydrate(self, bundle):
         """Add some convenience fields to the return JSON."""
 
@@ -0,0 +1,169 @@
+"""
+Archiving the results of disabled runs to compressed files.
+
+Archiving a run moves its results, with their step results and latest-result
+pointers, out of the live tables into a gzipped newline-delimited JSON file
+(one per run, in the ``RUN_ARCHIVE_ROOT`` directory), a chunk of results at
+a time. The run's rollups are built first and frozen, so its completion and
+result summary (see ``Run.completion``) are still read from them. Restoring
+the run moves the rows back and thaws its rollups; activating the run again
+restores it first. Until then, results can't be recorded or exported for it.
+
+"""
+import gzip
+import json
+import os
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+
+from .models import Run, Result, StepResult, LatestResult, RunRollup
+
+
+
+# archived models, in the order their rows are written and restored
+MODELS = [Result, StepResult, LatestResult]
+
+
+
+def archive_path(run):
+    """Return path of the archive file for ``run``."""
+    return os.path.join(
+        settings.RUN_ARCHIVE_ROOT,
+        "run-{0}.ndjson.gz".format(getattr(run, "pk", run)),
+        )
+
+
+
+def is_archived(run):
+    """Return True if the results of ``run`` are archived."""
+    return RunRollup.objects.filter(run=run, frozen=True).exists()
+
+
+
+def archive_run(run, chunk_size=1000):
+    """
+    Move the results of disabled ``run`` to its archive file.
+
+    Returns the number of results archived. Raises ``ValueError`` if the run
+    isn't disabled, or is already archived.
+
+    """
+    if run.status != Run.STATUS.disabled:
+        raise ValueError("Run {0} is not disabled.".format(run.pk))
+    if is_archived(run):
+        raise ValueError("Run {0} is already archived.".format(run.pk))
+
+    if not os.path.isdir(settings.RUN_ARCHIVE_ROOT):
+        os.makedirs(settings.RUN_ARCHIVE_ROOT)
+    path = archive_path(run)
+    results = Result.everything.filter(runcaseversion__run=run).order_by(
+        "pk").values_list("pk", flat=True)
+    count = 0
+
+    with transaction.atomic():
+        # build the rollups from the live results, if need be, and keep them
+        RunRollup.get_for(run)
+        RunRollup.objects.filter(run=run).update(frozen=True)
+
+        fh = gzip.open(path + ".tmp", "wb")
+        try:
+            last = None
+            while True:
+                chunk = results if last is None else results.filter(
+                    pk__gt=last)
+                ids = list(chunk[:chunk_size])
+                if not ids:
+                    break
+                last = ids[-1]
+
+                _write(fh, Result, Result.everything.filter(pk__in=ids))
+                for model in MODELS[1:]:
+                    _write(
+                        fh, model, model._base_manager.filter(result__in=ids))
+                for model in reversed(MODELS):
+                    _delete(model, ids)
+                count += len(ids)
+            fh.close()
+            os.rename(path + ".tmp", path)
+        except Exception:
+            fh.close()
+            os.remove(path + ".tmp")
+            raise
+
+    return count
+
+
+
+def restore_run(run, chunk_size=1000):
+    """
+    Move the archived results of ``run`` back to the live tables.
+
+    Returns the number of results restored. Raises ``ValueError`` if the run
+    isn't archived.
+
+    """
+    if not is_archived(run):
+        raise ValueError("Run {0} is not archived.".format(run.pk))
+
+    path = archive_path(run)
+    by_table = dict((m._meta.db_table, m) for m in MODELS)
+    count = 0
+
+    with transaction.atomic():
+        fh = gzip.open(path, "rb")
+        try:
+            model = None
+            batch = []
+            for line in fh:
+                data = json.loads(line)
+                row_model = by_table[data["table"]]
+                if row_model is not model or len(batch) >= chunk_size:
+                    _insert(model, batch)
+                    model = row_model
+                    batch = []
+                batch.append(model(**data["row"]))
+                if model is Result:
+                    count += 1
+            _insert(model, batch)
+        finally:
+            fh.close()
+
+        RunRollup.objects.filter(run=run).update(frozen=False)
+
+    os.remove(path)
+    return count
+
+
+
+def _write(fh, model, queryset):
+    """Write a line to ``fh`` for each row of ``queryset``."""
+    table = model._meta.db_table
+    for row in queryset.values():
+        fh.write(
+            json.dumps({"table": table, "row": row}, cls=DjangoJSONEncoder))
+        fh.write("\n")
+
+
+
+def _delete(model, result_ids):
+    """Delete rows of ``model`` that are, or belong to, given results."""
+    column = "id" if model is Result else "result_id"
+    qn = connection.ops.quote_name
+    cursor = connection.cursor()
+    cursor.execute(
+        "DELETE FROM {0} WHERE {1} IN ({2})".format(
+            qn(model._meta.db_table),
+            qn(column),
+            ", ".join(["%s"] * len(result_ids)),
+            ),
+        result_ids,
+        )
+
+
+
+def _insert(model, objs):
+    """Insert ``objs`` of ``model`` (with their ids)."""
+    if objs:
+        model._base_manager.bulk_create(objs)
@@ -0,0 +1,413 @@
+"""
+Recording a large batch of results in a few queries.
+
+"""
+from collections import defaultdict
+import json
+
+from django.db import DatabaseError, transaction
+from django.db.models import Q
+
+from ..environments.models import Environment
+from ..library.models import CaseStep
+from ..mtmodel import MTModel, ConcurrencyError, utcnow
+from .models import (
+    Run, RunCaseVersion, RunRollup, Result, StepResult, LatestResult,
+    ResultUpload)
+
+
+
+# statuses that can be submitted
+RESULT_STATUSES = [
+    Result.STATUS.passed,
+    Result.STATUS.failed,
+    Result.STATUS.invalidated,
+    Result.STATUS.blocked,
+    Result.STATUS.skipped,
+    ]
+
+# max rows per INSERT statement
+BATCH_SIZE = 1000
+
+
+
+def record_results(items, user, authorize=None):
+    """
+    Record a batch of results submitted by ``user``; return per-item outcomes.
+
+    Each of ``items`` is a dict like those accepted by the result API, with
+    required keys ``run_id``, ``case``, ``environment`` and ``status``, and
+    optional ``comment``, plus ``stepnumber`` and ``bug`` for failed results.
+    As with ``RunCaseVersion.result_skip``, a skipped result is recorded in
+    all of the runcaseversion's environments.
+
+    ``authorize``, if given, is called once per run with a queryset of the
+    runcaseversions to get results in that run, and should return True if
+    ``user`` may record those results.
+
+    Returns a list with a dict for each item: ``{"created": <num results>}``
+    if it was recorded, or ``{"error": <message>}`` if not. An item with an
+    error doesn't prevent the others from being recorded.
+
+    Doesn't manage transactions; callers should commit or roll back the
+    whole batch.
+
+    """
+    outcomes = [None] * len(items)
+
+    # index: (run_id, case_id, env_id)
+    keys = {}
+    for i, item in enumerate(items):
+        try:
+            status = item["status"]
+            key = (
+                int(item["run_id"]), int(item["case"]), int(item["environment"]))
+        except KeyError as e:
+            outcomes[i] = _error(
+                "bad result object data missing key: {0}".format(e))
+            continue
+        except (TypeError, ValueError) as e:
+            outcomes[i] = _error("bad result object data: {0}".format(e))
+            continue
+        if status in RESULT_STATUSES:
+            keys[i] = key
+        else:
+            outcomes[i] = _error("Unknown result status: {0}".format(status))
+
+    if not keys:
+        return outcomes
+
+    run_ids = set(k[0] for k in keys.values())
+    case_ids = set(k[1] for k in keys.values())
+    env_ids = set(k[2] for k in keys.values())
+
+    live_env_ids = set(
+        Environment.objects.filter(pk__in=env_ids).values_list("id", flat=True))
+    # runs still locking, or archived (with frozen rollups)
+    locking_run_ids = set()
+    archived_run_ids = set()
+    for run_id, is_locking in Run.objects.filter(
+            Q(is_locking=True) | Q(rollups__frozen=True),
+            pk__in=run_ids,
+            ).values_list("id", "is_locking").distinct():
+        if is_locking:
+            locking_run_ids.add(run_id)
+        else:
+            archived_run_ids.add(run_id)
+
+    # resolve all (run, case, env) triples to (rcv_id, cv_id) in one query
+    rcvs = {}
+    for run_id, case_id, env_id, rcv_id, cv_id in (
+            RunCaseVersion.environments.through.objects.filter(
+                runcaseversion__run__in=run_ids,
+                runcaseversion__caseversion__case__in=case_ids,
+                runcaseversion__deleted_on=None,
+                environment__in=env_ids,
+                ).values_list(
+                    "runcaseversion__run",
+                    "runcaseversion__caseversion__case",
+                    "environment",
+                    "runcaseversion",
+                    "runcaseversion__caseversion",
+                    )):
+        rcvs[(run_id, case_id, env_id)] = (rcv_id, cv_id)
+
+    # run_id: indexes of items that can be recorded
+    by_run = defaultdict(list)
+    for i, key in sorted(keys.items()):
+        run_id, case_id, env_id = key
+        if env_id not in live_env_ids:
+            outcomes[i] = _error(
+                "Specified environment does not exist: {0}".format(env_id))
+        elif key not in rcvs:
+            outcomes[i] = _error(
+                "RunCaseVersion not found for run: {0}, case: {1}, "
+                "environment: {2}".format(*key))
+        elif run_id in locking_run_ids:
+            outcomes[i] = _error(
+                "Run {0} is still being prepared for testing; results can "
+                "be reported once it is ready.".format(run_id))
+        elif run_id in archived_run_ids:
+            outcomes[i] = _error(
+                "Run {0} is archived; results can be reported once it is "
+                "activated again.".format(run_id))
+        else:
+            by_run[run_id].append(i)
+
+    if authorize is not None:
+        for run_id, indexes in by_run.items():
+            rcv_ids = [rcvs[keys[i]][0] for i in indexes]
+            if not authorize(RunCaseVersion.objects.filter(pk__in=rcv_ids)):
+                for i in indexes:
+                    outcomes[i] = _error(
+                        "Not authorized to report results for run {0}.".format(
+                            run_id))
+                del by_run[run_id]
+
+    accepted = sorted(i for indexes in by_run.values() for i in indexes)
+    if not accepted:
+        return outcomes
+
+    # all environments of runcaseversions being skipped
+    skip_envs = defaultdict(list)
+    skip_rcv_ids = [
+        rcvs[keys[i]][0] for i in accepted
+        if items[i]["status"] == Result.STATUS.skipped
+        ]
+    if skip_rcv_ids:
+        for rcv_id, env_id in RunCaseVersion.environments.through.objects.filter(
+                runcaseversion__in=skip_rcv_ids,
+                environment__deleted_on=None,
+                ).values_list("runcaseversion", "environment"):
+            skip_envs[rcv_id].append(env_id)
+
+    # (caseversion_id, step number): step_id for failed steps
+    steps = {}
+    step_keys = set()
+    for i in accepted:
+        if (items[i]["status"] == Result.STATUS.failed and
+                items[i].get("stepnumber") is not None):
+            try:
+                step_keys.add((rcvs[keys[i]][1], int(items[i]["stepnumber"])))
+            except (TypeError, ValueError):
+                pass
+    if step_keys:
+        for step_id, cv_id, number in CaseStep.objects.filter(
+                caseversion__in=set(k[0] for k in step_keys),
+                number__in=set(k[1] for k in step_keys),
+                ).values_list("id", "caseversion", "number"):
+            steps[(cv_id, number)] = step_id
+
+    now = utcnow()
+    results = []
+    # (result, step_id, bug_url) for each new failed result
+    failures = []
+    for i in accepted:
+        item = items[i]
+        rcv_id, cv_id = rcvs[keys[i]]
+        status = item["status"]
+        if status == Result.STATUS.skipped:
+            envs = skip_envs[rcv_id]
+        else:
+            envs = [keys[i][2]]
+        for env_id in envs:
+            result = Result(
+                runcaseversion_id=rcv_id,
+                environment_id=env_id,
+                tester=user,
+                status=status,
+                comment=item.get("comment") or "",
+                created_on=now,
+                created_by=user,
+                modified_on=now,
+                modified_by=user,
+                )
+            results.append(result)
+            if status == Result.STATUS.failed:
+                try:
+                    step_id = steps.get((cv_id, int(item.get("stepnumber"))))
+                except (TypeError, ValueError):
+                    step_id = None
+                failures.append((result, step_id, item.get("bug") or ""))
+        outcomes[i] = {"created": len(envs)}
+
+    # only the last new result for each rcv/env is the user's latest; and
+    # their previous latest results for those rcv/envs no longer are
+    pairs = set()
+    for result in reversed(results):
+        pair = (result.runcaseversion_id, result.environment_id)
+        result.is_latest = pair not in pairs
+        pairs.add(pair)
+    rcv_ids = set(p[0] for p in pairs)
+    env_ids = set(p[1] for p in pairs)
+    stale = [
+        result_id for result_id, rcv_id, env_id in LatestResult.objects.filter(
+            tester=user,
+            runcaseversion__in=rcv_ids,
+            environment__in=env_ids,
+            ).values_list("result", "runcaseversion", "environment")
+        if (rcv_id, env_id) in pairs
+        ]
+
+    _insert_results(results)
+    LatestResult.point_to_newest(user, rcv_ids, env_ids)
+    if stale:
+        Result.objects.filter(pk__in=stale).update(is_latest=False)
+
+    if failures:
+        _record_failures(failures, user, now)
+
+    RunRollup.invalidate(list(by_run))
+
+    return outcomes
+
+
+
+def _insert_results(results):
+    """
+    Insert new ``results`` in order; failed results get their ids set.
+
+    Other results are bulk-created, but bulk_create doesn't set ids, and
+    failed results need theirs for step results; so each failed result is
+    inserted on its own, between the batches of results around it.
+
+    """
+    pending = []
+    for result in results:
+        if result.status == Result.STATUS.failed:
+            Result.objects.bulk_create(pending, batch_size=BATCH_SIZE)
+            pending = []
+            # skip Result.save; callers maintain latest results and rollups
+            super(MTModel, result).save(force_insert=True)
+        else:
+            pending.append(result)
+    Result.objects.bulk_create(pending, batch_size=BATCH_SIZE)
+
+
+
+def _record_failures(failures, user, now):
+    """Create step results for, and touch the rcvs of, new failed results."""
+    failed_rcv_ids = set(f[0].runcaseversion_id for f in failures)
+
+    stepresults = []
+    for result, step_id, bug_url in failures:
+        if step_id is not None:
+            stepresults.append(
+                StepResult(
+                    result=result,
+                    step_id=step_id,
+                    status=StepResult.STATUS.failed,
+                    bug_url=bug_url,
+                    created_on=now,
+                    created_by=user,
+                    modified_on=now,
+                    modified_by=user,
+                    )
+                )
+    StepResult.objects.bulk_create(stepresults, batch_size=BATCH_SIZE)
+
+    # as in RunCaseVersion.result_fail
+    RunCaseVersion.objects.filter(pk__in=failed_rcv_ids).update(user=user)
+
+
+
+def ingest_stream(lines, user, chunk_size, authorize=None, upload_key=None):
+    """
+    Record results from newline-delimited JSON ``lines``; yield reports.
+
+    Each non-blank line is a result object as accepted by ``record_results``.
+    Lines are parsed as they are read from the ``lines`` iterable, and their
+    results committed every ``chunk_size`` lines, so only one chunk is held
+    in memory at a time. After each chunk is committed a report is yielded::
+
+        {"lines": [<first>, <last>], "created": <num results>,
+         "errors": [{"line": <number>, "error": <message>}, ...]}
+
+    followed by ``{"done": true, "lines": <total>, "created": <num results>}``
+    at the end of the stream. If a chunk can't be committed, its transaction
+    is rolled back and the stream abandoned with a final
+    ``{"lines": [<first>, <last>], "error": <message>}`` report.
+
+    If ``upload_key`` is given, progress is saved to the user's
+    ``ResultUpload`` with that key in the same transaction as each chunk, and
+    lines committed by an earlier upload with the same key are skipped (a
+    ``{"resumed": <lines skipped>}`` report is yielded first).
+
+    """
+    upload = None
+    skip = 0
+    if upload_key is not None:
+        upload, created = ResultUpload.objects.get_or_create(
+            user=user, key=upload_key)
+        skip = upload.lines
+        if skip:
+            yield {"resumed": skip}
+
+    total = 0
+    created = 0
+    chunk = []
+    for total, line in enumerate(lines, 1):
+        if total <= skip:
+            continue
+        chunk.append((total, line))
+        if len(chunk) >= chunk_size:
+            report = _ingest_chunk(chunk, user, authorize, upload)
+            yield report
+            if "error" in report:
+                return
+            created += report["created"]
+            chunk = []
+
+    if chunk:
+        report = _ingest_chunk(chunk, user, authorize, upload)
+        yield report
+        if "error" in report:
+            return
+        created += report["created"]
+
+    yield {"done": True, "lines": total, "created": created}
+
+
+
+def _ingest_chunk(numbered_lines, user, authorize, upload):
+    """Parse and commit one chunk of (line number, line) tuples; report."""
+    first, last = numbered_lines[0][0], numbered_lines[-1][0]
+    try:
+        return _commit_chunk(numbered_lines, user, authorize, upload)
+    except (ConcurrencyError, DatabaseError) as e:
+        return {"lines": [first, last], "error": str(e)}
+
+
+
+def _commit_chunk(numbered_lines, user, authorize, upload):
+    """Parse and commit one chunk, raising if it can't be committed."""
+    first, last = numbered_lines[0][0], numbered_lines[-1][0]
+    report = {"lines": [first, last], "created": 0, "errors": []}
+
+    items = []
+    numbers = []
+    for number, line in numbered_lines:
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except ValueError as e:
+            report["errors"].append(
+                {"line": number, "error": "bad JSON: {0}".format(e)})
+            continue
+        if not isinstance(item, dict):
+            report["errors"].append(
+                {"line": number, "error": "bad result object data: "
+                 "expected a JSON object"})
+            continue
+        items.append(item)
+        numbers.append(number)
+
+    with transaction.commit_on_success():
+        outcomes = record_results(items, user, authorize)
+        if upload is not None:
+            # only advance from where this chunk started; if another request
+            # got there first, roll back rather than record results twice
+            advanced = ResultUpload.objects.filter(
+                pk=upload.pk, lines=first - 1).update(
+                lines=last, modified_on=utcnow())
+            if not advanced:
+                raise ConcurrencyError(
+                    "Upload {0} was continued by another request.".format(
+                        upload.key))
+
+    for number, outcome in zip(numbers, outcomes):
+        if "error" in outcome:
+            report["errors"].append(
+                {"line": number, "error": outcome["error"]})
+        else:
+            report["created"] += outcome["created"]
+    report["errors"].sort(key=lambda e: e["line"])
+
+    return report
+
+
+
+def _error(message):
+    """Return outcome dict for an item that couldn't be recorded."""
+    return {"error": message}
@@ -0,0 +1,168 @@
+"""
+Exporting the results of a run, series or product version as CSV or NDJSON.
+
+Results are read in chunks of rows ordered by id, each chunk starting after
+the last id of the previous one (rather than at an offset), with the data of
+their run, case and tester joined in and their environments' elements looked
+up in bulk; so an export of any size is a series of cheap queries, and only
+one chunk is held in memory at a time.
+
+"""
+import csv
+import json
+
+from ..environments.models import Environment
+from .models import Result, RunRollup
+
+
+
+# columns of exported results, in order
+FIELDS = [
+    "id",
+    "run_id",
+    "run",
+    "case_id",
+    "caseversion_id",
+    "case",
+    "environment_id",
+    "environment",
+    "tester",
+    "status",
+    "comment",
+    "is_latest",
+    "created_on",
+    ]
+
+# field: values() column
+COLUMNS = {
+    "id": "id",
+    "run_id": "runcaseversion__run",
+    "run": "runcaseversion__run__name",
+    "case_id": "runcaseversion__caseversion__case",
+    "caseversion_id": "runcaseversion__caseversion",
+    "case": "runcaseversion__caseversion__name",
+    "environment_id": "environment",
+    "tester": "tester__username",
+    "status": "status",
+    "comment": "comment",
+    "is_latest": "is_latest",
+    "created_on": "created_on",
+    }
+
+
+
+def results_for(run=None, series=None, productversion=None):
+    """
+    Return queryset of results in a run, series or product version.
+
+    Exactly one of ``run``, ``series`` (a series run; results of its member
+    runs) or ``productversion`` should be given, as an instance or id.
+    Raises ``ValueError`` if the results of any of those runs are archived
+    (see ``moztrap.model.execution.archive``), as they'd be missing.
+
+    """
+    given = [
+        (k, v) for k, v in [
+            ("run", run),
+            ("run__series", series),
+            ("run__productversion", productversion),
+            ]
+        if v is not None
+        ]
+    if len(given) != 1:
+        raise ValueError(
+            "Give exactly one of run, series or productversion to export.")
+    lookup, value = given[0]
+
+    archived = sorted(set(
+        RunRollup.objects.filter(frozen=True, **{lookup: value}).values_list(
+            "run", flat=True)))
+    if archived:
+        raise ValueError(
+            "Results of run(s) {0} are archived; restore them to "
+            "export.".format(", ".join(str(r) for r in archived)))
+
+    return Result.objects.filter(
+        **{"runcaseversion__{0}".format(lookup): value})
+
+
+def iter_results(queryset, chunk_size):
+    """
+    Yield a dict of ``FIELDS`` for each result in ``queryset``, by id.
+
+    Results are read ``chunk_size`` at a time. ``environment`` is the names
+    of the environment's elements, sorted and comma-separated; ``created_on``
+    is in ISO 8601 format.
+
+    """
+    columns = [COLUMNS[f] for f in FIELDS if f in COLUMNS]
+    # environment id: label; bounded by the environments of the export
+    environments = {}
+    last = 0
+    while True:
+        rows = list(
+            queryset.filter(id__gt=last).order_by("id").values(
+                *columns)[:chunk_size])
+        if not rows:
+            return
+
+        new_env_ids = set(r["environment"] for r in rows) - set(environments)
+        if new_env_ids:
+            environments.update(_environment_labels(new_env_ids))
+
+        for row in rows:
+            result = dict((f, row[c]) for f, c in COLUMNS.items())
+            result["environment"] = environments.get(row["environment"], u"")
+            result["created_on"] = row["created_on"].isoformat()
+            yield result
+
+        last = rows[-1]["id"]
+
+
+def _environment_labels(env_ids):
+    """Return dict mapping environment ids to their elements' names."""
+    names = dict((env_id, []) for env_id in env_ids)
+    for env_id, name in Environment.elements.through.objects.filter(
+            environment__in=env_ids).values_list(
+                "environment", "element__name"):
+        names[env_id].append(name)
+    return dict(
+        (env_id, u", ".join(sorted(element_names)))
+        for env_id, element_names in names.items()
+        )
+
+
+
+class _Line(object):
+    """File-like object whose ``write`` just returns what was written."""
+    def write(self, value):
+        return value
+
+
+
+def csv_lines(results):
+    """Yield CSV lines: a header, then a line for each result dict."""
+    writer = csv.writer(_Line())
+    yield writer.writerow(FIELDS)
+    for result in results:
+        yield writer.writerow([_encoded(result[f]) for f in FIELDS])
+
+
+def _encoded(value):
+    """Return ``value`` as a UTF-8 encoded string for the csv module."""
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    return value
+
+
+def ndjson_lines(results):
+    """Yield a line with a JSON object for each result dict."""
+    for result in results:
+        yield json.dumps(result) + "\n"
+
+
+# format name: (line generator, content type)
+FORMATS = {
+    "csv": (csv_lines, "text/csv"),
+    "ndjson": (ndjson_lines, "application/x-ndjson"),
+    }
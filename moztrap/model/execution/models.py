@@ -3,14 +3,18 @@ Models for test execution (runs, results).
 
 """
 import datetime
+import itertools
+from collections import defaultdict
 
 from django.core.exceptions import ValidationError, ObjectDoesNotExist
 from django.db import connection, transaction, models
-from django.db.models import Q, Count, Max
+from django.db.models import Q, F, Count, Max
 
 from model_utils import Choices
 
-from ..mtmodel import MTModel, TeamModel, DraftStatusModel
+from ..mtmodel import (
+    MTModel, MTManager, MTQuerySet, TeamModel, DraftStatusModel, utcnow)
+from ..core import jobs
 from ..core.auth import User
 from ..core.models import ProductVersion
 from ..environments.models import Environment, HasEnvironmentsModel
@@ -18,6 +22,153 @@ from ..library.models import CaseVersion, Suite, CaseStep
 
 
 
+class ProgressQuerySet(MTQuerySet):
+    """
+    A queryset that can attach completion and result-summary data in bulk.
+
+    Objects from a ``with_progress()`` queryset are fetched in chunks, and
+    the progress data for each chunk is loaded with a fixed number of grouped
+    queries instead of several queries per object. Ordering by
+    ``completion`` is done in SQL.
+
+    Subclasses implement ``_attach_progress`` and ``_completion_sql``.
+
+    """
+    _with_progress = False
+    chunk_size = 100
+
+
+    def with_progress(self):
+        """Return a clone that attaches progress data to fetched objects."""
+        return self._clone(_with_progress=True)
+
+
+    def _clone(self, *args, **kwargs):
+        """Carry the ``with_progress`` flag over to clones."""
+        kwargs.setdefault("_with_progress", self._with_progress)
+        return super(ProgressQuerySet, self)._clone(*args, **kwargs)
+
+
+    def iterator(self):
+        """Yield objects, attaching progress data a chunk at a time."""
+        objs = super(ProgressQuerySet, self).iterator()
+        if not self._with_progress:
+            for obj in objs:
+                yield obj
+            return
+
+        while True:
+            chunk = list(itertools.islice(objs, self.chunk_size))
+            if not chunk:
+                break
+            self._attach_progress(chunk)
+            for obj in chunk:
+                yield obj
+
+
+    def order_by(self, *field_names):
+        """Order by given fields, allowing ``completion`` (computed in SQL)."""
+        if not any(f.lstrip("-") == "completion" for f in field_names):
+            return super(ProgressQuerySet, self).order_by(*field_names)
+
+        sql, params = self._completion_sql()
+        qs = self.extra(
+            select={"completion_order": sql}, select_params=params)
+        field_names = [
+            f.replace("completion", "completion_order")
+            if f.lstrip("-") == "completion" else f
+            for f in field_names
+            ]
+        return super(ProgressQuerySet, qs).order_by(*field_names)
+
+
+    def _attach_progress(self, objs):
+        """Load and attach progress data for the given list of objects."""
+        raise NotImplementedError()
+
+
+    def _completion_sql(self):
+        """Return (sql, params) for a completion fraction select column."""
+        raise NotImplementedError()
+
+
+
+class ProgressManager(MTManager):
+    """Manager for models with a ``ProgressQuerySet``."""
+    queryset_class = ProgressQuerySet
+
+
+    def with_progress(self):
+        """Return a queryset that attaches progress data to objects."""
+        return self.get_query_set().with_progress()
+
+
+
+class RunQuerySet(ProgressQuerySet):
+    """Attaches each run's whole-run ``RunRollup`` as its progress data."""
+    def _attach_progress(self, runs):
+        """Attach whole-run rollups to ``runs``."""
+        rollups = RunRollup.get_for_runs(runs)
+        for run in runs:
+            run._rollup = rollups[run.id]
+
+
+    def _completion_sql(self):
+        """
+        Completion fraction read from the whole-run rollup.
+
+        Only runs that have been read have rollups; for the rest, completion
+        is counted from the live tables (as ``RunRollup.rebuild`` would)
+        rather than building their rollups while ordering.
+
+        """
+        rollup = (
+            "FROM execution_runrollup as rr "
+            "WHERE rr.run_id = execution_run.id "
+            "AND rr.environment_id IS NULL"
+            )
+        pairs = (
+            "FROM execution_runcaseversion_environments as rce "
+            "INNER JOIN execution_runcaseversion as rcv "
+            "ON rcv.id = rce.runcaseversion_id "
+            "WHERE rcv.run_id = execution_run.id "
+            "AND rcv.deleted_on IS NULL "
+            )
+        latest = (
+            "FROM execution_latestresult as lr "
+            "INNER JOIN execution_result as r ON r.id = lr.result_id "
+            "WHERE r.deleted_on IS NULL "
+            )
+        completed_states = ", ".join(["%s"] * len(Result.COMPLETED_STATES))
+        sql = (
+            "COALESCE(CASE WHEN EXISTS (SELECT 1 " + rollup + ") THEN ("
+            "SELECT rr.completed * 1.0 / NULLIF(rr.total - rr.skipped, 0) "
+            + rollup +
+            ") ELSE ("
+            "SELECT COUNT(*) " + pairs +
+            "AND EXISTS (SELECT 1 " + latest +
+            "AND lr.runcaseversion_id = rce.runcaseversion_id "
+            "AND lr.environment_id = rce.environment_id "
+            "AND lr.status IN (" + completed_states + "))"
+            ") * 1.0 / NULLIF(("
+            "SELECT COUNT(*) " + pairs +
+            ") - ("
+            "SELECT COUNT(*) " + latest +
+            "AND lr.status = %s "
+            "AND lr.runcaseversion_id IN ("
+            "SELECT rcv.id FROM execution_runcaseversion as rcv "
+            "WHERE rcv.run_id = execution_run.id)"
+            "), 0) END, 0)"
+            )
+        return sql, Result.COMPLETED_STATES + [Result.STATUS.skipped]
+
+
+
+class RunManager(ProgressManager):
+    queryset_class = RunQuerySet
+
+
+
 class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
     """A test run."""
     productversion = models.ForeignKey(ProductVersion, related_name="runs")
@@ -28,12 +179,20 @@ class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
     build = models.TextField(null=True, blank=True)
     is_series = models.BooleanField(default=False)
     series = models.ForeignKey("self", null=True, blank=True)
+    # runcaseversions are being locked in by a background job
+    is_locking = models.BooleanField(default=False)
 
     caseversions = models.ManyToManyField(
         CaseVersion, through="RunCaseVersion", related_name="runs")
     suites = models.ManyToManyField(
         Suite, through="RunSuite", related_name="runs")
 
+    everything = RunManager(show_deleted=True)
+    objects = RunManager(show_deleted=False)
+
+    # max rows per statement when locking in runcaseversions
+    lock_batch_size = 1000
+
 
     def __unicode__(self):
         """Return unicode representation."""
@@ -68,6 +227,7 @@ class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
             "cascade", ["runsuites", "environments", "team"])
         overrides = kwargs.setdefault("overrides", {})
         overrides["status"] = self.STATUS.draft
+        overrides["is_locking"] = False
         overrides.setdefault("name", "Cloned: {0}".format(self.name))
         return super(Run, self).clone(*args, **kwargs)
 
@@ -81,6 +241,7 @@ class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
         overrides.setdefault("name", "{0} - Build: {1}".format(
             self.name, build))
         overrides["status"] = self.STATUS.draft
+        overrides["is_locking"] = False
         overrides.setdefault("is_series", False)
         overrides.setdefault("build", build)
         overrides.setdefault("series", self)
@@ -92,29 +253,44 @@ class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
 
 
     def activate(self, *args, **kwargs):
-        """Make run active, locking in runcaseversions for all suites."""
+        """
+        Make run active, locking in runcaseversions for all suites.
+
+        An archived run's results are restored first, to be tested again.
+
+        """
+        # archive imports this module
+        from .archive import is_archived, restore_run
+        if is_archived(self):
+            restore_run(self)
         if self.status == self.STATUS.draft:
-            self.update_case_versions()
+            self.update_case_versions(user=kwargs.get("user"))
         super(Run, self).activate(*args, **kwargs)
 
 
     def refresh(self, *args, **kwargs):
         """Update all the runcaseversions while the run is active."""
         if self.status == self.STATUS.active:
-            self.update_case_versions()
+            self.update_case_versions(user=kwargs.get("user"))
 
 
-    def update_case_versions(self):
+    def update_case_versions(self, user=None):
         """
         Update the runcaseversions with any changes to suites.
 
-        This can happen while the run is still active.
+        This can happen while the run is still active. If background jobs are
+        enabled, the run is marked as locking and the update is queued.
         """
         # we don't need all the runcaseversions for a series.  It is the
         # series member runs that will use them.  So only lock the caseversions
         # if this is NOT a series.
         if not self.is_series:
-            self._lock_case_versions()
+            if jobs.is_async():
+                self.is_locking = True
+                self.save(force_update=True, user=user)
+                jobs.enqueue(lock_run_case_versions, self.id, user=user)
+            else:
+                self._lock_case_versions()
 
 
     @transaction.commit_on_success
@@ -148,15 +324,20 @@ class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
                     INNER JOIN library_caseversion as cv
                         ON cv.case_id = sc.case_id
                         AND cv.productversion_id = r.productversion_id
-                    INNER JOIN library_caseversion_environments as cve
-                        ON cv.id = cve.caseversion_id
                 WHERE cv.status = 'active'
                     AND cv.deleted_on IS NULL
                     AND s.status = 'active'
                     AND rs.run_id = {0}
-                    AND cve.environment_id IN ({1})
+                    AND {1}
                 ORDER BY rs.order, sc.order
-                """.format(self.id, ",".join(map(str, run_env_ids)))
+                """.format(
+                    self.id,
+                    CaseVersion.effective_env_sql(
+                        "cv",
+                        "{{env}} IN ({0})".format(
+                            ",".join(map(str, run_env_ids))),
+                        ),
+                    )
             cursor.execute(sql)
 
             cv_list = [x[0] for x in cursor.fetchall()]
@@ -172,64 +353,36 @@ class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
         # delete rcvs that we won't be needing anymore
         self._delete_runcaseversions(cv_list)
 
-        # audit for duplicate rcvs for the same cv.id
-        dups = self.runcaseversions.values("caseversion_id").annotate(
-            num_records=Count("caseversion")).filter(num_records__gt=1)
-        if len(dups) > 0:
-            for dup in dups:
-                # get the runcaseversions, and sort descending by the id
-                # of the results.  So the first one is the one with the latest
-                # result.  We keep that one and delete the rest.
-                rcv_to_save = self.runcaseversions.annotate(
-                    latest_result=Max("results__id")).filter(
-                        caseversion=dup["caseversion_id"]).order_by(
-                            "-latest_result")[0]
-                self.runcaseversions.filter(
-                    caseversion=dup["caseversion_id"]).exclude(
-                        id=rcv_to_save.id).delete()
-
-        # remaining rcvs should be ones we want to keep, and we need to inject
-        # those ids into the insert/update list for bulk_insert.  So create
-        # a dict mapping cv_id: rcv_id.  If one exists, its order field will
-        # be updated in the build_update cmd.
-        existing_rcv_map = {}
-        for map_item in self.runcaseversions.values("id", "caseversion_id"):
-            existing_rcv_map[map_item["caseversion_id"]] = map_item["id"]
-
-        # build the list of rcvs that we DO need.  Be sure to include the ids
-        # for rcvs that already exist so that we will just be updating the
-        # order and not replacing it.  We will use a special manager that does
-        # an update on insert error.
+        # remaining rcvs should be ones we want to keep.  Map cv_id to the
+        # (rcv_id, order) of its rcv so we only update order where needed.
+        existing_rcv_map = self._dedupe_runcaseversions()
 
+        # rcv_id: new order for existing rcvs whose order has changed
+        rcv_orders_to_update = {}
         # runcaseversion objects we will use to bulk create
-        rcv_to_update = []
         rcv_proxies_to_create = []
 
-        order = 1
-        for cv in cv_list:
+        for order, cv in enumerate(cv_list, 1):
             if cv in existing_rcv_map:
-                # we will just update the order value
-                rcv_to_update.append({"caseversion_id": cv, "order": order})
+                rcv_id, old_order = existing_rcv_map[cv]
+                if old_order != order:
+                    rcv_orders_to_update[rcv_id] = order
             else:
                 # we need to create a new one
-                kwargs = {
-                    "run_id": self.id,
-                    "caseversion_id": cv,
-                    "order": order
-                    }
-                rcv_proxies_to_create.append(RunCaseVersion(**kwargs))
-            order += 1
-
-        # update existing rcvs
-        for rcv in rcv_to_update:
-            self.runcaseversions.filter(
-                caseversion=rcv["caseversion_id"]).update(order=rcv["order"])
+                rcv_proxies_to_create.append(
+                    RunCaseVersion(run_id=self.id, caseversion_id=cv, order=order))
+
+        # update order of existing rcvs
+        self._bulk_update_runcaseversion_order(rcv_orders_to_update)
 
         # insert these rcvs in bulk
         self._bulk_insert_new_runcaseversions(rcv_proxies_to_create)
 
         self._bulk_update_runcaseversion_environments_for_lock()
 
+        # the set of runcaseversion/environment pairs has changed
+        RunRollup.invalidate(self)
+
         self._lock_caseversions_complete()
 
 
@@ -239,66 +392,131 @@ class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
             permanent=True)
 
 
-    def _bulk_insert_new_runcaseversions(self, rcv_proxies):
-        """Hook to bulk-insert runcaseversions we know we DO need."""
-        self.runcaseversions.bulk_create(rcv_proxies)
+    def _dedupe_runcaseversions(self):
+        """
+        Delete duplicate rcvs for the same cv; return map of remaining rcvs.
 
+        Of several rcvs for the same caseversion, the one with the latest
+        result is kept.  Returns a dict mapping caseversion id to a tuple of
+        (runcaseversion id, order) for each remaining rcv.
 
-    def _bulk_update_runcaseversion_environments_for_lock(self):
         """
-        update runcaseversion_environment records with latest state.
+        rcv_map = {}
+        latest_result = {}
+        dup_ids = []
+        rows = self.runcaseversions.values(
+            "id", "caseversion_id", "order").annotate(
+                latest_result=Max("results__id"))
+        for row in rows:
+            cv_id = row["caseversion_id"]
+            if cv_id in rcv_map:
+                # keep whichever of the two has the later result
+                if row["latest_result"] > latest_result[cv_id]:
+                    dup_ids.append(rcv_map[cv_id][0])
+                else:
+                    dup_ids.append(row["id"])
+                    continue
+            rcv_map[cv_id] = (row["id"], row["order"])
+            latest_result[cv_id] = row["latest_result"]
+
+        if dup_ids:
+            RunCaseVersion.objects.filter(id__in=dup_ids).delete()
+
+        return rcv_map
+
+
+    def _bulk_update_runcaseversion_order(self, rcv_orders):
+        """
+        Set new order on existing runcaseversions, given rcv_id: order map.
 
-        Approach:
-          do another raw sql query to get all existing_rcv_envs for this run
-          existing_rcv_envs - needed_rcv_envs = list to delete (no longer needed)
-          needed_rcv_envs - existing_rcv_envs = list to create
-        build a list of RunCaseVersion_environment objects
-        and use bulk_create.
+        Uses one ``UPDATE ... SET order = CASE id ...`` statement per
+        ``lock_batch_size`` runcaseversions rather than one per rcv.
 
         """
+        items = sorted(rcv_orders.items())
+        cursor = connection.cursor()
+        for i in range(0, len(items), self.lock_batch_size):
+            batch = items[i:i + self.lock_batch_size]
+            sql = """UPDATE execution_runcaseversion
+                SET {0} = CASE id {1} END,
+                    modified_on = %s,
+                    modified_by_id = NULL,
+                    cc_version = cc_version + 1
+                WHERE id IN ({2})
+                """.format(
+                    connection.ops.quote_name("order"),
+                    " ".join(["WHEN %s THEN %s"] * len(batch)),
+                    ",".join(["%s"] * len(batch)),
+                    )
+            params = list(itertools.chain.from_iterable(batch))
+            params.append(utcnow())
+            params.extend(rcv_id for rcv_id, order in batch)
+            cursor.execute(sql, params)
 
-        # re-query all the rcvs (including newly created) for this run
-        final_rcvs = RunCaseVersion.objects.filter(run=self).select_related(
-            "caseversion").prefetch_related("caseversion__environments")
-
-        final_rcv_ids = [x.id for x in final_rcvs]
 
-        # runcaseversion_environments that were there prior to our changes
-        prev_rcv_envs_set = set(RunCaseVersion.environments.through.objects.filter(
-            runcaseversion_id__in=final_rcv_ids).values_list(
-                "runcaseversion_id", "environment_id"))
+    def _bulk_insert_new_runcaseversions(self, rcv_proxies):
+        """Hook to bulk-insert runcaseversions we know we DO need."""
+        self.runcaseversions.bulk_create(
+            rcv_proxies, batch_size=self.lock_batch_size)
 
-        # runcaseversion_environment objects we will use to bulk create
-        # loop through all cvs and fetch the env intersection with this run
-        needed_rcv_envs_tuples = []
-        run_env_ids = set(
-            self.environments.values_list("id", flat=True))
-        for rcv in final_rcvs:
-            case_env_ids = set([x.id for x in rcv.caseversion.environments.all()])
-            for env in run_env_ids.intersection(case_env_ids):
-                needed_rcv_envs_tuples.append((rcv.id, env))
-        needed_rcv_envs_set = set(needed_rcv_envs_tuples)
 
-        # get the set of rcv_envs we need to delete because they don't belong
-        # to the needed set.
-        delete_rcv_envs = prev_rcv_envs_set - needed_rcv_envs_set
-        if len(delete_rcv_envs):
-            delquery = Q()
-            for combo in delete_rcv_envs:
-                delquery = delquery | Q(
-                    **{"runcaseversion_id": combo[0],
-                       "environment_id": combo[1]})
-            RunCaseVersion.environments.through.objects.filter(delquery).delete()
+    def _bulk_update_runcaseversion_environments_for_lock(self):
+        """
+        update runcaseversion_environment records with latest state.
 
-        # get the set of rcv_envs we need to create that don't already exist
-        needed_rcv_envs_set = needed_rcv_envs_set - prev_rcv_envs_set
+        The environments each rcv needs are the (non-deleted) environments
+        its caseversion (see ``CaseVersion.effective_env_sql``) shares with
+        this run.  One statement deletes the rcv environment records that are
+        no longer needed, and another inserts the needed ones that don't exist
+        yet, both entirely in SQL.
 
-        # build all the objects to pass to bulk_create
-        needed_rcv_envs = [RunCaseVersion.environments.through(
-            runcaseversion_id=needed[0],
-            environment_id=needed[1]) for needed in needed_rcv_envs_set]
+        """
+        cursor = connection.cursor()
+
+        # environments each of this run's rcvs should have
+        needed = """FROM execution_runcaseversion as rcv
+                INNER JOIN library_caseversion as cv
+                    ON cv.id = rcv.caseversion_id
+                INNER JOIN execution_run_environments as re
+                    ON re.run_id = rcv.run_id
+                INNER JOIN environments_environment as e
+                    ON e.id = re.environment_id
+            WHERE rcv.deleted_on IS NULL
+                AND e.deleted_on IS NULL
+                AND """ + CaseVersion.effective_env_sql(
+                    "cv", "{env} = re.environment_id") + """
+            """
+
+        cursor.execute(
+            """DELETE FROM execution_runcaseversion_environments
+            WHERE runcaseversion_id IN (
+                SELECT id FROM execution_runcaseversion
+                WHERE run_id = %s AND deleted_on IS NULL
+                )
+                AND NOT EXISTS (
+                    SELECT 1 """ + needed + """
+                    AND rcv.id =
+                        execution_runcaseversion_environments.runcaseversion_id
+                    AND re.environment_id =
+                        execution_runcaseversion_environments.environment_id
+                )
+            """,
+            [self.id],
+            )
 
-        RunCaseVersion.environments.through.objects.bulk_create(needed_rcv_envs)
+        cursor.execute(
+            """INSERT INTO execution_runcaseversion_environments
+                (runcaseversion_id, environment_id)
+            SELECT rcv.id, re.environment_id """ + needed + """
+                AND rcv.run_id = %s
+                AND NOT EXISTS (
+                    SELECT 1 FROM execution_runcaseversion_environments as rce
+                    WHERE rce.runcaseversion_id = rcv.id
+                        AND rce.environment_id = re.environment_id
+                )
+            """,
+            [self.id],
+            )
 
 
     def _lock_caseversions_complete(self):
@@ -306,59 +524,40 @@ class Run(MTModel, TeamModel, DraftStatusModel, HasEnvironmentsModel):
         pass
 
 
+    def _get_rollup(self):
+        """Whole-run rollup; attached by ``with_progress`` or read fresh."""
+        try:
+            return self._rollup
+        except AttributeError:
+            return RunRollup.get_for(self)
+
+
     def result_summary(self):
         """Return a dict summarizing status of results."""
-        return result_summary(Result.objects.filter(runcaseversion__run=self))
+        rollup = self._get_rollup()
+        return dict((s, getattr(rollup, s)) for s in Result.COMPLETED_STATES)
 
 
     def completion(self):
-        """
-        Return fraction of case/env combos that have a completed result.
-
-        Have to specify deleted_on=None for the through, because the
-        default manager doesn't go through our MT model manager.
-        """
-        total = RunCaseVersion.environments.through.objects.filter(
-            runcaseversion__run=self,
-            runcaseversion__deleted_on=None,
-            ).count()
-        skipped = Result.objects.filter(
-            runcaseversion__run=self,
-            is_latest=True,
-            status=Result.STATUS.skipped).count()
-        completed = Result.objects.filter(
-            status__in=Result.COMPLETED_STATES,
-            is_latest=True,
-            runcaseversion__run=self).values(
-            "runcaseversion", "environment").distinct().count()
-
-        try:
-            return float(completed) / (total - skipped)
-        except ZeroDivisionError:
-            return 0
+        """Return fraction of case/env combos that have a completed result."""
+        return self._get_rollup().completion()
 
 
     def completion_single_env(self, env_id):
         """Return fraction of cases that have a completed result for an env."""
-        total = RunCaseVersion.objects.filter(
-            environments=env_id,
-            run=self).count()
-        skipped = Result.objects.filter(
-            runcaseversion__run=self,
-            environment=env_id,
-            is_latest=True,
-            status=Result.STATUS.skipped).count()
-        completed = Result.objects.filter(
-            status__in=Result.COMPLETED_STATES,
-            is_latest=True,
-            environment=env_id,
-            runcaseversion__run=self).values(
-            "runcaseversion", "environment").distinct().count()
+        return float(RunRollup.get_for(self, env_id).completion())
+
 
-        try:
-            return float(completed) / (total - skipped)
-        except ZeroDivisionError:
-            return 0.0
+
+def lock_run_case_versions(run_id):
+    """Background job to lock in the runcaseversions of run ``run_id``."""
+    try:
+        Run.objects.get(pk=run_id)._lock_case_versions()
+    finally:
+        # another lock of this run still to come keeps it marked locking
+        if not jobs.is_queued(lock_run_case_versions, run_id):
+            Run.everything.filter(pk=run_id).update(
+                is_locking=False, notrack=True)
 
 
 
@@ -367,11 +566,94 @@ def _environment_intersection(run, caseversion):
     run_env_ids = set(
         run.environments.values_list("id", flat=True))
     case_env_ids = set(
-        caseversion.environments.values_list("id", flat=True))
+        caseversion.effective_environments.values_list("id", flat=True))
     return run_env_ids.intersection(case_env_ids)
 
 
 
+def runcaseversion_progress(rcv_ids):
+    """
+    Return dict mapping each of ``rcv_ids`` to a dict of progress counts.
+
+    Each progress dict has the keys of ``RunRollup.COUNT_FIELDS``: ``total``
+    environments, ``completed`` environments with a latest completed result,
+    and the number of latest results in each status.
+
+    """
+    progress = dict(
+        (rcv_id, dict.fromkeys(RunRollup.COUNT_FIELDS, 0))
+        for rcv_id in rcv_ids
+        )
+    if not progress:
+        return progress
+
+    totals = RunCaseVersion.environments.through.objects.filter(
+        runcaseversion__in=rcv_ids,
+        environment__deleted_on=None,
+        ).values("runcaseversion").annotate(num=Count("id"))
+    for row in totals:
+        progress[row["runcaseversion"]]["total"] = row["num"]
+
+    latest = LatestResult.objects.filter(
+        runcaseversion__in=rcv_ids, result__deleted_on=None)
+
+    by_status = latest.values("runcaseversion", "result__status").annotate(
+        num=Count("id"))
+    for row in by_status:
+        progress[row["runcaseversion"]][row["result__status"]] = row["num"]
+
+    completed = latest.filter(
+        result__status__in=Result.COMPLETED_STATES).values(
+        "runcaseversion").annotate(num=Count("environment", distinct=True))
+    for row in completed:
+        progress[row["runcaseversion"]]["completed"] = row["num"]
+
+    return progress
+
+
+
+class RunCaseVersionQuerySet(ProgressQuerySet):
+    """Attaches progress counts to each runcaseversion."""
+    def _attach_progress(self, rcvs):
+        """Attach progress count dicts to ``rcvs``."""
+        progress = runcaseversion_progress([rcv.id for rcv in rcvs])
+        for rcv in rcvs:
+            rcv._progress = progress[rcv.id]
+
+
+    def _completion_sql(self):
+        """Completion fraction from correlated counts of envs and results."""
+        latest = (
+            "FROM execution_latestresult as lr "
+            "INNER JOIN execution_result as r ON r.id = lr.result_id "
+            "WHERE lr.runcaseversion_id = execution_runcaseversion.id "
+            "AND r.deleted_on IS NULL "
+            )
+        completed_states = ", ".join(["%s"] * len(Result.COMPLETED_STATES))
+        sql = (
+            "COALESCE(("
+            "SELECT COUNT(DISTINCT lr.environment_id) " + latest +
+            "AND r.status IN (" + completed_states + ")"
+            ") * 1.0 / NULLIF(("
+            "SELECT COUNT(*) "
+            "FROM execution_runcaseversion_environments as rce "
+            "INNER JOIN environments_environment as e "
+            "ON e.id = rce.environment_id "
+            "WHERE rce.runcaseversion_id = execution_runcaseversion.id "
+            "AND e.deleted_on IS NULL"
+            ") - ("
+            "SELECT COUNT(*) " + latest + "AND r.status = %s"
+            "), 0), 0)"
+            )
+        return sql, Result.COMPLETED_STATES + [Result.STATUS.skipped]
+
+
+
+class RunCaseVersionManager(ProgressManager):
+    queryset_class = RunCaseVersionQuerySet
+
+
+
 class RunCaseVersion(HasEnvironmentsModel, MTModel):
     """
     An ordered association between a Run and a CaseVersion.
@@ -385,6 +667,9 @@ class RunCaseVersion(HasEnvironmentsModel, MTModel):
     caseversion = models.ForeignKey(CaseVersion, related_name="runcaseversions")
     order = models.IntegerField(default=0, db_index=True)
 
+    everything = RunCaseVersionManager(show_deleted=True)
+    objects = RunCaseVersionManager(show_deleted=False)
+
 
     def __unicode__(self):
         """Return unicode representation."""
@@ -422,32 +707,52 @@ class RunCaseVersion(HasEnvironmentsModel, MTModel):
         if adding and inherit_envs:
             self.environments.add(
                 *_environment_intersection(self.run, self.caseversion))
+            RunRollup.invalidate(self.run_id)
 
         return ret
 
 
+    @classmethod
+    def _add_envs(cls, objs, envs):
+        """Add environments to runcaseversions, dropping rollups."""
+        super(RunCaseVersion, cls)._add_envs(objs, envs)
+        RunRollup.invalidate(
+            Run._base_manager.filter(runcaseversions__in=objs))
+
+
+    @classmethod
+    def _remove_envs(cls, objs, envs):
+        """Remove environments from runcaseversions, dropping rollups."""
+        super(RunCaseVersion, cls)._remove_envs(objs, envs)
+        RunRollup.invalidate(
+            Run._base_manager.filter(runcaseversions__in=objs))
+
+
+    def _get_progress(self):
+        """Progress counts; attached by ``with_progress`` or read fresh."""
+        try:
+            return self._progress
+        except AttributeError:
+            return runcaseversion_progress([self.id])[self.id]
+
+
     def result_summary(self):
         """Return a dict summarizing status of results."""
-        return result_summary(self.results.values())
+        progress = self._get_progress()
+        return dict((s, progress[s]) for s in Result.COMPLETED_STATES)
 
 
     def completion(self):
         """Return fraction of environments that have a completed result."""
-        total = self.environments.count()
-        skipped = self.results.filter(
-            is_latest=True,
-            status=Result.STATUS.skipped).count()
-        completed = self.results.filter(
-            is_latest=True,
-            status__in=Result.COMPLETED_STATES).values(
-            "environment").distinct().count()
-
+        progress = self._get_progress()
         try:
-            return float(completed) / (total - skipped)
+            return float(progress["completed"]) / (
+                progress["total"] - progress["skipped"])
         except ZeroDivisionError:
             return 0
 
 
+
     def testers(self):
         """Return list of testers with assigned / executed results."""
         return User.objects.filter(
@@ -460,11 +765,11 @@ class RunCaseVersion(HasEnvironmentsModel, MTModel):
         # for ALL envs, not just this one.
         envs = [environment]
         try:
-            latest = self.results.get(
-                is_latest=True,
+            latest = self.latest_results.select_related("result").get(
                 tester=user,
                 environment=environment,
-                )
+                result__deleted_on=None,
+                ).result
             if latest.status == Result.STATUS.skipped:
                 envs = self.environments.all()
         except ObjectDoesNotExist:
@@ -582,6 +887,8 @@ class RunSuite(MTModel):
     RunCaseVersions (and in what order) are created when the run is activated.
 
     """
+    bulk_clone = True
+
     run = models.ForeignKey(Run, related_name="runsuites")
     suite = models.ForeignKey(Suite, related_name="runsuites")
     order = models.IntegerField(default=0, db_index=True)
@@ -632,6 +939,7 @@ class Result(MTModel):
 
     class Meta:
         permissions = [("review_results", "Can review/edit test results.")]
+        index_together = [("runcaseversion", "environment", "tester")]
 
 
     def bug_urls(self):
@@ -643,23 +951,64 @@ class Result(MTModel):
 
 
     def save(self, *args, **kwargs):
+        """
+        Save this result, keeping the run's ``RunRollup`` counts current.
+
+        A new result becomes the latest for its tester/runcaseversion/env, and
+        the rollup is adjusted by the difference; any other change to an
+        existing result invalidates the rollup for its run.
+
+        """
         if self.pk is None:
-            self.set_latest()
-        super(Result, self).save(*args, **kwargs)
+            with transaction.atomic():
+                # Serialize new results for the runcaseversion, so that of two
+                # testers' concurrent results, the later one sees the earlier
+                # as previous; a locking read sees it even if this
+                # transaction's snapshot is older.
+                list(RunCaseVersion.everything.select_for_update().filter(
+                    pk=self.runcaseversion_id).values_list("id", flat=True))
+                previous = list(
+                    LatestResult.objects.select_for_update().filter(
+                        runcaseversion=self.runcaseversion_id,
+                        environment=self.environment_id,
+                        result__deleted_on=None,
+                        ).values_list("tester", "result", "result__status")
+                    )
+                self.is_latest = True
+                super(Result, self).save(*args, **kwargs)
+                self.set_latest(
+                    [r for (t, r, s) in previous if t == self.tester_id])
+                RunRollup.record(self, [(t, s) for (t, r, s) in previous])
+        else:
+            super(Result, self).save(*args, **kwargs)
+            LatestResult.objects.filter(result=self).exclude(
+                status=self.status).update(status=self.status)
+            RunRollup.invalidate(self.runcaseversion.run_id)
 
 
-    def set_latest(self):
+    def set_latest(self, displaced=None):
         """
-        Set this result to latest, and unset all others with this env/user/rcv
+        Make this (saved) result the latest for its env/user/rcv.
+
+        Points the tester's ``LatestResult`` for the runcaseversion/env here,
+        and unsets ``is_latest`` on the result it pointed to before (or on the
+        given ``displaced`` result ids, if already known).
 
         """
+        if displaced is None:
+            displaced = list(
+                LatestResult.objects.filter(
+                    runcaseversion=self.runcaseversion_id,
+                    environment=self.environment_id,
+                    tester=self.tester_id,
+                    ).values_list("result", flat=True)
+                )
 
-        Result.objects.filter(
-            tester=self.tester,
-            runcaseversion=self.runcaseversion,
-            environment=self.environment,
-            is_latest=True,
-            ).exclude(pk=self.pk).update(is_latest=False)
+        LatestResult.point_to(self)
+
+        displaced = [r for r in displaced if r != self.pk]
+        if displaced:
+            Result.objects.filter(pk__in=displaced).update(is_latest=False)
 
         self.is_latest = True
 
@@ -681,25 +1030,388 @@ class StepResult(MTModel):
         return "%s (%s: %s)" % (self.result, self.step, self.status)
 
 
+class RunRollup(models.Model):
+    """
+    Denormalized per-environment result counts for a run.
+
+    There is one row per run/environment, plus one row with no environment
+    holding the totals for the whole run. ``total`` is the number of
+    runcaseversion/environment pairs in the run, ``completed`` the number of
+    those pairs having a latest result in a completed state, and each status
+    column counts latest results in that status.
+
+    Rows are adjusted incrementally as results are recorded. Changes the
+    deltas can't account for (environments or runcaseversions changing,
+    results edited or deleted) drop a run's rows instead, and they are rebuilt
+    from scratch the next time they're read.
+
+    The rows of a run whose results are archived (see
+    ``moztrap.model.execution.archive``) are ``frozen``: they can't be
+    rebuilt from the live tables, so they are never dropped.
 
-def result_summary(results):
     """
-    Given a queryset of results, return a dict summarizing their states.
+    run = models.ForeignKey(Run, related_name="rollups")
+    environment = models.ForeignKey(
+        Environment, related_name="+", blank=True, null=True)
 
+    total = models.IntegerField(default=0)
+    completed = models.IntegerField(default=0)
+
+    assigned = models.IntegerField(default=0)
+    started = models.IntegerField(default=0)
+    passed = models.IntegerField(default=0)
+    failed = models.IntegerField(default=0)
+    invalidated = models.IntegerField(default=0)
+    blocked = models.IntegerField(default=0)
+    skipped = models.IntegerField(default=0)
+
+    frozen = models.BooleanField(default=False)
+
+    COUNT_FIELDS = [
+        "total", "completed", "assigned", "started", "passed", "failed",
+        "invalidated", "blocked", "skipped",
+        ]
+
+
+    class Meta:
+        unique_together = [("run", "environment")]
+
+
+    def __unicode__(self):
+        """Return unicode representation."""
+        return "Rollup for run %s, environment %s" % (
+            self.run_id, self.environment_id)
+
+
+    def completion(self):
+        """Return fraction of non-skipped case/env combos completed."""
+        try:
+            return float(self.completed) / (self.total - self.skipped)
+        except ZeroDivisionError:
+            return 0
+
+
+    @classmethod
+    def get_for(cls, run, environment=None):
+        """
+        Return the rollup for ``run`` and ``environment`` (None for all).
+
+        Builds the run's rollups if they don't exist yet. If the run has no
+        rollup for the given environment, an unsaved empty one is returned.
+
+        """
+        run_id = getattr(run, "pk", run)
+        env_id = getattr(environment, "pk", environment)
+
+        rollups = list(cls.objects.filter(run=run_id))
+        if not rollups:
+            rollups = cls.rebuild(run_id)
+
+        for rollup in rollups:
+            if rollup.environment_id == env_id:
+                return rollup
+        return cls(run_id=run_id, environment_id=env_id)
+
+
+    @classmethod
+    def get_for_runs(cls, runs):
+        """
+        Return dict mapping run id to whole-run rollup for each of ``runs``.
+
+        Rollups are read in one query; runs lacking them are built.
+
+        """
+        run_ids = set(getattr(run, "pk", run) for run in runs)
+        rollups = dict(
+            (rollup.run_id, rollup) for rollup in cls.objects.filter(
+                run__in=run_ids, environment__isnull=True)
+            )
+        for run_id in run_ids.difference(rollups):
+            rollups[run_id] = [
+                r for r in cls.rebuild(run_id) if r.environment_id is None][0]
+        return rollups
+
+
+    @classmethod
+    def rebuild(cls, run):
+        """
+        Recompute and save all rollups for ``run``; return them.
+
+        Not for runs with frozen rollups, whose results are archived.
+
+        """
+        run_id = getattr(run, "pk", run)
+
+        with transaction.atomic():
+            # Concurrent first reads of a run both rebuild it; serialize them
+            # on the run's row. The unique index can't catch duplicate
+            # run-wide rollups, as their environment is NULL.
+            list(Run.everything.select_for_update().filter(
+                pk=run_id).values_list("id", flat=True))
+            return cls._build(run_id)
+
+
+    @classmethod
+    def _build(cls, run_id):
+        """Replace the rollups for ``run_id`` with recomputed ones."""
+        cls.objects.filter(run=run_id).delete()
+
+        rollups = {}
+
+        def rollup(env_id):
+            if env_id not in rollups:
+                rollups[env_id] = cls(run_id=run_id, environment_id=env_id)
+            return rollups[env_id]
+
+        # The through table's manager doesn't hide deleted runcaseversions.
+        totals = RunCaseVersion.environments.through.objects.filter(
+            runcaseversion__run=run_id,
+            runcaseversion__deleted_on=None,
+            ).values("environment").annotate(num=Count("id"))
+        for row in totals:
+            rollup(row["environment"]).total = row["num"]
+
+        latest = LatestResult.objects.filter(
+            runcaseversion__run=run_id, result__deleted_on=None)
+
+        by_status = latest.values("environment", "result__status").annotate(
+            num=Count("id"))
+        for row in by_status:
+            setattr(
+                rollup(row["environment"]), row["result__status"], row["num"])
+
+        completed = latest.filter(
+            result__status__in=Result.COMPLETED_STATES).values(
+            "environment").annotate(
+            num=Count("runcaseversion", distinct=True))
+        for row in completed:
+            rollup(row["environment"]).completed = row["num"]
+
+        run_rollup = cls(run_id=run_id, environment_id=None)
+        for field in cls.COUNT_FIELDS:
+            setattr(
+                run_rollup,
+                field,
+                sum(getattr(r, field) for r in rollups.values()),
+                )
+        rollups[None] = run_rollup
+
+        cls.objects.bulk_create(rollups.values())
+        return rollups.values()
+
+
+    @classmethod
+    def record(cls, result, previous):
+        """
+        Adjust rollups for newly-saved ``result``.
+
+        ``previous`` is a list of (tester id, status) tuples for the results
+        that were latest for the result's runcaseversion/environment before
+        ``result`` was saved.
+
+        """
+        deltas = defaultdict(int)
+
+        others_completed = False
+        was_completed = False
+        for tester_id, status in previous:
+            if status in Result.COMPLETED_STATES:
+                was_completed = True
+            if tester_id == result.tester_id:
+                deltas[status] -= 1
+            elif status in Result.COMPLETED_STATES:
+                others_completed = True
+        deltas[result.status] += 1
+
+        is_completed = (
+            others_completed or result.status in Result.COMPLETED_STATES)
+        deltas["completed"] = int(is_completed) - int(was_completed)
+
+        updates = dict(
+            (field, F(field) + delta)
+            for field, delta in deltas.items() if delta
+            )
+        if not updates:
+            return
+
+        run_id = result.runcaseversion.run_id
+        if not cls.objects.filter(
+                run=run_id, environment=result.environment_id).exists():
+            # the run's rollups (if any) don't cover this environment; they
+            # are rebuilt with it when next read
+            cls.invalidate(run_id)
+            return
+
+        cls.objects.filter(run=run_id).filter(
+            Q(environment=result.environment_id) | Q(environment__isnull=True)
+            ).update(**updates)
+
+
+    @classmethod
+    def invalidate(cls, runs):
+        """
+        Drop the (unfrozen) rollups for the given run(s).
+
+        ``runs`` may be a run, run id, or an iterable or queryset of runs.
+
+        """
+        if isinstance(runs, (Run, int, long)):
+            cls.objects.filter(run=runs, frozen=False).delete()
+        else:
+            cls.objects.filter(run__in=runs, frozen=False).delete()
+
+
+
+class LatestResult(models.Model):
     """
-    states = Result.COMPLETED_STATES
+    Pointer to a tester's latest result for a runcaseversion/environment.
 
-    result_ids = results.filter(is_latest=True).values_list("id", flat=True)
+    There is at most one row per runcaseversion/environment/tester, upserted
+    as each new result is saved, so readers of latest results can use this
+    table's unique index instead of scanning ``execution_result`` for
+    ``is_latest`` rows, and recording a result doesn't need a range update
+    on ``execution_result``. ``Result.is_latest`` is still kept in step (by
+    primary key) for the API and existing queries.
 
-    if not result_ids:
-        return dict((s, 0) for s in states)
+    ``status`` is a copy of the result's status, so the current status of a
+    runcaseversion in an environment can be read from this table's
+    (runcaseversion, environment, result, status) index alone.
 
-    cols = ["COUNT(CASE WHEN status=%s THEN 1 ELSE NULL END)"] * len(states)
-    sql = "SELECT {0} FROM {1} WHERE id IN ({2})".format(
-        ",".join(cols), Result._meta.db_table, ",".join(map(str, result_ids))
+    """
+    runcaseversion = models.ForeignKey(
+        RunCaseVersion, related_name="latest_results")
+    environment = models.ForeignKey(Environment, related_name="+")
+    tester = models.ForeignKey(User, related_name="+")
+    result = models.ForeignKey(Result, related_name="latest_for")
+    status = models.CharField(max_length=50, choices=Result.STATUS)
+
+
+    class Meta:
+        unique_together = [("runcaseversion", "environment", "tester")]
+        index_together = [
+            ("runcaseversion", "environment", "result", "status")]
+
+
+    def __unicode__(self):
+        """Return unicode representation."""
+        return u"Latest result {0}".format(self.result_id)
+
+
+    # On a duplicate key, only move to a newer result: never point back to an
+    # older one if a newer one got there first. (MySQL applies assignments in
+    # order, so status is compared against the old result_id.)
+    UPSERT = (
+        "ON DUPLICATE KEY UPDATE "
+        "execution_latestresult.status = IF("
+        "VALUES(result_id) >= execution_latestresult.result_id, "
+        "VALUES(status), execution_latestresult.status), "
+        "execution_latestresult.result_id = GREATEST("
+        "execution_latestresult.result_id, VALUES(result_id))"
         )
 
-    cursor = connection.cursor()
-    cursor.execute(sql, states)
 
-    return dict(zip(states, cursor.fetchone()))
+    @classmethod
+    def point_to(cls, result):
+        """Upsert the pointer for ``result``'s rcv/env/tester to it."""
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO execution_latestresult "
+            "(runcaseversion_id, environment_id, tester_id, result_id, "
+            "status) "
+            "VALUES (%s, %s, %s, %s, %s) " + cls.UPSERT,
+            [
+                result.runcaseversion_id,
+                result.environment_id,
+                result.tester_id,
+                result.pk,
+                result.status,
+                ],
+            )
+
+
+    @classmethod
+    def point_to_newest(cls, tester, rcv_ids, env_ids):
+        """
+        Upsert pointers to ``tester``'s newest results in the given rcvs/envs.
+
+        For use after results have been bulk-created, when their ids aren't
+        known.
+
+        """
+        if not rcv_ids or not env_ids:
+            return
+        cursor = connection.cursor()
+        cursor.execute(
+            "INSERT INTO execution_latestresult "
+            "(runcaseversion_id, environment_id, tester_id, result_id, "
+            "status) "
+            "SELECT r.runcaseversion_id, r.environment_id, r.tester_id, "
+            "r.id, r.status FROM execution_result as r "
+            "INNER JOIN ("
+            "SELECT MAX(id) as id FROM execution_result "
+            "WHERE tester_id = %s "
+            "AND runcaseversion_id IN ({0}) "
+            "AND environment_id IN ({1}) "
+            "GROUP BY runcaseversion_id, environment_id"
+            ") as newest ON newest.id = r.id ".format(
+                ", ".join(["%s"] * len(rcv_ids)),
+                ", ".join(["%s"] * len(env_ids)),
+                ) + cls.UPSERT,
+            [getattr(tester, "pk", tester)] + list(rcv_ids) + list(env_ids),
+            )
+
+
+    @classmethod
+    def current_status_sql(cls):
+        """
+        Return SQL selecting the current status of a rcv in an environment.
+
+        The current status is that of the newest non-pending latest result by
+        any tester. The SQL is correlated with ``execution_runcaseversion``
+        and takes the environment id and pending statuses as parameters (see
+        ``current_status_params``). It only reads the (runcaseversion,
+        environment, result, status) index, newest result first.
+
+        """
+        return (
+            "SELECT lr.status FROM execution_latestresult as lr "
+            "WHERE lr.runcaseversion_id = execution_runcaseversion.id "
+            "AND lr.environment_id = %s "
+            "AND lr.status NOT IN ({0}) "
+            "ORDER BY lr.result_id DESC LIMIT 1".format(
+                ", ".join(["%s"] * len(Result.PENDING_STATES)))
+            )
+
+
+    @classmethod
+    def current_status_params(cls, environment):
+        """Return params for ``current_status_sql`` in ``environment``."""
+        return [getattr(environment, "pk", environment)] + list(
+            Result.PENDING_STATES)
+
+
+
+class ResultUpload(models.Model):
+    """
+    Progress of a streamed result upload, keyed by a client-supplied key.
+
+    ``lines`` is the number of lines of the upload whose results have been
+    committed; it is advanced in the same transaction as each chunk. If the
+    connection drops, the client can send the upload again with the same key
+    and the committed lines are skipped rather than recorded twice.
+
+    """
+    key = models.CharField(max_length=100)
+    user = models.ForeignKey(User, related_name="+")
+    lines = models.IntegerField(default=0)
+    created_on = models.DateTimeField(default=utcnow)
+    modified_on = models.DateTimeField(default=utcnow)
+
+
+    class Meta:
+        unique_together = [("user", "key")]
+
+
+    def __unicode__(self):
+        """Return unicode representation."""
+        return u"Upload {0} ({1} lines)".format(self.key, self.lines)
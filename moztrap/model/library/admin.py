@@ -68,6 +68,9 @@ class CaseVersionAdmin(MTModelAdmin):
             )
         ]
     raw_id_fields = ["case", "tags", "productversion"]
+    # only a narrowed caseversion stores its own environments, so the flag is
+    # set by narrowing them and cleared by this action
+    readonly_fields = MTModelAdmin.readonly_fields + ["envs_narrowed"]
     actions = ["remove_env_narrowing"]
 
 
@@ -7,6 +7,7 @@ from ..core.api import (ProductVersionResource, ProductResource,
 from .models import CaseVersion, Case, Suite, CaseStep, SuiteCase
 from ...model.core.models import ProductVersion
 from ..mtapi import MTResource, MTAuthorization
+from .. import fastlist as fl
 from ..environments.api import EnvironmentResource
 from ..tags.api import TagResource
 
@@ -217,8 +218,15 @@ class CaseVersionResource(MTResource):
     case = fields.ForeignKey(CaseResource, "case")
     steps = fields.ToManyField(
         CaseStepResource, "steps", full=True, readonly=True)
+    # an empty queryset (unlike a related manager) is falsy, so tastypie
+    # needs null=True to accept a caseversion with no environments
     environments = fields.ToManyField(
-        EnvironmentResource, "environments", full=True, readonly=True)
+        EnvironmentResource,
+        "effective_environments",
+        full=True,
+        readonly=True,
+        null=True,
+        )
     productversion = fields.ForeignKey(
         ProductVersionResource, "productversion")
     tags = fields.ToManyField(TagResource, "tags", full=True, readonly=True)
@@ -276,6 +284,22 @@ class CaseVersionResource(MTResource):
         return ["case", "productversion"]
 
 
+    def apply_filters(self, request, applicable_filters):
+        """Apply filters, matching environments as ``effective_env_q``."""
+        prefix = "effective_environments__"
+        env_filters = [
+            CaseVersion.effective_env_q(
+                key[len(prefix):], applicable_filters.pop(key))
+            for key in list(applicable_filters)
+            if key.startswith(prefix)
+            ]
+        object_list = super(CaseVersionResource, self).apply_filters(
+            request, applicable_filters)
+        if env_filters:
+            object_list = object_list.filter(*env_filters).distinct()
+        return object_list
+
+
     def obj_update(self, bundle, request=None, **kwargs):
         """Set the modified_by field for the object to the request's user,
         avoid ConcurrencyError by updating cc_version."""
@@ -317,10 +341,73 @@ class CaseVersionResource(MTResource):
 
 
 
+# fields of nested full=True resources, for FastList declarations
+USER_FIELDS = [fl.Value("id"), fl.Value("username")]
+TAG_FIELDS = [
+    fl.Value("id"),
+    fl.Value("name"),
+    fl.Value("description"),
+    fl.Uri("product", "product", ProductResource),
+    ]
+PRODUCTVERSION_FIELDS = [
+    fl.Value("id"),
+    fl.Value("version"),
+    fl.Value("codename"),
+    fl.Uri("product", "product", ProductResource),
+    ]
+
+
+
+def _productversion_name(product_name, version):
+    """Return ``ProductVersion.name`` given product name and version."""
+    return u"%s %s" % (product_name, version)
+
+
+
 class BaseSelectionResource(ModelResource):
-    """Adds filtering by negation for use with multi-select widget"""
+    """
+    Adds filtering by negation for use with multi-select widget.
+
+    If ``fast_list`` is set, list pages are serialized by that ``FastList``
+    from ``.values()`` rows instead of full Tastypie bundles; it must declare
+    the same output as the resource's fields and ``dehydrate``. Filtering,
+    ordering and pagination are still Tastypie's.
+
+    """
     #@@@ move this to mtapi.py when that code is merged in.
 
+    fast_list = None
+
+
+    def get_list(self, request, **kwargs):
+        """Return list page, serialized by ``fast_list`` if we have one."""
+        if self.fast_list is None:
+            return super(BaseSelectionResource, self).get_list(
+                request, **kwargs)
+
+        # as in ModelResource.get_list, bar the per-object full_dehydrate
+        base_bundle = self.build_bundle(request=request)
+        objects = self.obj_get_list(
+            bundle=base_bundle, **self.remove_api_resource_names(kwargs))
+        sorted_objects = self.apply_sorting(objects, options=request.GET)
+
+        paginator = self._meta.paginator_class(
+            request.GET,
+            sorted_objects,
+            resource_uri=self.get_resource_uri(),
+            limit=self._meta.limit,
+            max_limit=self._meta.max_limit,
+            collection_name=self._meta.collection_name,
+            )
+        to_be_serialized = paginator.page()
+
+        name = self._meta.collection_name
+        to_be_serialized[name] = self.fast_list.serialize(
+            self, to_be_serialized[name])
+        to_be_serialized = self.alter_list_data_to_serialize(
+            request, to_be_serialized)
+        return self.create_response(request, to_be_serialized)
+
     def apply_filters(self,
         request, applicable_filters, applicable_excludes={}):
         """Apply included and excluded filters to query."""
@@ -408,6 +495,23 @@ class CaseSelectionResource(BaseSelectionResource):
         ordering = ["id", "case", "modified_on", "name"]
 
 
+    fast_list = fl.FastList(
+        fl.Value("id"),
+        fl.Value("name"),
+        fl.Value("modified_on"),
+        fl.Uri("resource_uri"),
+        fl.Uri("case", "case", CaseResource),
+        fl.Uri("productversion", "productversion", ProductVersionResource),
+        fl.ToMany("tags", "tags", TagResource, TAG_FIELDS),
+        fl.ToOne("created_by", "created_by", UserResource, USER_FIELDS),
+        fl.ToOne("modified_by", "modified_by", UserResource, USER_FIELDS),
+        fl.Value("case_id", "case"),
+        fl.Value("product_id", "case__product"),
+        fl.Dict("product", [fl.Value("id", "case__product")]),
+        fl.Value("priority", "case__priority", unicode),
+        )
+
+
     def dehydrate(self, bundle):
         """Add some convenience fields to the return JSON."""
 
@@ -457,6 +561,32 @@ class CaseVersionSelectionResource(BaseSelectionResource):
         ordering = ["name"]
 
 
+    fast_list = fl.FastList(
+        fl.Value("id"),
+        fl.Value("name"),
+        fl.Value("latest"),
+        fl.Uri("resource_uri"),
+        fl.Uri("case", "case", CaseResource),
+        fl.ToOne(
+            "productversion",
+            "productversion",
+            ProductVersionResource,
+            PRODUCTVERSION_FIELDS,
+            ),
+        fl.ToMany("tags", "tags", TagResource, TAG_FIELDS),
+        fl.ToOne("created_by", "created_by", UserResource, USER_FIELDS),
+        fl.Value("case_id", "case"),
+        fl.Value("product_id", "case__product"),
+        fl.Dict("product", [fl.Value("id", "case__product")]),
+        fl.Value(
+            "productversion_name",
+            ("productversion__product__name", "productversion__version"),
+            _productversion_name,
+            ),
+        fl.Value("priority", "case__priority", unicode),
+        )
+
+
     def dehydrate(self, bundle):
         """Add some convenience fields to the return JSON."""
 
@@ -510,6 +640,32 @@ class CaseVersionSearchResource(BaseSelectionResource):
         ordering = ["name", "modified_on"]
 
 
+    fast_list = fl.FastList(
+        fl.Value("id"),
+        fl.Value("name"),
+        fl.Value("status"),
+        fl.Value("modified_on"),
+        fl.Uri("resource_uri"),
+        fl.Uri("case", "case", CaseResource),
+        fl.ToOne(
+            "productversion",
+            "productversion",
+            ProductVersionResource,
+            PRODUCTVERSION_FIELDS,
+            ),
+        fl.ToMany("tags", "tags", TagResource, TAG_FIELDS),
+        fl.ToOne("created_by", "created_by", UserResource, USER_FIELDS),
+        fl.ToOne("modified_by", "modified_by", UserResource, USER_FIELDS),
+        fl.Value("case_id", "case"),
+        fl.Value(
+            "productversion_name",
+            ("productversion__product__name", "productversion__version"),
+            _productversion_name,
+            ),
+        fl.Value("priority", "case__priority", unicode),
+        )
+
+
     def dehydrate(self, bundle):
         """Add some convenience fields to the return JSON."""
 
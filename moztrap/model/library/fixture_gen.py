@@ -74,9 +74,12 @@ def sample_cases():
             CaseStep.objects.create(
                 **dict(step_data, caseversion=cv, number=i, user=creator))
         # registration not translated into Mandarin yet?
-        for env in cv.environments.all():
-            if any([el.name == "Mandarin" for el in env.ordered_elements()]):
-                cv.environments.remove(env)
+        cv.remove_envs(
+            *[
+                env for env in cv.effective_environments
+                if any([el.name == "Mandarin" for el in env.ordered_elements()])
+                ]
+            )
 
     ff = Product.objects.get(name="Firefox")
     ff9 = ff.versions.get(version="9")
@@ -1,12 +1,25 @@
 """Importer for suites and cases from a dictionary."""
 
+from itertools import islice
 import json
+import uuid
 
-from django.db import transaction
+from django.db import models, transaction
+from django.db.models import Max, Q
 
 from ..core.auth import User
+from ..core.models import CacheGeneration
+from ..mtmodel import utcnow
 from ..tags.models import Tag
-from .models import Case, CaseVersion, CaseStep, Suite, SuiteCase
+from .models import (
+    Case, CaseVersion, CaseStep, Suite, SuiteCase, SearchToken)
+
+
+
+# max cases resolved and created together; also max rows per INSERT
+BATCH_SIZE = 1000
+
+IDPREFIX_LENGTH = Case._meta.get_field("idprefix").max_length
 
 
 
@@ -55,8 +68,8 @@ class Importer(object):
 
     """
 
-    @transaction.commit_on_success
-    def import_data(self, productversion, case_data, force_dupes=False):
+    def import_data(self, productversion, case_data, force_dupes=False,
+                    batch_size=None):
         """
         Import the top-level dictionary of cases and suites.
 
@@ -69,37 +82,81 @@ class Importer(object):
         * case_data -- a dictionary of cases and/or suites to be imported
         * force_dupes -- if True, will import cases with duplicate names.  If
           False, they will be skipped.
+        * batch_size -- if given, commit every ``batch_size`` cases; by
+          default the whole import is one transaction.
 
         """
 
         # the result object used to keep track of import status
         result = ImportResult()
 
+        for batch_result in self.import_batches(
+                productversion,
+                case_data.get("cases", []),
+                case_data.get("suites"),
+                force_dupes=force_dupes,
+                batch_size=batch_size,
+                ):
+            result.append(batch_result)
+
+        return result
+
+
+    def import_batches(self, productversion, cases, suites=None,
+                       force_dupes=False, batch_size=None):
+        """
+        Import cases (and suites) in transactions; yield an ImportResult each.
+
+        Keyword arguments:
+
+        * productversion -- The ProductVersion model object for which the
+          cases will be imported
+        * cases -- an iterable of case dictionaries; it's read one batch at
+          a time
+        * suites -- an optional list of suite dictionaries, created with the
+          first batch
+        * force_dupes -- if True, will import cases with duplicate names.  If
+          False, they will be skipped.
+        * batch_size -- the number of cases imported in each transaction; by
+          default all of them.
+
+        The result of each batch is yielded once it has been committed.
+
+        """
+
         # importer for suites.
-        suite_importer = None
-        if "suites" in case_data:
-            suite_importer = SuiteImporter(productversion.product)
-            suite_importer.add_dicts(case_data["suites"])
+        suite_importer = SuiteImporter(productversion.product)
+        if suites is not None:
+            suite_importer.add_dicts(suites)
+        case_importer = CaseImporter(productversion, suite_importer)
 
+        cases = iter(cases)
+        while True:
+            batch = list(islice(cases, batch_size))
 
-        # no reason why the data couldn't include ONLY suites.  So function
-        # gracefully if no cases.
-        if "cases" in case_data:
-            case_importer = CaseImporter(productversion, suite_importer)
-            result.append(case_importer.import_cases(
-                case_data["cases"],
-                force_dupes=force_dupes))
+            with transaction.commit_on_success():
+                result = case_importer.import_cases(
+                    batch, force_dupes=force_dupes)
 
-        # now create the suites and add cases to them
-        if suite_importer:
-            result.append(suite_importer.import_suites())
+                # no reason why the data couldn't include ONLY suites; create
+                # any suites not created with cases
+                result.append(suite_importer.import_suites())
 
-        return result
+            yield result
+
+            if batch_size is None or len(batch) < batch_size:
+                break
 
 
 
 class CaseImporter(object):
-    """Imports cases and links to or creates associated tags, suites."""
+    """
+    Imports cases and links to or creates associated tags, suites.
+
+    Cases are imported a batch at a time, with a fixed number of queries for
+    each batch.
+
+    """
 
     def __init__(self, productversion, suite_importer=None):
         """
@@ -156,12 +213,47 @@ class CaseImporter(object):
                 }
             ]
 
+        Cases are checked for duplicate names, and created with their steps,
+        tags and suites, ``BATCH_SIZE`` at a time. Doesn't
+        manage transactions; callers should commit or roll back the import.
 
         """
 
         result = ImportResult()
 
-        for new_case in case_dict_list:
+        for start in range(0, len(case_dict_list), BATCH_SIZE):
+            self._import_batch(
+                case_dict_list[start:start + BATCH_SIZE], force_dupes, result)
+
+        return result
+
+
+    def _import_batch(self, case_dicts, force_dupes, result):
+        """Import a batch of case dictionaries, recording to ``result``."""
+        product = self.productversion.product
+
+        # Don't re-import if we have the same case name and Product Version;
+        # names are compared case-insensitively, as by the database.
+        names = set()
+        emails = set()
+        for new_case in case_dicts:
+            if "name" in new_case:
+                names.add(new_case["name"])
+            if "created_by" in new_case:
+                emails.add(new_case["created_by"])
+        taken = set()
+        if names and not force_dupes:
+            taken = set(
+                name.lower() for name in CaseVersion.objects.filter(
+                    name__in=names,
+                    productversion=self.productversion,
+                    ).values_list("name", flat=True)
+                )
+        self.user_cache.load(emails)
+
+        # (case dict, user, [(instruction, expected), ...])
+        accepted = []
+        for new_case in case_dicts:
 
             if not "name" in new_case:
                 result.warn(
@@ -170,17 +262,11 @@ class CaseImporter(object):
                     )
                 continue
 
-            # Don't re-import if we have the same case name and Product Version
-            if not force_dupes and CaseVersion.objects.filter(
-                name=new_case["name"],
-                productversion=self.productversion,
-                ).exists():
-
+            if not force_dupes and new_case["name"].lower() in taken:
                 result.warn(
                     ImportResult.SKIP_CASE_NAME_CONFLICT,
                     new_case,
                     )
-
                 continue
 
             user = None
@@ -195,90 +281,150 @@ class CaseImporter(object):
                         email,
                         )
 
-            # the case looks good so far, but there may be a problem with
-            # one of the steps.  So, create a savepoint in case something
-            # is inherently wrong with this case, we can roll back to skip
-            # it, and still import the rest of the cases.
-            sid = transaction.savepoint()
+            # skip the whole case if something is wrong with one of its steps
+            try:
+                steps = self.parse_steps(new_case.get("steps", []))
+            except ValueError as e:
+                result.warn(
+                    e.args[0],
+                    new_case,
+                    )
+                continue
 
-            # create the top-level case object which holds the versions
-            case = Case.objects.create(
-                product=self.productversion.product,
-                idprefix=new_case.get("idprefix", ""),
-                )
+            taken.add(new_case["name"].lower())
+            accepted.append((new_case, user, steps))
+
+        if not accepted:
+            return
 
-            # create the case version which holds the details
-            caseversion = CaseVersion.objects.create(
+        now = utcnow()
+
+        # create the top-level case objects which hold the versions; since
+        # bulk_create doesn't set their ids, they are found among the cases
+        # with ids above the highest before the insert (a range of the
+        # primary key), told apart from other concurrently created cases by
+        # a unique idprefix
+        marker = uuid.uuid4().hex[:IDPREFIX_LENGTH]
+        last_id = Case.everything.aggregate(last=Max("id"))["last"] or 0
+        Case.objects.bulk_create(
+            [
+                Case(
+                    product=product,
+                    idprefix=marker,
+                    created_on=now,
+                    modified_on=now,
+                    )
+                for new_case, user, steps in accepted
+                ],
+            batch_size=BATCH_SIZE,
+            )
+        # each batch is a single multi-row INSERT, given ids in the order of
+        # its rows, and is inserted after the batches before it; so ordering
+        # by id gives the cases in the order of ``accepted``
+        case_ids = list(
+            Case.everything.filter(id__gt=last_id, idprefix=marker).order_by(
+                "id").values_list("id", flat=True))
+        by_idprefix = {}
+        for case_id, (new_case, user, steps) in zip(case_ids, accepted):
+            by_idprefix.setdefault(
+                new_case.get("idprefix", ""), []).append(case_id)
+        for idprefix, ids in by_idprefix.items():
+            Case.everything.filter(pk__in=ids).update(
+                idprefix=idprefix, notrack=True)
+
+        # create the case versions which hold the details; each is the only,
+        # so the latest, version of its new case
+        caseversions = [
+            CaseVersion(
                 productversion=self.productversion,
-                case=case,
+                case_id=case_id,
                 name=new_case["name"],
                 description=new_case.get("description", ""),
-                user=user,
+                latest=True,
+                created_on=now,
+                created_by=user,
+                modified_on=now,
+                modified_by=user,
                 )
+            for case_id, (new_case, user, steps) in zip(case_ids, accepted)
+            ]
+        CaseVersion.objects.bulk_create(caseversions, batch_size=BATCH_SIZE)
+        cv_ids = dict(
+            CaseVersion.everything.filter(case__in=case_ids).values_list(
+                "case", "id"))
+        for caseversion in caseversions:
+            caseversion.id = cv_ids[caseversion.case_id]
+
+        # new case versions inherit the product version's environments,
+        # without storing them (see CaseVersion.inherits_envs)
+
+        # add the steps to the case versions
+        CaseStep.objects.bulk_create(
+            [
+                CaseStep(
+                    caseversion_id=caseversion.id,
+                    number=number,
+                    instruction=instruction,
+                    expected=expected,
+                    created_on=now,
+                    modified_on=now,
+                    )
+                for caseversion, (new_case, user, steps) in zip(
+                    caseversions, accepted)
+                for number, (instruction, expected) in enumerate(steps, 1)
+                ],
+            batch_size=BATCH_SIZE,
+            )
 
-            # add the steps to this case version
-            if "steps" in new_case:
-                try:
-                    self.import_steps(caseversion, new_case["steps"])
-                except ValueError as e:
-                    result.warn(
-                        e.args[0],
-                        new_case,
-                        )
-
-                    transaction.savepoint_rollback(sid)
-                    continue
-            else:
+        for caseversion, (new_case, user, steps) in zip(
+                caseversions, accepted):
+            if not "steps" in new_case:
                 result.warn(
                     ImportResult.WARN_NO_STEPS,
                     caseversion,
                     )
 
             if "tags" in new_case:
-                self.tag_importer.add_names(caseversion, new_case["tags"])
+                self.tag_importer.add_names(caseversion.id, new_case["tags"])
 
             if "suites" in new_case:
-                self.suite_importer.add_names(case, new_case["suites"])
-
-            # case has been created, increment our count for reporting
-            result.num_cases += 1
+                self.suite_importer.add_names(
+                    caseversion.case_id, new_case["suites"])
 
-            # this case went ok.  We'll save it as complete in the overall
-            # transaction.
-            transaction.savepoint_commit(sid)
+        # cases have been created, increment our count for reporting
+        result.num_cases += len(accepted)
 
-            # now create the tags and add case versions to them
-            self.tag_importer.import_tags()
+        # bulk_create doesn't send post_save, so index the new text here
+        SearchToken.index(cv_ids.values())
 
-            # now create the suites and add cases to them
-            result.append(self.suite_importer.import_suites())
+        # now create the tags and add case versions to them
+        self.tag_importer.import_tags()
 
-        return result
+        # now create the suites and add cases to them
+        result.append(self.suite_importer.import_suites())
 
 
-    def import_steps(self, caseversion, step_data):
+    def parse_steps(self, step_data):
         """
-        Add the steps to this case version.
+        Return list of (instruction, expected) tuples for the given steps.
 
         Keyword arguments:
 
-        * caseversion -- the CaseVersion object that step_data applies to
-        * step_data -- a dictionary containing the steps for the case
+        * step_data -- a list of dictionaries containing the steps for the
+          case
 
-        Instruction is a required field for a step, but expected is optional.
+        Instruction is a required field for a step, but expected is optional;
+        raise ValueError if a step has no instruction.
 
         """
 
-        for step_num, new_step in enumerate(step_data):
-            try:
-                casestep = CaseStep.objects.create(
-                    caseversion=caseversion,
-                    number=step_num + 1,
-                    instruction=new_step["instruction"],
-                    expected=new_step.get("expected", ""),
-                    )
-            except KeyError:
-                raise ValueError(ImportResult.SKIP_STEP_NO_INSTRUCTION)
+        try:
+            return [
+                (new_step["instruction"], new_step.get("expected", ""))
+                for new_step in step_data
+                ]
+        except KeyError:
+            raise ValueError(ImportResult.SKIP_STEP_NO_INSTRUCTION)
 
 
 
@@ -295,6 +441,27 @@ class UserCache(object):
         """Create a UserCache with an internal dictionary cache."""
 
         self.cache = {}
+        # emails loaded but not found, and not yet asked for
+        self.missing = set()
+
+
+    def load(self, emails):
+        """
+        Look up any of the given emails not already cached, in one query.
+
+        Keyword arguments:
+
+        * emails -- an iterable of email address strings
+
+        """
+
+        emails = set(emails).difference(self.cache, self.missing)
+        if not emails:
+            return
+
+        for user in User.objects.filter(email__in=emails):
+            self.cache.setdefault(user.email, user)
+        self.missing.update(emails.difference(self.cache))
 
 
     def get_user(self, email):
@@ -317,6 +484,11 @@ class UserCache(object):
         if email in self.cache:
             return self.cache[email]
 
+        elif email in self.missing:
+            self.missing.discard(email)
+            self.cache[email] = None
+            raise User.DoesNotExist()
+
         else:
             try:
                 user = User.objects.get(email=email)
@@ -332,7 +504,7 @@ class UserCache(object):
 
 class TagImporter(object):
     """
-    Imports suites based on lists and dicts of suites used to build it.
+    Imports tags based on lists of tag names used to build it.
 
     """
 
@@ -343,21 +515,22 @@ class TagImporter(object):
         self.map = {}
 
 
-    def add_names(self, caseversion, tag_names):
+    def add_names(self, caseversion_id, tag_names):
         """
         Add a simple list of tag names.
 
         Keyword arguments:
 
-        * caseversion -- the CaseVersion object that tag_names applies to
+        * caseversion_id -- the id of the CaseVersion that tag_names applies
+          to
         * tag_names -- a list of strings containing the names of the tags
           to be applied to the caseversion (and created if necessary)
 
         """
 
         for tag_name in tag_names:
-            caseversions = self.map.setdefault(tag_name, [])
-            caseversions.append(caseversion)
+            caseversion_ids = self.map.setdefault(tag_name, [])
+            caseversion_ids.append(caseversion_id)
 
 
     def import_tags(self):
@@ -373,27 +546,58 @@ class TagImporter(object):
             * use existing global tag
             * create new product tag
 
-        """
-
-        for tag_name, caseversions in self.map.items():
-            existing_tags = Tag.objects.filter(
-                name=tag_name,
-                product__in=[None, self.product],
-                ).order_by("-product")
+        Tag names are matched case-insensitively.
 
-            # If there is a product tag, it will be sorted to first.
-            # If not, then the only item will be the global one, so
-            # use that.
-            if list(existing_tags):
-                tag = existing_tags[0]
+        """
 
-            else:
-                tag = Tag.objects.create(
-                    name=tag_name,
+        if not self.map:
+            return
+
+        # lower-cased name: tag id
+        tag_ids = {}
+
+        # If there is a product tag, it will be sorted to first.
+        # If not, then the only item will be the global one, so
+        # use that.
+        for tag_id, tag_name in Tag.objects.filter(
+                Q(product=None) | Q(product=self.product),
+                name__in=list(self.map),
+                ).order_by("-product").values_list("id", "name"):
+            tag_ids.setdefault(tag_name.lower(), tag_id)
+
+        new_names = {}
+        for tag_name in self.map:
+            if tag_name.lower() not in tag_ids:
+                new_names.setdefault(tag_name.lower(), tag_name)
+        if new_names:
+            Tag.objects.bulk_create(
+                [
+                    Tag(name=tag_name, product=self.product)
+                    for tag_name in new_names.values()
+                    ],
+                batch_size=BATCH_SIZE,
+                )
+            for tag_id, tag_name in Tag.objects.filter(
                     product=self.product,
-                    )
-
-            tag.caseversions.add(*caseversions)
+                    name__in=new_names.values(),
+                    ).order_by("id").values_list("id", "name"):
+                tag_ids.setdefault(tag_name.lower(), tag_id)
+            # bulk_create doesn't send post_save
+            CacheGeneration.bump(Tag)
+
+        links = set(
+            (caseversion_id, tag_ids[tag_name.lower()])
+            for tag_name, caseversion_ids in self.map.items()
+            for caseversion_id in caseversion_ids
+            )
+        CaseVersion.tags.through.objects.bulk_create(
+            [
+                CaseVersion.tags.through(
+                    caseversion_id=caseversion_id, tag_id=tag_id)
+                for caseversion_id, tag_id in links
+                ],
+            batch_size=BATCH_SIZE,
+            )
 
         # we have imported these items.  clear them out now.
         self.map.clear()
@@ -409,7 +613,7 @@ class SuiteImporter(object):
         {
             "suitename": {
                 "description": "foo",
-                "cases": [case1, case2]
+                "cases": [case1_id, case2_id]
             }
         }
 
@@ -430,13 +634,13 @@ class SuiteImporter(object):
         self.result = ImportResult()
 
 
-    def add_names(self, case, suite_names):
+    def add_names(self, case_id, suite_names):
         """
         Add a simple list of Suite names.
 
         Keyword arguments:
 
-        * case -- the Case object that suite_names applies to
+        * case_id -- the id of the Case that suite_names applies to
         * suite_names -- a list of strings.  These are the names of the
           suites to be applied to this case.  Suites will be created if
           they do not yet exist.
@@ -446,7 +650,7 @@ class SuiteImporter(object):
         for suite_name in suite_names:
             suite = self.map.setdefault(suite_name, {})
             cases = suite.setdefault("cases", [])
-            cases.append(case)
+            cases.append(case_id)
 
 
     def add_dicts(self, suite_dicts):
@@ -491,28 +695,58 @@ class SuiteImporter(object):
 
 
     def import_suites(self):
-        """Import all mapped suites."""
+        """
+        Import all mapped suites; return result of this (partial) import.
 
-        for suite_name, suite_data in self.map.items():
+        Suite names are matched case-insensitively.
 
-            suite, created = Suite.objects.get_or_create(
-                name=suite_name,
-                product=self.product,
-                defaults={"description": suite_data.get("description", "")},
-                )
+        """
 
-            if created:
+        # lower-cased name: suite id
+        suite_ids = {}
+        if self.map:
+            for suite_id, suite_name in Suite.objects.filter(
+                    name__in=list(self.map),
+                    product=self.product,
+                    ).order_by("id").values_list("id", "name"):
+                suite_ids.setdefault(suite_name.lower(), suite_id)
+
+        now = utcnow()
+        suitecases = set()
+        for suite_name, suite_data in self.map.items():
+
+            suite_id = suite_ids.get(suite_name.lower())
+            if suite_id is None:
+                suite = Suite.objects.create(
+                    name=suite_name,
+                    product=self.product,
+                    description=suite_data.get("description", ""),
+                    )
+                suite_ids[suite_name.lower()] = suite_id = suite.id
                 self.result.num_suites += 1
 
             # now add any cases the suite may have specified
-            if "cases" in suite_data:
-                for case in suite_data["cases"]:
-                    SuiteCase.objects.create(case=case, suite=suite)
+            for case_id in suite_data.get("cases", []):
+                suitecases.add((suite_id, case_id))
+
+        SuiteCase.objects.bulk_create(
+            [
+                SuiteCase(
+                    suite_id=suite_id,
+                    case_id=case_id,
+                    created_on=now,
+                    modified_on=now,
+                    )
+                for suite_id, case_id in suitecases
+                ],
+            batch_size=BATCH_SIZE,
+            )
 
         # we have imported (or warned on) these items, so reset map.
         self.map.clear()
 
-        return self.result
+        result, self.result = self.result, ImportResult()
+        return result
 
 
 
@@ -586,10 +820,18 @@ class ImportResult(object):
         """
 
         result_list = [
-            "{0}: {1}".format(x["reason"], json.dumps(x["item"], indent=4))
+            u"{0}: {1}".format(x["reason"], self._format_item(x["item"]))
             for x in self.warnings
             ]
 
         result_list.append("Imported {0} cases".format(self.num_cases))
         result_list.append("Imported {0} suites".format(self.num_suites))
         return result_list
+
+
+    @staticmethod
+    def _format_item(item):
+        """Return text for a warning's item: a model object's name, or JSON."""
+        if isinstance(item, models.Model):
+            return unicode(item)
+        return json.dumps(item, indent=4)
@@ -2,9 +2,13 @@
 Models for test-case library (cases, suites).
 
 """
+import re
+
 from django.core.exceptions import ValidationError
-from django.db import models
-from django.db.models import Max
+from django.db import connection, models
+from django.db.models import Max, Q
+
+from model_utils import Choices
 
 from ..attachments.models import Attachment
 from ..mtmodel import MTModel, DraftStatusModel
@@ -56,6 +60,49 @@ class Case(MTModel):
                     update_instance.latest = False
 
 
+    @classmethod
+    def set_latest_versions(cls, product):
+        """
+        Mark latest version of every case of ``product`` in one UPDATE.
+
+        Like ``set_latest_version`` for each (non-deleted) case, but only
+        caseversions whose ``latest`` flag changes are written.
+
+        """
+        qn = connection.ops.quote_name
+        cursor = connection.cursor()
+        cursor.execute(
+            "UPDATE {cv} "
+            "INNER JOIN {pv} ON {cv}.{pv_id} = {pv}.{id} "
+            "INNER JOIN ("
+            "SELECT v.{case_id}, MAX(p.{order}) AS max_order "
+            "FROM {cv} v "
+            "INNER JOIN {case} c ON v.{case_id} = c.{id} "
+            "INNER JOIN {pv} p ON v.{pv_id} = p.{id} "
+            "WHERE c.{product_id} = %s AND c.{deleted_on} IS NULL "
+            "AND v.{deleted_on} IS NULL "
+            "GROUP BY v.{case_id}"
+            ") m ON {cv}.{case_id} = m.{case_id} "
+            "SET {cv}.{latest} = ({pv}.{order} = m.max_order), "
+            "{cv}.{cc_version} = {cv}.{cc_version} + 1 "
+            "WHERE {cv}.{deleted_on} IS NULL "
+            "AND {cv}.{latest} != ({pv}.{order} = m.max_order)".format(
+                cv=qn(CaseVersion._meta.db_table),
+                pv=qn(ProductVersion._meta.db_table),
+                case=qn(cls._meta.db_table),
+                id=qn("id"),
+                case_id=qn("case_id"),
+                pv_id=qn("productversion_id"),
+                product_id=qn("product_id"),
+                order=qn("order"),
+                latest=qn("latest"),
+                deleted_on=qn("deleted_on"),
+                cc_version=qn("cc_version"),
+                ),
+            [product.id],
+            )
+
+
     def all_versions(self):
         """
         Return list of (productversion, caseversion) tuples for this case.
@@ -102,7 +149,9 @@ class CaseVersion(MTModel, DraftStatusModel, HasEnvironmentsModel):
     latest = models.BooleanField(default=False, editable=False)
 
     tags = models.ManyToManyField(Tag, blank=True, related_name="caseversions")
-    # True if this case's envs have been narrowed from the product version.
+    # True if this case's envs have been narrowed from the product version;
+    # only then does it store its own ``environments``, otherwise its
+    # environments are the product version's (see ``inherits_envs``).
     envs_narrowed = models.BooleanField(default=False)
 
 
@@ -192,18 +241,28 @@ class CaseVersion(MTModel, DraftStatusModel, HasEnvironmentsModel):
         overrides.setdefault("name", u"Cloned: {0}".format(self.name))
         if "productversion" not in overrides and "case" not in overrides:
             overrides["case"] = self.case.clone(cascade=[])
-            suitecases = SuiteCase.objects.filter(case=self.case)
-            for suitecase in suitecases:
-                suite = suitecase.suite
-                order = SuiteCase.objects.filter(
-                    suite=suite,
-                    ).aggregate(Max("order"))["order__max"] or 0
-                SuiteCase.objects.create(
-                    case=overrides["case"],
-                    suite=suite,
-                    user=kwargs["user"],
-                    order=order + 1,
+            suite_ids = list(
+                SuiteCase.objects.filter(case=self.case).values_list(
+                    "suite", flat=True)
+                )
+            orders = dict(
+                SuiteCase.objects.filter(suite__in=suite_ids).order_by(
+                    ).values_list("suite").annotate(Max("order"))
+                )
+            user = kwargs.get("user")
+            suitecases = []
+            for suite_id in suite_ids:
+                orders[suite_id] = (orders.get(suite_id) or 0) + 1
+                suitecases.append(
+                    SuiteCase(
+                        case=overrides["case"],
+                        suite_id=suite_id,
+                        created_by=user,
+                        modified_by=user,
+                        order=orders[suite_id],
+                        )
                     )
+            SuiteCase.objects.bulk_create(suitecases)
         return super(CaseVersion, self).clone(*args, **kwargs)
 
 
@@ -212,6 +271,43 @@ class CaseVersion(MTModel, DraftStatusModel, HasEnvironmentsModel):
         return self.productversion
 
 
+    @property
+    def inherits_envs(self):
+        """A caseversion that isn't narrowed has its product version's envs."""
+        return not self.envs_narrowed
+
+
+    def _narrow_envs(self):
+        """
+        Give this caseversion its own copy of the environments it inherits.
+
+        Sets (but doesn't save) the ``envs_narrowed`` flag; does nothing if it
+        is already set.
+
+        """
+        if not self.envs_narrowed:
+            self.environments.add(*self.productversion.environments.all())
+            self.envs_narrowed = True
+
+
+    def add_envs(self, *envs):
+        """
+        Add one or more environments to this caseversion's profile.
+
+        A caseversion inheriting its product version's environments is
+        narrowed first, unless it already has them all.
+
+        """
+        if not self.envs_narrowed:
+            env_ids = set(getattr(e, "pk", e) for e in envs)
+            if env_ids.issubset(
+                    self.effective_environments.values_list("id", flat=True)):
+                return
+            self._narrow_envs()
+            self.save()
+        super(CaseVersion, self).add_envs(*envs)
+
+
     def remove_envs(self, *envs):
         """
         Remove one or more environments from this caseversion's profile.
@@ -219,8 +315,8 @@ class CaseVersion(MTModel, DraftStatusModel, HasEnvironmentsModel):
         Also sets ``envs_narrowed`` flag.
 
         """
+        self._narrow_envs()
         super(CaseVersion, self).remove_envs(*envs)
-        self.envs_narrowed = True
         self.save()
 
 
@@ -236,14 +332,65 @@ class CaseVersion(MTModel, DraftStatusModel, HasEnvironmentsModel):
 
     def remove_env_narrowing(self):
         """Remove environment narrowing on this caseversion."""
-        current_env_ids = set(self.environments.values_list("id", flat=True))
-        env_ids = set(self.productversion.environments.values_list("id", flat=True))
-        add = env_ids.difference(current_env_ids)
-        self.add_envs(*add)
+        self.environments.clear()
         self.envs_narrowed = False
         self.save()
 
 
+    @classmethod
+    def effective_env_q(cls, lookup, value):
+        """
+        Return Q for caseversions with an environment matching a lookup.
+
+        ``lookup`` is a lookup on the environment (e.g. ``elements__in``),
+        matched against a narrowed caseversion's own environments and against
+        the product version's environments of any other.
+
+        """
+        return (
+            Q(envs_narrowed=True, **{"environments__" + lookup: value}) |
+            Q(
+                envs_narrowed=False,
+                **{"productversion__environments__" + lookup: value}
+                )
+            )
+
+
+    @classmethod
+    def effective_env_sql(cls, cv, env_condition):
+        """
+        Return SQL condition that caseversion ``cv`` has a matching env.
+
+        ``cv`` is the alias of the caseversion table in the query, and
+        ``env_condition`` a condition on the environment id, with ``{env}``
+        in place of its column (e.g. ``"{env} = re.environment_id"``). Like
+        ``effective_env_q``, looks in a narrowed caseversion's own
+        environments and in the product version's environments of any other.
+
+        """
+        qn = connection.ops.quote_name
+        return (
+            "(({cv}.{narrowed} = 1 AND EXISTS ("
+            "SELECT 1 FROM {cve} AS cve "
+            "WHERE cve.{cv_id} = {cv}.{id} AND {cve_condition})) "
+            "OR ({cv}.{narrowed} = 0 AND EXISTS ("
+            "SELECT 1 FROM {pve} AS pve "
+            "WHERE pve.{pv_id} = {cv}.{pv_id} AND {pve_condition})))".format(
+                cv=cv,
+                cve=qn(cls.environments.field.m2m_db_table()),
+                pve=qn(ProductVersion.environments.field.m2m_db_table()),
+                id=qn("id"),
+                cv_id=qn("caseversion_id"),
+                pv_id=qn("productversion_id"),
+                narrowed=qn("envs_narrowed"),
+                cve_condition=env_condition.format(
+                    env="cve.{0}".format(qn("environment_id"))),
+                pve_condition=env_condition.format(
+                    env="pve.{0}".format(qn("environment_id"))),
+                )
+            )
+
+
     def bug_urls(self):
         """Returns set of bug URLs associated with this caseversion."""
         Result = self.runcaseversions.model.results.related.model
@@ -261,12 +408,16 @@ class CaseVersion(MTModel, DraftStatusModel, HasEnvironmentsModel):
 
 
 class CaseAttachment(Attachment):
+    bulk_clone = True
+
     caseversion = models.ForeignKey(CaseVersion, related_name="attachments")
 
 
 
 class CaseStep(MTModel):
     """A step of a test case."""
+    bulk_clone = True
+
     caseversion = models.ForeignKey(CaseVersion, related_name="steps")
     number = models.IntegerField()
     instruction = models.TextField()
@@ -338,6 +489,8 @@ class Suite(MTModel, DraftStatusModel):
 
 class SuiteCase(MTModel):
     """Association between a test case and a suite."""
+    bulk_clone = True
+
     suite = models.ForeignKey(Suite, related_name="suitecases")
     case = models.ForeignKey(Case, related_name="suitecases")
     # order of test cases in the suite
@@ -372,3 +525,113 @@ class SuiteCase(MTModel):
                 "'{0}' is already in suite '{1}'".format(
                     self.case, self.suite)
                 )
+
+
+
+class SearchToken(models.Model):
+    """
+    A word in the text of a caseversion or its steps, for keyword searches.
+
+    Keyword filters on case text would otherwise be ``LIKE '%word%'`` scans
+    of every caseversion and step; instead they look up words by prefix in
+    this table's (field, token) index. Tokens for a caseversion's ``name``
+    and ``description`` are rebuilt when it is saved, and for its steps'
+    ``instruction`` and ``expected`` text when one of its steps is saved or
+    its steps are cloned (see ``moztrap.model``); the ``rebuild_search_index``
+    command rebuilds them all.
+
+    """
+    FIELDS = Choices("name", "description", "instruction", "expected")
+    # the fields that are on CaseVersion; the others are on CaseStep
+    CASEVERSION_FIELDS = [FIELDS.name, FIELDS.description]
+    STEP_FIELDS = [FIELDS.instruction, FIELDS.expected]
+
+    MAX_LENGTH = 40
+
+    caseversion = models.ForeignKey(
+        CaseVersion, related_name="search_tokens")
+    field = models.CharField(max_length=20, choices=FIELDS)
+    token = models.CharField(max_length=MAX_LENGTH)
+
+
+    class Meta:
+        unique_together = [("caseversion", "field", "token")]
+        index_together = [("field", "token")]
+
+
+    def __unicode__(self):
+        """Return unicode representation."""
+        return self.token
+
+
+    WORD = re.compile(r"\w+", re.UNICODE)
+
+
+    @classmethod
+    def tokenize(cls, text):
+        """Return the set of (lower-cased, truncated) words in ``text``."""
+        return set(
+            w[:cls.MAX_LENGTH] for w in cls.WORD.findall(text.lower()))
+
+
+    @classmethod
+    def index(cls, caseversion_ids, fields=None):
+        """
+        Rebuild tokens of ``fields`` (default all) for given caseversions.
+
+        Like a join to their steps would, includes soft-deleted steps.
+
+        """
+        if fields is None:
+            fields = cls.CASEVERSION_FIELDS + cls.STEP_FIELDS
+        caseversion_ids = list(caseversion_ids)
+
+        # ((caseversion_id, field), text)
+        texts = []
+        cv_fields = [f for f in fields if f in cls.CASEVERSION_FIELDS]
+        if cv_fields:
+            for row in CaseVersion.everything.filter(
+                    pk__in=caseversion_ids).values_list("id", *cv_fields):
+                texts.extend(
+                    ((row[0], f), text)
+                    for f, text in zip(cv_fields, row[1:]))
+        step_fields = [f for f in fields if f in cls.STEP_FIELDS]
+        if step_fields:
+            for row in CaseStep.everything.filter(
+                    caseversion__in=caseversion_ids).values_list(
+                        "caseversion", *step_fields):
+                texts.extend(
+                    ((row[0], f), text)
+                    for f, text in zip(step_fields, row[1:]))
+
+        tokens = set()
+        for (cv_id, field), text in texts:
+            tokens.update(
+                (cv_id, field, token) for token in cls.tokenize(text or u""))
+
+        cls.objects.filter(
+            caseversion__in=caseversion_ids, field__in=fields).delete()
+        cls.objects.bulk_create(
+            [
+                cls(caseversion_id=cv_id, field=field, token=token)
+                for cv_id, field, token in tokens
+                ],
+            batch_size=1000,
+            )
+
+
+    @classmethod
+    def matching(cls, field, text):
+        """
+        Return list of querysets of caseversion ids matching ``text``.
+
+        There is a queryset for each word in ``text``, of the caseversions
+        with a word starting with it in ``field``; so a caseversion matches
+        all the words if its id is in all the querysets.
+
+        """
+        return [
+            cls.objects.filter(
+                field=field, token__startswith=word).values("caseversion")
+            for word in cls.tokenize(text)
+            ]
@@ -7,11 +7,10 @@ creation, modification, and soft-deletion.
 """
 import datetime
 
-from django.db import models, router
-from django.db.models.deletion import Collector
+from django.db import models, router, transaction
 from django.db.models.query import QuerySet
-from django.db.models.signals import class_prepared
-from django.core.cache import cache
+from django.db.models.signals import class_prepared, post_save
+from django.dispatch import Signal
 
 from model_utils import Choices
 
@@ -21,55 +20,144 @@ class ConcurrencyError(Exception):
 
 
 
+# Sent after a soft-delete (or undelete) cascade has updated rows of
+# ``sender``, once per chunk of rows; ``queryset`` selects the affected rows.
+soft_delete_cascaded = Signal(providing_args=["queryset", "undelete"])
+
+# Sent once per model after a cascade-clone has bulk-inserted rows of
+# ``sender``, which skips their ``save`` and post_save; ``queryset`` selects
+# the new rows.
+bulk_cloned = Signal(providing_args=["queryset"])
+
+
 def utcnow():
     return datetime.datetime.utcnow()
 
 
 
-class SoftDeleteCollector(Collector):
+class SoftDeleteCascade(object):
     """
-    A variant of Django's default delete-cascade collector that implements soft
-    delete.
+    Soft-deletes (or undeletes) the rows of a queryset and their dependents.
+
+    Unlike Django's delete-cascade ``Collector``, dependent objects are never
+    loaded: the cascade follows each reverse foreign key (with
+    ``on_delete=CASCADE``) to another MTModel by updating the dependents of
+    the rows just updated. Rows are locked and updated by id, ``chunk_size``
+    at a time, and each chunk's ids are carried on to find its dependents.
 
     """
-    def collect(self, objs, *args, **kwargs):
-        """
-        Collect ``objs`` and dependent objects.
+    chunk_size = 1000
 
-        We override in order to store "root" objects for undelete.
 
-        """
-        if kwargs.get("source", None) is None:
-            self.root_objs = objs
-        super(SoftDeleteCollector, self).collect(objs, *args, **kwargs)
+    def __init__(self, queryset):
+        """Cascade from the rows of ``queryset`` (the "root" rows)."""
+        self.queryset = queryset
+        self.db = queryset.db
 
 
     def delete(self, user=None):
         """
-        Soft-delete all collected instances.
+        Soft-delete the root rows and their (not yet deleted) dependents.
 
         """
-        now = utcnow()
-        for model, instances in self.data.iteritems():
-            pk_list = [obj.pk for obj in instances]
-            model._base_manager.filter(
-                pk__in=pk_list, deleted_on__isnull=True).update(
-                deleted_by=user, deleted_on=now)
+        # MySQL stores datetimes to the second; a row's dependents deleted
+        # along with it get the same deletion time
+        now = utcnow().replace(microsecond=0)
+        with transaction.atomic(using=self.db):
+            self._cascade(
+                self.queryset,
+                {"deleted_on__isnull": True},
+                {"deleted_on": now, "deleted_by": user},
+                undelete=False,
+                )
 
 
     def undelete(self, user=None):
         """
-        Undelete all collected instances that were deleted.
+        Undelete the root rows, and dependents deleted along with them.
+
+        Only dependents with the same deletion time as one of the root rows
+        (so, deleted by the same cascade) are undeleted.
+
+        """
+        deletion_times = list(
+            self.queryset.exclude(deleted_on=None).order_by().values_list(
+                "deleted_on", flat=True).distinct()
+            )
+        if not deletion_times:
+            return
+        with transaction.atomic(using=self.db):
+            self._cascade(
+                self.queryset,
+                {"deleted_on__in": deletion_times},
+                {"deleted_on": None, "deleted_by": None},
+                undelete=True,
+                )
+
+
+    def _cascade(self, queryset, match, values, undelete):
+        """
+        Update rows of ``queryset`` matching ``match``, and their dependents.
+
+        Each chunk of rows is locked, updated with ``values`` and signalled,
+        then its dependents matching ``match`` are updated in turn.
 
         """
-        # timestamps on which root obj(s) were deleted; only cascade items also
-        # deleted in one of these same cascade batches should be undeleted.
-        deletion_times = set([o.deleted_on for o in self.root_objs])
-        for model, instances in self.data.iteritems():
-            pk_list = [obj.pk for obj in instances]
-            model._base_manager.filter(
-                pk__in=pk_list, deleted_on__in=deletion_times).update(
-                deleted_by=None, deleted_on=None)
+        model = queryset.model
+        dependents = _dependents(model)
+        for ids in self._chunks(queryset.filter(**match).select_for_update()):
+            self._rows(model).filter(pk__in=ids).update(**values)
+            soft_delete_cascaded.send(
+                sender=model,
+                queryset=self._rows(model).filter(pk__in=ids),
+                undelete=undelete,
+                )
+            for dependent, fk_name in dependents:
+                self._cascade(
+                    self._rows(dependent).filter(
+                        **{"{0}__in".format(fk_name): ids}),
+                    match,
+                    values,
+                    undelete,
+                    )
+
+
+    def _rows(self, model):
+        """Return queryset of all rows of ``model``, without tracking."""
+        return model._base_manager.using(self.db).all()
+
+
+    def _chunks(self, queryset):
+        """Yield the ids of ``queryset``'s rows, in lists of chunk_size."""
+        queryset = queryset.order_by("pk").values_list("pk", flat=True)
+        last = None
+        while True:
+            chunk = queryset if last is None else queryset.filter(pk__gt=last)
+            ids = list(chunk[:self.chunk_size])
+            if ids:
+                yield ids
+            if len(ids) < self.chunk_size:
+                return
+            last = ids[-1]
+
+
+
+def _dependents(model):
+    """
+    Return list of (model, fk name) of MTModel dependents of ``model``.
+
+    These are the models with a foreign key to ``model`` that cascades on
+    deletion; the other dependents (e.g. m2m through rows) have no
+    soft-deletion of their own.
+
+    """
+    return [
+        (related.model, related.field.name)
+        for related in model._meta.get_all_related_objects(
+            include_hidden=True)
+        if issubclass(related.model, MTModel)
+        and related.field.rel.on_delete is models.CASCADE
+        ]
 
 
 
@@ -108,9 +196,7 @@ class MTQuerySet(QuerySet):
         """
         if permanent:
             return super(MTQuerySet, self).delete()
-        collector = SoftDeleteCollector(using=self.db)
-        collector.collect(self)
-        collector.delete(user)
+        SoftDeleteCascade(self).delete(user)
 
 
     def undelete(self, user=None):
@@ -118,9 +204,7 @@ class MTQuerySet(QuerySet):
         Undelete all objects in this queryset.
 
         """
-        collector = SoftDeleteCollector(using=self.db)
-        collector.collect(self)
-        collector.undelete(user)
+        SoftDeleteCascade(self).undelete(user)
 
 
 
@@ -135,7 +219,12 @@ class MTManager(models.Manager):
     related-object managers (which subclass the default manager class) will
     still hide deleted objects.
 
+    Subclasses can set ``queryset_class`` to a ``MTQuerySet`` subclass.
+
     """
+    queryset_class = MTQuerySet
+
+
     def __init__(self, *args, **kwargs):
         """Instantiate a MTManager, pulling out the ``show_deleted`` arg."""
         self._show_deleted = kwargs.pop("show_deleted", False)
@@ -144,7 +233,7 @@ class MTManager(models.Manager):
 
     def get_query_set(self):
         """Return a ``MTQuerySet`` for all queries."""
-        qs = MTQuerySet(self.model, using=self.db)
+        qs = self.queryset_class(self.model, using=self.db)
         if not self._show_deleted:
             qs = qs.filter(deleted_on__isnull=True)
         return qs
@@ -179,10 +268,10 @@ class MTModel(models.Model):
     # ...but "objects", for use in most code, returns only not-deleted
     objects = MTManager(show_deleted=False)
 
-    @classmethod
-    def delete_modelfilter_choices_cache(cls, model):
-        cache_key = 'modelfilter-choices-%s' % (model._meta,)
-        cache.delete(cache_key)
+    # True for models whose ``clone`` and ``save`` do nothing beyond copying
+    # and inserting field values; their cascade-cloned instances are then
+    # inserted in bulk (see ``bulk_cloned``).
+    bulk_clone = False
 
     def save(self, *args, **kwargs):
         """
@@ -192,8 +281,6 @@ class MTModel(models.Model):
         out-of-date version is being saved.
 
         """
-        self.delete_modelfilter_choices_cache(self)
-
         if not kwargs.pop("notrack", False):
             user = kwargs.pop("user", None)
             now = utcnow()
@@ -220,6 +307,16 @@ class MTModel(models.Model):
                     "No {0} row with id {1} and version {2} updated.".format(
                         self.__class__, self.id, previous_version)
                     )
+            # _update bypasses save_base, so send post_save as it would
+            post_save.send(
+                sender=self.__class__,
+                instance=self,
+                created=False,
+                raw=False,
+                using=kwargs.get("using") or router.db_for_write(
+                    self.__class__, instance=self),
+                update_fields=None,
+                )
         else:
             return super(MTModel, self).save(*args, **kwargs)
 
@@ -256,28 +353,31 @@ class MTModel(models.Model):
         overrides["created_by"] = user
         overrides["modified_by"] = user
 
-        clone = self.__class__()
-
-        for field in self._meta.fields:
-            if field.primary_key:
-                continue
-            val = overrides.get(field.name, getattr(self, field.name))
-            setattr(clone, field.name, val)
-
+        clone = self._copy(overrides)
         clone.save(force_insert=True)
 
         for name, filter_func in cascade.items():
             mgr = getattr(self, name)
             if mgr.__class__.__name__ == "ManyRelatedManager":  # M2M
                 clone_mgr = getattr(clone, name)
-                existing = set(clone_mgr.all())
-                new = set(filter_func(mgr.all()))
-                clone_mgr.add(*new.difference(existing))
-                clone_mgr.remove(*existing.difference(new))
+                existing = set(clone_mgr.values_list("pk", flat=True))
+                related = filter_func(mgr.all())
+                if isinstance(related, QuerySet):
+                    new = set(related.values_list("pk", flat=True))
+                else:
+                    new = set(obj.pk for obj in related)
+                if new.difference(existing):
+                    clone_mgr.add(*new.difference(existing))
+                if existing.difference(new):
+                    clone_mgr.remove(*existing.difference(new))
             elif mgr.__class__.__name__ == "RelatedManager":  # reverse FK
                 reverse_name = getattr(self.__class__, name).related.field.name
-                for obj in filter_func(mgr.all()):
-                    obj.clone(overrides={reverse_name: clone})
+                related = filter_func(mgr.all())
+                if mgr.model.bulk_clone:
+                    mgr.model._bulk_clone(related, reverse_name, clone)
+                else:
+                    for obj in related:
+                        obj.clone(overrides={reverse_name: clone})
             else:
                 raise ValueError(
                     "Cannot cascade-clone '{0}'; "
@@ -286,6 +386,47 @@ class MTModel(models.Model):
         return clone
 
 
+    def _copy(self, overrides):
+        """Return an unsaved copy of this instance, with ``overrides``."""
+        copy = self.__class__()
+
+        for field in self._meta.fields:
+            if field.primary_key:
+                continue
+            val = overrides.get(field.name, getattr(self, field.name))
+            setattr(copy, field.name, val)
+
+        return copy
+
+
+    @classmethod
+    def _bulk_clone(cls, objs, reverse_name, parent):
+        """
+        Clone ``objs`` to point to ``parent`` with one bulk insert.
+
+        ``reverse_name`` is the name of the foreign key to ``parent``, which
+        must be new: ``bulk_create`` doesn't set ids, so the new rows are
+        identified as all the rows pointing to ``parent``.
+
+        """
+        now = utcnow()
+        overrides = {
+            reverse_name: parent,
+            "created_on": now,
+            "created_by": None,
+            "modified_on": now,
+            "modified_by": None,
+            }
+        clones = [obj._copy(overrides) for obj in objs]
+        if not clones:
+            return
+        cls.everything.bulk_create(clones, batch_size=1000)
+        bulk_cloned.send(
+            sender=cls,
+            queryset=cls.everything.filter(**{reverse_name: parent}),
+            )
+
+
     def delete(self, user=None, permanent=False):
         """
         (Soft) delete this instance, unless permanent=True.
@@ -293,7 +434,7 @@ class MTModel(models.Model):
         """
         if permanent:
             return super(MTModel, self).delete()
-        self._collector.delete(user)
+        self._cascade.delete(user)
 
 
     def undelete(self, user=None):
@@ -301,16 +442,15 @@ class MTModel(models.Model):
         Undelete this instance.
 
         """
-        self._collector.undelete(user)
+        self._cascade.undelete(user)
 
 
     @property
-    def _collector(self):
-        """Returns populated delete-cascade collector."""
+    def _cascade(self):
+        """Returns soft-delete cascade from this instance."""
         db = router.db_for_write(self.__class__, instance=self)
-        collector = SoftDeleteCollector(using=db)
-        collector.collect([self])
-        return collector
+        return SoftDeleteCascade(
+            self.__class__._base_manager.using(db).filter(pk=self.pk))
 
 
     class Meta:
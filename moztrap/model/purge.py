@@ -0,0 +1,204 @@
+"""
+Permanent removal of rows soft-deleted before a cutoff.
+
+Soft-deleted rows are only hidden (see ``moztrap.model.mtmodel``); purging
+removes those deleted long enough ago, model by model in dependency order
+(dependents first), in batches of ids. Rows of other tables that belong to
+a purged row (e.g. its m2m through rows or search tokens) are removed with
+it; a row still referenced by a row that isn't purged (e.g. a live
+dependent) is kept.
+
+"""
+import gzip
+import json
+import os
+import time
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, models, transaction
+
+from .mtmodel import MTModel
+
+
+
+def purge_order():
+    """Return list of all MTModels, each after all MTModels depending on it."""
+    order = []
+    seen = set()
+
+    def visit(model):
+        if model in seen:
+            return
+        seen.add(model)
+        for related in _references(model):
+            if (issubclass(related.model, MTModel) and
+                    related.model is not model):
+                visit(related.model)
+        order.append(model)
+
+    for model in models.get_models():
+        if issubclass(model, MTModel):
+            visit(model)
+    return order
+
+
+
+def _references(model):
+    """Return related-object descriptors of foreign keys to ``model``."""
+    return model._meta.get_all_related_objects(include_hidden=True)
+
+
+
+class Purger(object):
+    """
+    Permanently deletes rows of MTModels soft-deleted before ``cutoff``.
+
+    Each batch of ``batch_size`` rows is deleted in its own transaction,
+    followed by a pause of ``pause`` seconds so purging doesn't starve other
+    queries. If ``archive`` is given, it is called with the model and the
+    list of row dicts of each table's rows before they are deleted.
+
+    ``counts`` maps table name to number of rows deleted.
+
+    """
+    def __init__(self, cutoff, batch_size=1000, pause=0, archive=None):
+        self.cutoff = cutoff
+        self.batch_size = batch_size
+        self.pause = pause
+        self.archive = archive
+        self.counts = {}
+
+
+    def purge(self):
+        """Purge all MTModels; return ``counts``."""
+        for model in purge_order():
+            self.purge_model(model)
+        return self.counts
+
+
+    def purge_model(self, model):
+        """Purge rows of ``model`` soft-deleted before the cutoff."""
+        candidates = model._base_manager.filter(
+            deleted_on__lt=self.cutoff).order_by("pk").values_list(
+                "pk", flat=True)
+        # rows referenced by other candidates (e.g. runs of a series) have
+        # to wait for a later pass, after those are gone
+        self_referencing = any(
+            related.model is model for related in _references(model))
+
+        while True:
+            purged = kept = 0
+            last = None
+            while True:
+                batch = candidates
+                if last is not None:
+                    batch = batch.filter(pk__gt=last)
+                ids = list(batch[:self.batch_size])
+                if not ids:
+                    break
+                last = ids[-1]
+                deleted = self.purge_batch(model, ids)
+                purged += deleted
+                kept += len(ids) - deleted
+                if self.pause:
+                    time.sleep(self.pause)
+            if not (self_referencing and purged and kept):
+                break
+
+
+    def purge_batch(self, model, ids):
+        """Purge rows of ``model`` with given ``ids``; return number purged."""
+        with transaction.atomic():
+            dependents = []
+            for related in _references(model):
+                fk = related.field
+                if fk.rel.on_delete is models.SET_NULL:
+                    dependents.append((related.model, fk, "null"))
+                elif issubclass(related.model, MTModel):
+                    # still-referenced rows stay
+                    referenced = set(
+                        related.model._base_manager.filter(
+                            **{"{0}__in".format(fk.name): ids}).values_list(
+                                fk.name, flat=True)
+                        )
+                    ids = [i for i in ids if i not in referenced]
+                else:
+                    dependents.append((related.model, fk, "delete"))
+            if not ids:
+                return 0
+
+            for dependent, fk, action in dependents:
+                rows = dependent._base_manager.filter(
+                    **{"{0}__in".format(fk.name): ids})
+                if action == "null":
+                    rows.update(**{fk.name: None})
+                else:
+                    self._delete(dependent, fk.name, ids)
+            return self._delete(model, model._meta.pk.name, ids)
+
+
+    def _delete(self, model, field_name, ids):
+        """Delete (and archive) rows of ``model`` with ``field_name`` in ids."""
+        if self.archive is not None:
+            rows = list(
+                model._base_manager.filter(
+                    **{"{0}__in".format(field_name): ids}).values()
+                )
+            if not rows:
+                return 0
+            self.archive(model, rows)
+
+        qn = connection.ops.quote_name
+        cursor = connection.cursor()
+        cursor.execute(
+            "DELETE FROM {0} WHERE {1} IN ({2})".format(
+                qn(model._meta.db_table),
+                qn(model._meta.get_field(field_name).column),
+                ", ".join(["%s"] * len(ids)),
+                ),
+            ids,
+            )
+        deleted = cursor.rowcount
+        if deleted:
+            table = model._meta.db_table
+            self.counts[table] = self.counts.get(table, 0) + deleted
+        return deleted
+
+
+
+class Archive(object):
+    """
+    Writes purged rows to a gzipped NDJSON file per table in ``directory``.
+
+    Files are named after the table and ``stamp`` (e.g. the time the purge
+    started), so each purge writes new files.
+
+    """
+    def __init__(self, directory, stamp):
+        self.directory = directory
+        self.stamp = stamp
+        self.files = {}
+
+
+    def __call__(self, model, rows):
+        """Write ``rows`` (dicts) of ``model``'s table."""
+        table = model._meta.db_table
+        if table not in self.files:
+            self.files[table] = gzip.open(
+                os.path.join(
+                    self.directory,
+                    "{0}-{1}.ndjson.gz".format(table, self.stamp),
+                    ),
+                "wb",
+                )
+        fh = self.files[table]
+        for row in rows:
+            fh.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
+        fh.flush()
+
+
+    def close(self):
+        """Close all files."""
+        for fh in self.files.values():
+            fh.close()
+        self.files = {}
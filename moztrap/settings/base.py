@@ -250,6 +250,46 @@ USE_BROWSERID = True
 
 GOOGLE_ANALYTICS_ID = 'UA-49796218-15'
 
+# Set to True to lock in run test cases (on activation, refresh and series
+# cloning) in background jobs, run by "manage.py run_jobs", instead of in the
+# web request.  JOB_WORKERS is the default size of the worker process pool.
+# A job still running after JOB_TIMEOUT seconds is assumed to have lost its
+# worker, and is queued to run again.
+ASYNC_JOBS = False
+JOB_WORKERS = 2
+JOB_TIMEOUT = 3600
+
+# Default number of lines of a streamed result upload (the result/stream/ API)
+# committed in each transaction.
+RESULT_STREAM_CHUNK_SIZE = 500
+
+# Number of results read per query when exporting results (the result/export/
+# API and "manage.py export_results").
+RESULT_EXPORT_CHUNK_SIZE = 1000
+
+# Default number of cases committed in each transaction by "manage.py import".
+IMPORT_BATCH_SIZE = 1000
+
+# Default number of rows deleted in each transaction by "manage.py
+# purge_deleted", and seconds it pauses after each batch so that purging
+# doesn't starve other queries.
+PURGE_BATCH_SIZE = 1000
+PURGE_PAUSE = 0.1
+
+# Directory the results of archived runs are moved to, a file per run (see
+# "manage.py archive_runs").
+RUN_ARCHIVE_ROOT = join(BASE_PATH, "run-archive")
+
+# Seconds a process may reuse the cache generations (see CacheGeneration) it
+# read, before reading them again; changes made in other processes (e.g. a new
+# tag) can take this long to show up in list filters.
+CACHE_GENERATION_TTL = 1
+
+# Most options listed by a list filter whose options can be searched (e.g. the
+# tag or creator filters); the rest are found by typing in the filter. None
+# lists all options.
+FILTER_OPTIONS_LIMIT = 50
+
 # Enable CORS
 INSTALLED_APPS += ["corsheaders"]
 MIDDLEWARE_CLASSES += [
@@ -116,6 +116,12 @@ Copy local.sample.py to local.py and modify as needed.
 #    }
 #}
 
+# Uncomment this to lock in test cases for large runs in the background rather
+# than in the web request. Requires "python manage.py run_jobs" to be running;
+# JOB_WORKERS sets its default number of worker processes.
+#ASYNC_JOBS = True
+#JOB_WORKERS = 2
+
 # if DEBUG:
     # LOGGING["handlers"]["console"] = {
     #     "level": "DEBUG",
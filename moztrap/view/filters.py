@@ -104,14 +104,13 @@ class RunCaseVersionFilterSet(filters.FilterSet):
         filters.ChoicesFilter(
             "result status",
             key="resultstatus",
-            lookup="results__status",
-            extra_filters={"results__is_latest": True},
+            lookup="latest_results__result__status",
             choices=sorted(Choices(*model.Result.COMPLETED_STATES)),
             ),
         filters.KeywordExactFilter(
             "id", lookup="caseversion__case__id", coerce=int),
-        filters.KeywordFilter("name", lookup="caseversion__name"),
-        filters.KeywordFilter("description", lookup="caseversion__description"),
+        cases.SearchFilter("name", lookup="caseversion"),
+        cases.SearchFilter("description", lookup="caseversion"),
         filters.ChoicesFilter(
             "priority",
             lookup="caseversion__case__priority",
@@ -139,12 +138,12 @@ class RunCaseVersionFilterSet(filters.FilterSet):
             key="productversion",
             queryset=model.ProductVersion.objects.all().order_by(
                 "product__name", "version")),
-        filters.KeywordFilter(
-            "instruction", lookup="caseversion__steps__instruction"),
-        filters.KeywordFilter(
+        cases.SearchFilter("instruction", lookup="caseversion"),
+        cases.SearchFilter(
             "expected result",
-            lookup="caseversion__steps__expected",
-            key="expected"),
+            lookup="caseversion",
+            key="expected",
+            field="expected"),
         filters.ModelFilter(
             "creator",
             lookup="caseversion__created_by",
@@ -174,8 +173,8 @@ class RunTestsRunCaseVersionFilterSet(filters.FilterSet):
     filters = [
         filters.KeywordExactFilter(
             "id", lookup="caseversion__case__id", coerce=int),
-        filters.KeywordFilter("name", lookup="caseversion__name"),
-        filters.KeywordFilter("description", lookup="caseversion__description"),
+        cases.SearchFilter("name", lookup="caseversion"),
+        cases.SearchFilter("description", lookup="caseversion"),
         filters.ChoicesFilter(
             "priority",
             lookup="caseversion__case__priority",
@@ -187,12 +186,12 @@ class RunTestsRunCaseVersionFilterSet(filters.FilterSet):
             lookup="caseversion__tags",
             queryset=model.Tag.objects.all().order_by("name"),
             switchable=True),
-        filters.KeywordFilter(
-            "instruction", lookup="caseversion__steps__instruction"),
-        filters.KeywordFilter(
+        cases.SearchFilter("instruction", lookup="caseversion"),
+        cases.SearchFilter(
             "expected result",
-            lookup="caseversion__steps__expected",
-            key="expected"),
+            lookup="caseversion",
+            key="expected",
+            field="expected"),
         filters.ModelFilter(
             "creator",
             lookup="caseversion__created_by",
@@ -273,8 +272,8 @@ class CaseVersionFilterSet(filters.FilterSet):
             choices=Choices(1, 2, 3, 4),
             coerce=int,
             ),
-        filters.KeywordFilter("name"),
-        filters.KeywordFilter("description"),
+        cases.SearchFilter("name"),
+        cases.SearchFilter("description"),
         filters.ModelFilter(
             "tag",
             lookup="tags",
@@ -291,18 +290,15 @@ class CaseVersionFilterSet(filters.FilterSet):
             key="productversion",
             queryset=model.ProductVersion.objects.all().order_by(
                 "product__name", "version").select_related()),
-        filters.KeywordFilter("instruction", lookup="steps__instruction"),
-        filters.KeywordFilter(
-            "expected result",
-            lookup="steps__expected",
-            key="expected"),
+        cases.SearchFilter("instruction"),
+        cases.SearchFilter(
+            "expected result", key="expected", field="expected"),
         filters.ModelFilter(
             "creator",
             lookup="created_by",
             queryset=model.User.objects.all().order_by("username")),
-        filters.ModelFilter(
+        cases.EnvElementFilter(
             "environment element",
-            lookup="environments__elements",
             key="envelement",
             queryset=model.Element.objects.all().order_by("name"),
             switchable=True),
@@ -1,6 +1,10 @@
-from filters import KeywordFilter
+import operator
+
+from filters import KeywordFilter, ModelFilter
 from django.db.models import Q
 
+from moztrap import model
+
 
 class PrefixIDFilter(KeywordFilter):
     """
@@ -22,6 +26,13 @@ class PrefixIDFilter(KeywordFilter):
 
 
     def filter(self, queryset, values):
+        if values:
+            return queryset.filter(*self.conditions(values)).distinct()
+
+        return queryset
+
+
+    def conditions(self, values):
 
         query_filters = Q()
 
@@ -53,6 +64,89 @@ class PrefixIDFilter(KeywordFilter):
             query_filters = query_filters | Q(**kwargs)
 
         if values:
-            return queryset.filter(query_filters).distinct()
+            return [query_filters]
+
+        return []
+
+
+
+class SearchFilter(KeywordFilter):
+    """
+    A KeywordFilter on case text that uses the search token index.
+
+    Rather than containing a value anywhere, case text matches a value if it
+    has words starting with each of the value's words. As in KeywordFilter,
+    values are ANDed, or ORed if switched.
+
+    ``lookup`` is the lookup for the caseversion from the filtered model
+    (defaults to ``pk``, for filtering caseversions), and ``field`` is the
+    ``SearchToken`` field searched (defaults to ``name``).
+
+    """
+    def __init__(self, name, field=None, **kwargs):
+        self.field = name if field is None else field
+        kwargs.setdefault("lookup", "pk")
+        super(SearchFilter, self).__init__(name, **kwargs)
+
+
+    def conditions(self, values):
+        """Caseversion is in the search results for all (or any) values."""
+        if values:
+            in_lookup = "{0}__in".format(self.lookup)
+            filters = Q()
+            op_func = operator.__or__ if self.toggle else operator.__and__
+
+            for value in values:
+                matching = model.SearchToken.matching(self.field, value)
+                if matching:
+                    words = reduce(
+                        operator.__and__,
+                        [Q(**{in_lookup: ids}) for ids in matching])
+                else:
+                    # no words to search for; nothing matches
+                    words = Q(**{in_lookup: []})
+                filters = op_func(filters, words)
+
+            return [filters]
+
+        return []
+
+
+
+class EnvElementFilter(ModelFilter):
+    """
+    A ModelFilter on the elements of caseversions' environments.
+
+    A caseversion that isn't narrowed has its product version's environments
+    rather than its own (see ``CaseVersion.inherits_envs``), so the lookup
+    (defaults to ``elements``) is on the environment, and matched by
+    ``CaseVersion.effective_env_q``. As in ModelFilter, values are ORed, or
+    ANDed if switched.
+
+    """
+    def __init__(self, name, **kwargs):
+        kwargs.setdefault("lookup", "elements")
+        super(EnvElementFilter, self).__init__(name, **kwargs)
+
+
+    def filter(self, queryset, values):
+        """Filter by each condition in turn, so each gets its own joins."""
+        if values:
+            for condition in self.conditions(values):
+                queryset = queryset.filter(condition)
+            return queryset.distinct()
 
         return queryset
+
+
+    def conditions(self, values):
+        """Caseversion has an environment with any (or each) value."""
+        in_lookup = "{0}__in".format(self.lookup)
+        if not values:
+            return []
+        if self.toggle:
+            return [
+                model.CaseVersion.effective_env_q(in_lookup, [value])
+                for value in values
+                ]
+        return [model.CaseVersion.effective_env_q(in_lookup, values)]
@@ -9,10 +9,21 @@ import json
 import urlparse
 import operator
 
+from django.conf import settings
 from django.core.urlresolvers import reverse, resolve
+from django.http import HttpResponse, Http404
 from django.utils.datastructures import MultiValueDict
 from django.db.models import Q
-from django.core.cache import cache
+from django.db.models.fields import FieldDoesNotExist
+from django.db.models.constants import LOOKUP_SEP
+
+from moztrap.model.core.models import CacheGeneration
+
+
+
+# GET parameter naming the filter whose options a request for a filtered view
+# is searching; see ``options_response``
+OPTIONS_PARAM = "filteroptions"
 
 
 
@@ -57,6 +68,10 @@ def filter(ctx_name, filters=None, filterset_class=None):
     instances, and ``filterset_class`` is an optional FilterSet subclass to
     use.
 
+    A request with an ``OPTIONS_PARAM`` querystring parameter is a search of
+    the options of the filter with that key, and gets a JSON response (see
+    ``options_response``) instead of the view's.
+
     """
     if filters is None:
         filters = []
@@ -67,6 +82,8 @@ def filter(ctx_name, filters=None, filterset_class=None):
     def decorator(view_func):
         @wraps(view_func)
         def _wrapped_view(request, *args, **kwargs):
+            if OPTIONS_PARAM in request.GET:
+                return options_response(filterset, request.GET)
             response = view_func(request, *args, **kwargs)
             try:
                 ctx = response.context_data
@@ -87,20 +104,56 @@ def filter(ctx_name, filters=None, filterset_class=None):
 
 
 
+def options_response(filterset, GET):
+    """
+    Return JSON response with a page of options of a filter in ``filterset``.
+
+    ``GET`` has the key of the filter under ``OPTIONS_PARAM``, and optional
+    ``text`` the options' labels should start with and ``page`` number. The
+    response is ``{"options": [[label, value], ...], "more": <bool>}``, where
+    ``more`` is true if there is a next page. Raises Http404 if there is no
+    such filter, its options can't be searched, or filters list all their
+    options (``FILTER_OPTIONS_LIMIT`` is None).
+
+    """
+    limit = settings.FILTER_OPTIONS_LIMIT
+    flt = filterset.get(GET.get(OPTIONS_PARAM))
+    if limit is None or flt is None or not flt.searchable:
+        raise Http404
+    try:
+        page = max(int(GET.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    options, more = flt.search_options(GET.get("text", ""), page, limit)
+    return HttpResponse(
+        json.dumps(
+            {
+                "options": [[label, value] for value, label in options],
+                "more": more,
+                }
+            ),
+        content_type="application/json",
+        )
+
+
+
 class BoundFilterSet(object):
     """A FilterSet plus actual filtering data."""
-    def __init__(self, filterset, data=None):
+    def __init__(self, filterset, data=None, option_limit=None):
         """
         Initialize a BoundFilterSet.
 
         ``filterset`` is the FilterSet instance that provides the filters;
         ``data`` is a dictionary mapping filter keys to lists of values.
+        ``option_limit``, if given, is the number of options listed by each
+        filter whose options can be searched (see ``BoundFilter``).
 
         """
         self.data = data or {}
         self.filterset = filterset
         self.filters = self.filterset.filters
-        self.boundfilters = [BoundFilter(f, self.data) for f in self.filters]
+        self.boundfilters = [
+            BoundFilter(f, self.data, option_limit) for f in self.filters]
 
 
     def __iter__(self):
@@ -115,9 +168,29 @@ class BoundFilterSet(object):
 
 
     def filter(self, queryset):
-        """Return ``queryset`` filtered by current values of our filters."""
+        """
+        Return ``queryset`` filtered by current values of our filters.
+
+        Rather than letting each filter join to-many relations and make the
+        queryset distinct, the conditions of all filters are planned together:
+        those on a to-many relation become an ``IN (subquery)`` semi-join on
+        that relation's table, so the filtered queryset has no row explosion
+        and needs no DISTINCT. Only a condition that crosses more than one
+        to-many relation in a way that can't be split still joins them.
+
+        """
+        distinct = False
         for boundfilter in self.boundfilters:
-            queryset = boundfilter.filter(queryset)
+            conditions = boundfilter.conditions()
+            if conditions is None:
+                queryset = boundfilter.filter(queryset)
+                continue
+            for q in conditions:
+                q, joined = semijoin(queryset.model, q)
+                queryset = queryset.filter(q)
+                distinct = distinct or joined
+        if distinct:
+            queryset = queryset.distinct()
         return queryset
 
 
@@ -186,6 +259,10 @@ class FilterSet(object):
         request.GET from the current request. Keys not beginning with
         ``self.prefix``` will be ignored.
 
+        Filters whose options can be searched list no more than the
+        ``FILTER_OPTIONS_LIMIT`` setting of them (if not None), plus those
+        selected; the others are found via ``options_response``.
+
         """
         GET = GET or MultiValueDict()
 
@@ -202,6 +279,7 @@ class FilterSet(object):
         return self.bound_class(
             self,
             query_filters,
+            settings.FILTER_OPTIONS_LIMIT,
             )
 
 
@@ -210,6 +288,14 @@ class FilterSet(object):
         return iter(self.filters)
 
 
+    def get(self, key):
+        """Return the filter with given ``key``, or None."""
+        for flt in self.filters:
+            if flt.key == key:
+                return flt
+        return None
+
+
     def params_for(self, obj):
         """
         Return dict; querystring parameters to filter for ``obj``.
@@ -234,19 +320,33 @@ FilterOption = namedtuple("FilterOption", ["value", "label", "selected"])
 
 class BoundFilter(object):
     """A Filter plus specific filtering values from the request."""
-    def __init__(self, flt, data):
-        """``flt`` is a Filter instance, ``data`` is a dict of filter data."""
+    def __init__(self, flt, data, option_limit=None):
+        """
+        ``flt`` is a Filter instance, ``data`` is a dict of filter data.
+
+        If ``option_limit`` is given and the filter's options can be searched,
+        only the first ``option_limit`` options and the selected ones are
+        listed, and ``more`` is True if there are others.
+
+        """
         self._filter = flt
         self.data = data
+        self.more = False
 
-        # list of valid selected option values
-        self.values = self._filter.values(self.data)
+        if option_limit is not None and self._filter.searchable:
+            # list of valid selected option values
+            self.values, options, self.more = self._filter.limited_options(
+                self.data, option_limit)
+        else:
+            # list of valid selected option values
+            self.values = self._filter.values(self.data)
+            options = self._filter.options(self.values)
 
         value_set = set(self.values)
         self.options = [
             FilterOption(
                 value=val, label=label, selected=(val in value_set))
-            for val, label in self._filter.options(self.values)]
+            for val, label in options]
 
 
     def filter(self, queryset):
@@ -254,6 +354,21 @@ class BoundFilter(object):
         return self._filter.filter(queryset, self.values)
 
 
+    def conditions(self):
+        """
+        Return list of Q objects to filter a queryset by, in turn, or None.
+
+        Returns None if the filter overrides ``filter`` without also
+        overriding ``conditions``; then it must be applied with ``filter``.
+
+        """
+        cls = type(self._filter)
+        if not issubclass(
+                _defined_in(cls, "conditions"), _defined_in(cls, "filter")):
+            return None
+        return self._filter.conditions(self.values)
+
+
     @property
     def cls(self):
         """Pass-through to Filter cls."""
@@ -308,6 +423,8 @@ class Filter(object):
     is_default_and = False
     # switch OR(AND) to AND(OR) filtering
     toggle = False
+    # True if options can be found with ``search_options``
+    searchable = False
 
 
     def __init__(self, name, lookup=None, key=None, coerce=None,
@@ -351,6 +468,29 @@ class Filter(object):
         return queryset
 
 
+    def conditions(self, values):
+        """
+        Given selected values, return list of Q objects to filter by.
+
+        Filtering a queryset by each Q in turn (each in its own ``filter``
+        call, so each gets its own joins) is equivalent to ``filter``.
+
+        """
+        if not values:
+            return []
+        if self.toggle:
+            conditions = [
+                Q(**{"{0}__in".format(self.lookup): [value]})
+                for value in values
+                ]
+            if self.extra_filters:
+                conditions.append(Q(**self.extra_filters))
+            return conditions
+        filters = {"{0}__in".format(self.lookup): values}
+        filters.update(self.extra_filters)
+        return [Q(**filters)]
+
+
     def options(self, values):
         """Given list of selected values, return options to display."""
         return []
@@ -429,21 +569,24 @@ class ModelFilter(BaseChoicesFilter):
     alternative ``coerce`` function should be provided at instantiation.
 
     """
-
-
     def __init__(self, *args, **kwargs):
         """
-        Looks for ``queryset`` and ``label`` keyword arguments.
+        Looks for ``queryset``, ``label`` and ``search`` keyword arguments.
 
         ``queryset`` should contain the model instances that are the options
         available for this filter; ``label`` is an optional one-argument
         callable that returns the display label for each object, given the
-        object.
+        object. ``search`` is the field whose start is matched by the text of
+        ``search_options``; by default the first field ``queryset`` is ordered
+        by (if it isn't ordered, its options can't be searched).
 
         """
         self.queryset = kwargs.pop("queryset")
         self.label_func = kwargs.pop("label", lambda o: unicode(o))
+        self.search = kwargs.pop("search", None)
         self._opts = None
+        # limit: (generation, options)
+        self._cached = {}
         kwargs.setdefault("coerce", int)
         super(ModelFilter, self).__init__(*args, **kwargs)
 
@@ -453,23 +596,100 @@ class ModelFilter(BaseChoicesFilter):
         return self._opts
 
 
+    @property
+    def searchable(self):
+        """Options can be searched if there is a field to search."""
+        return self._search_field() is not None
+
+
     def get_choices(self):
         """Get the options for this filter."""
-        # always clone to get new data; filter instances are persistent
+        self._opts = self._cached_options(None)
+        return self._opts
 
-        # Because these options rarely change we can confidently cache
-        # them as lists of tuples.
-        # This cache key gets invalidated on the various signals set
-        # up in moztrap.model.__init__.
-        cache_key = 'modelfilter-choices-%s' % (self.queryset.model._meta,)
-        opts = cache.get(cache_key)
-        if opts is None:
-            opts = [
-                (obj.pk, self.label_func(obj)) for obj in self.queryset.all()
+
+    def limited_options(self, data, limit):
+        """
+        Return (values, options, more) without loading all the options.
+
+        ``values`` are the valid selected values in ``data``; ``options`` are
+        the first ``limit`` options and any selected ones not among them, and
+        ``more`` is True if there are more options than those.
+
+        """
+        values = [
+            v for v in super(BaseChoicesFilter, self).values(data)
+            if v is not None
             ]
-            cache.set(cache_key, opts, 60 * 60)
-        self._opts = opts
-        return self._opts
+        first = self._cached_options(limit + 1)
+        more = len(first) > limit
+        first = first[:limit]
+        listed = set(k for k, v in first)
+        others = [v for v in values if v not in listed]
+        selected = []
+        if others:
+            selected = self._labeled(self.queryset.filter(pk__in=others))
+        found = listed.union(k for k, v in selected)
+        return [v for v in values if v in found], selected + first, more
+
+
+    def search_options(self, text, page, limit):
+        """
+        Return (options, more) for a page of options starting with ``text``.
+
+        Returns the ``page``th (from 1) ``limit`` options whose ``search``
+        field starts with ``text``, and True if there are further pages.
+
+        """
+        queryset = self.queryset.all()
+        if text:
+            queryset = queryset.filter(
+                **{"{0}__istartswith".format(self._search_field()): text})
+        # pages are sliced by offset, so their order must be total
+        queryset = queryset.order_by(*(list(self._ordering()) + ["pk"]))
+        start = (page - 1) * limit
+        options = self._labeled(queryset[start:start + limit + 1])
+        return options[:limit], len(options) > limit
+
+
+    def _cached_options(self, limit):
+        """Return list of first ``limit`` (or all) (pk, label) options."""
+        # Because these options rarely change we can confidently cache
+        # them as lists of tuples, on the filter instance (filter instances
+        # are persistent), until the model's generation is bumped by the
+        # signals set up in moztrap.model.__init__.
+        generation = CacheGeneration.current(self.queryset.model)
+        cached = self._cached.get(limit)
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+        # always clone to get new data
+        queryset = self.queryset.all()
+        if limit is not None:
+            queryset = queryset[:limit]
+        opts = self._labeled(queryset)
+        self._cached[limit] = (generation, opts)
+        return opts
+
+
+    def _labeled(self, objects):
+        """Return list of (pk, label) tuples for given objects."""
+        return [(obj.pk, self.label_func(obj)) for obj in objects]
+
+
+    def _search_field(self):
+        """Return the field searched by ``search_options``."""
+        if self.search is not None:
+            return self.search
+        ordering = self._ordering()
+        if ordering:
+            return ordering[0].lstrip("-")
+        return None
+
+
+    def _ordering(self):
+        """Return the ordering of ``queryset``'s options."""
+        return (
+            self.queryset.query.order_by or self.queryset.model._meta.ordering)
 
 
 
@@ -496,6 +716,14 @@ class KeywordFilter(KeywordExactFilter):
 
 
     def filter(self, queryset, values):
+        """Values are ANDed in a 'contains' search of the field text."""
+        if values:
+            return queryset.filter(*self.conditions(values)).distinct()
+
+        return queryset
+
+
+    def conditions(self, values):
         """Values are ANDed in a 'contains' search of the field text."""
         if values:
             filters = Q()
@@ -504,6 +732,176 @@ class KeywordFilter(KeywordExactFilter):
             for value in values:
                 filters = op_func(filters, Q(**{"{0}__icontains".format(self.lookup): value}))
 
-            return queryset.filter(filters).distinct()
+            return [filters]
 
-        return queryset
+        return []
+
+
+
+def semijoin(model, q):
+    """
+    Plan filtering ``model`` by ``q`` without joining to-many relations.
+
+    Returns tuple (q, joined). Conditions in ``q`` on a to-many relation of
+    ``model`` (or of a model it has a foreign key to) are rewritten as ``IN
+    (subquery)`` on that relation's table, keeping the meaning ``q`` has in a
+    single ``filter`` call: conditions ANDed on the same relation must match
+    the same related row. If ``q`` can't be rewritten that way it is returned
+    as is, and ``joined`` is True: the queryset then needs ``distinct()``.
+
+    """
+    all_hops = set(_hop_key(model, lookup) for lookup in _lookups(q))
+    hops = all_hops - set([None])
+    if not hops:
+        return q, False
+    if _negated(q):
+        # a negated multi-valued condition means no related row matches
+        return q, True
+    if len(hops) == 1 and None not in all_hops:
+        return _semijoin_hop(model, q, hops.pop()), False
+
+    children = [
+        c if isinstance(c, Q) else Q(**{c[0]: c[1]}) for c in q.children]
+    if q.connector == Q.OR:
+        # a row matches either condition iff one of them matches some row
+        planned = [semijoin(model, child) for child in children]
+        if any(joined for child, joined in planned):
+            return q, True
+        return reduce(operator.__or__, [child for child, j in planned]), False
+
+    # ANDed conditions on the same relation go in the same subquery
+    groups = []
+    for child in children:
+        child_hops = set(_hop_key(model, l) for l in _lookups(child))
+        child_hops.discard(None)
+        if len(child_hops) > 1:
+            return q, True
+        hop = child_hops.pop() if child_hops else None
+        for group_hop, group in groups:
+            if group_hop == hop:
+                group.append(child)
+                break
+        else:
+            groups.append((hop, [child]))
+    planned = []
+    for hop, group in groups:
+        group_q = reduce(operator.__and__, group)
+        if hop is not None:
+            group_q = _semijoin_hop(model, group_q, hop)
+        planned.append(group_q)
+    return reduce(operator.__and__, planned), False
+
+
+
+def _lookups(q):
+    """Yield the lookup strings in Q object ``q``."""
+    for child in q.children:
+        if isinstance(child, Q):
+            for lookup in _lookups(child):
+                yield lookup
+        else:
+            yield child[0]
+
+
+
+def _hop_key(model, lookup):
+    """
+    Return the first to-many relation crossed by ``lookup`` on ``model``.
+
+    Returns tuple of lookup parts up to and including that relation, or None
+    if ``lookup`` doesn't cross a to-many relation.
+
+    """
+    parts = lookup.split(LOOKUP_SEP)
+    for i, part in enumerate(parts):
+        try:
+            field, _, direct, m2m = model._meta.get_field_by_name(part)
+        except FieldDoesNotExist:
+            return None
+        if m2m or not direct:
+            return tuple(parts[:i + 1])
+        if field.rel is None:
+            return None
+        model = field.rel.to
+    return None
+
+
+
+def _semijoin_hop(model, q, hop):
+    """Return ``q``, all of whose lookups cross ``hop``, as a semi-join."""
+    prefix, name = hop[:-1], hop[-1]
+    for part in prefix:
+        model = model._meta.get_field_by_name(part)[0].rel.to
+    field, _, direct, m2m = model._meta.get_field_by_name(name)
+
+    if direct:
+        # forward many-to-many; subquery on the through table
+        sub_model = field.rel.through
+        back = field.m2m_field_name()
+        forward = [field.m2m_reverse_field_name()]
+    elif m2m:
+        # reverse many-to-many; subquery on the through table
+        sub_model = field.field.rel.through
+        back = field.field.m2m_reverse_field_name()
+        forward = [field.field.m2m_field_name()]
+    else:
+        # reverse foreign key; subquery on the related table
+        sub_model = field.model
+        back = field.field.name
+        forward = []
+
+    def rewrite(lookup):
+        rest = lookup.split(LOOKUP_SEP)[len(hop):]
+        if not forward and not _is_field(sub_model, rest):
+            rest = ["pk"] + rest
+        return LOOKUP_SEP.join(forward + rest)
+
+    # related rows are matched whether soft-deleted or not, as in a join
+    subquery = sub_model._default_manager.filter(
+        _rewrite(q, rewrite)).values(back)
+    if prefix:
+        return Q(**{LOOKUP_SEP.join(prefix + ("in",)): subquery})
+    return Q(pk__in=subquery)
+
+
+
+def _negated(q):
+    """Return True if Q object ``q`` or any Q nested in it is negated."""
+    return q.negated or any(
+        _negated(child) for child in q.children if isinstance(child, Q))
+
+
+
+def _is_field(model, parts):
+    """Return True if lookup ``parts`` start with a field name of ``model``."""
+    if not parts:
+        return False
+    if parts[0] == "pk":
+        return True
+    try:
+        model._meta.get_field_by_name(parts[0])
+    except FieldDoesNotExist:
+        return False
+    return True
+
+
+
+def _rewrite(q, func):
+    """Return copy of Q object ``q`` with ``func`` applied to its lookups."""
+    new = Q()
+    new.connector = q.connector
+    new.negated = q.negated
+    new.children = [
+        _rewrite(child, func) if isinstance(child, Q)
+        else (func(child[0]), child[1])
+        for child in q.children
+        ]
+    return new
+
+
+
+def _defined_in(cls, name):
+    """Return the class in ``cls``'s MRO that defines attribute ``name``."""
+    for base in cls.__mro__:
+        if name in vars(base):
+            return base
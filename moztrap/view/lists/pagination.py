@@ -2,9 +2,16 @@
 List pagination utilities.
 
 """
+import base64
+import datetime
+import decimal
+import json
 import math
+import operator
+from django.db.models import ForeignKey, Q
+from django.db.models.fields import FieldDoesNotExist
 from django.db.utils import DatabaseError
-from django.core.exceptions import SuspiciousOperation
+from django.core.exceptions import SuspiciousOperation, ValidationError
 from ..utils.querystring import update_querystring
 
 
@@ -12,6 +19,9 @@ from ..utils.querystring import update_querystring
 PAGESIZES = [10, 20, 50, 100]
 DEFAULT_PAGESIZE = 20
 
+# in keyset mode, count at most this many objects from the current page on
+COUNT_CAP = 1000
+
 
 
 def from_request(request):
@@ -40,25 +50,68 @@ def from_request(request):
 
 
 
+def after_from_request(request):
+    """Given a request, return the keyset page token, or None."""
+    return request.GET.get("after") or None
+
+
+
 def pagesize_url(url, pagesize):
-    return update_querystring(url, pagesize=pagesize, pagenumber=1)
+    return update_querystring(url, pagesize=pagesize, pagenumber=1, after=None)
 
 
 
 def pagenumber_url(url, pagenumber):
-    return update_querystring(url, pagenumber=pagenumber)
+    return update_querystring(url, pagenumber=pagenumber, after=None)
+
+
+
+def next_page_url(url, pager):
+    """Return ``url`` changed to point to the page after ``pager``'s page."""
+    return update_querystring(
+        url, pagenumber=pager.next, after=pager.next_token)
 
 
 
 class Pager(object):
     """Handles pagination given queryset, page size, and page number."""
-    def __init__(self, queryset, pagesize, pagenumber):
-        """Initialize a ``Pager`` with queryset, page size, and page number."""
+    def __init__(self, queryset, pagesize, pagenumber,
+                 keyset=False, after=None, count_cap=None):
+        """
+        Initialize a ``Pager`` with queryset, page size, and page number.
+
+        With ``keyset``, pages are found by seeking past the sort key of the
+        last object on the previous page, rather than by offset; ``after`` is
+        that page's ``next_token``, and ``pagenumber`` is only for display.
+        Pages can then only be visited in order, but finding a deep page
+        doesn't mean scanning all the rows before it. If the queryset's
+        ordering can't be seeked on (e.g. it's by an extra select), the pager
+        falls back to offset pagination.
+
+        With ``count_cap``, at most that many objects from the start of the
+        current page on are counted; ``total_capped`` is then True if there
+        are more than that.
+
+        """
         self._queryset = queryset
         self._sliced_qs = None
         self._cached_total = None
+        self._next_token = None
         self.pagesize = pagesize
         self.pagenumber = pagenumber
+        self.count_cap = count_cap
+        self._capped = False
+
+        self.keyset = False
+        self._ordering = None
+        self._after = None
+        if keyset:
+            self._ordering = keyset_ordering(queryset)
+            self.keyset = self._ordering is not None
+        if self.keyset:
+            self._after = self._seek_filter(after)
+            if self._after is None:
+                self.pagenumber = 1
 
 
     def sizes(self):
@@ -105,20 +158,65 @@ class Pager(object):
 
     @property
     def total(self):
-        """The total number of objects."""
+        """The total number of objects (or the capped count, if capped)."""
         if self._cached_total is None:
-            # @@@ Django 1.5 should not require the .values part and could be
-            # changed to just:
-            #     self._cached_total = self._queryset.count()
-            # Bug 18248
-            try:
-                self._cached_total = self._queryset.count()
-            except DatabaseError:
-                self._cached_total = self._queryset.values("id").count()
+            if self.keyset or self.count_cap is not None:
+                self._cached_total = self._count_from_page()
+            else:
+                self._cached_total = self._count(self._queryset)
 
         return self._cached_total
 
 
+    @property
+    def total_capped(self):
+        """True if there are more objects than were counted."""
+        self.total
+        return self._capped
+
+
+    def _count(self, queryset):
+        """Return the count of ``queryset``."""
+        # @@@ Django 1.5 should not require the .values part and could be
+        # changed to just:
+        #     return queryset.count()
+        # Bug 18248
+        try:
+            return queryset.count()
+        except DatabaseError:
+            return queryset.values("id").count()
+
+
+    def _count_from_page(self):
+        """
+        Count objects before the current page, plus those from it on.
+
+        Objects before the current page aren't counted, they are assumed to
+        fill the previous pages. If ``count_cap`` is set, no more than that
+        many objects (or a page, if more) from the current page on are
+        counted.
+
+        """
+        skipped = self.pagesize * (self.pagenumber - 1)
+        if self.keyset:
+            remaining = self._seek_queryset().values("id")
+        else:
+            remaining = self._queryset.values("id")[skipped:]
+        cap = None
+        if self.count_cap is not None:
+            cap = max(self.count_cap, self.pagesize)
+            remaining = remaining[:cap + 1]
+        count = remaining.count()
+
+        if cap is not None and count > cap:
+            self._capped = True
+            count = cap
+        elif not count and skipped:
+            # past the end; don't claim the previous pages are full
+            return self._count(self._queryset)
+        return skipped + count
+
+
     @property
     def objects(self):
         """
@@ -131,15 +229,98 @@ class Pager(object):
         if self._sliced_qs is None:
             if not self.high:
                 self._sliced_qs = self._queryset.empty()
+            elif self.keyset:
+                self._sliced_qs = self._seek_queryset()[:self.pagesize]
             else:
                 self._sliced_qs = self._queryset[self.low - 1:self.high]
         return self._sliced_qs
 
 
+    @property
+    def next_token(self):
+        """
+        Page token for the page after this one, in keyset mode.
+
+        Encodes the sort key of the last object on this page. None if there is
+        no next page.
+
+        """
+        if self._next_token is None and self.keyset and self.next:
+            last = list(self.objects)[-1]
+            names = [name for name, desc in self._ordering]
+            values = list(
+                self._queryset.model._base_manager.filter(
+                    pk=last.pk).values_list(*names)[0])
+            self._next_token = base64.urlsafe_b64encode(
+                json.dumps(
+                    [_order_by(self._ordering), values], default=_jsonable))
+        return self._next_token
+
+
+    def _seek_queryset(self):
+        """Queryset of objects from the current page on, in keyset mode."""
+        qs = self._queryset.order_by(*_order_by(self._ordering))
+        # the ordering already accounts for any reverse(); don't flip it again
+        if not qs.query.standard_ordering:
+            qs = qs.reverse()
+        if self._after is not None:
+            qs = qs.filter(self._after)
+        return qs
+
+
+    def _seek_filter(self, token):
+        """
+        Return Q for objects after the sort key in page ``token``.
+
+        Returns None if there's no token, or if it isn't valid for the
+        queryset's current ordering (e.g. because the sort has changed).
+
+        """
+        if not token:
+            return None
+        try:
+            order_by, values = json.loads(
+                base64.urlsafe_b64decode(token.encode("ascii")))
+        except (TypeError, ValueError, UnicodeError):
+            return None
+        if (order_by != _order_by(self._ordering) or
+                not isinstance(values, list)):
+            return None
+
+        # objects that sort the same as the token up to a field, then after
+        # it on that field
+        clauses = []
+        same = Q()
+        for (name, desc), value in zip(self._ordering, values):
+            # MySQL sorts nulls first
+            if value is None:
+                if not desc:
+                    clauses.append(same & Q(**{name + "__isnull": False}))
+                same &= Q(**{name + "__isnull": True})
+            else:
+                lookup = "{0}__{1}".format(name, "lt" if desc else "gt")
+                beyond = Q(**{lookup: value})
+                if desc:
+                    beyond |= Q(**{name + "__isnull": True})
+                clauses.append(same & beyond)
+                same &= Q(**{name: value})
+        if not clauses:
+            return None
+        after = reduce(operator.or_, clauses)
+        try:
+            self._queryset.filter(after)
+        except (TypeError, ValueError, ValidationError):
+            return None
+        return after
+
+
     @property
     def num_pages(self):
-        """The total number of pages."""
-        return max(1, int(math.ceil(float(self.total) / self.pagesize)))
+        """The total number of pages (that we know of, if count is capped)."""
+        total = self.total
+        if self.total_capped:
+            total += 1
+        return max(1, int(math.ceil(float(total) / self.pagesize)))
 
 
     @property
@@ -178,6 +359,90 @@ class Pager(object):
 
 
 
+def keyset_ordering(queryset):
+    """
+    Return the ordering of ``queryset`` as a list of (field, descending).
+
+    Orderings by a relation are expanded to the related model's ordering, as
+    the database sees them, and the primary key is appended to make the order
+    unique. A ``reverse()``d queryset's ordering is flipped, as the database
+    sees it. Returns None if the queryset's ordering can't be used for keyset
+    pagination.
+
+    """
+    query = queryset.query
+    if query.extra_order_by:
+        return None
+    order_by = list(query.order_by)
+    if not order_by and query.default_ordering:
+        order_by = list(queryset.model._meta.ordering)
+
+    ordering = []
+    for field in order_by:
+        expanded = _expand_ordering(
+            queryset.model, field.lstrip("-"), field.startswith("-"))
+        if expanded is None:
+            return None
+        ordering.extend(expanded)
+    if ("id", False) not in ordering and ("id", True) not in ordering:
+        ordering.append(("id", False))
+    if not query.standard_ordering:
+        ordering = [(name, not desc) for name, desc in ordering]
+    return ordering
+
+
+
+def _expand_ordering(model, name, desc):
+    """Return list of (field, descending) for ``name`` on ``model``."""
+    if name == "pk":
+        name = "id"
+    parts = name.split("__")
+    field = None
+    for part in parts:
+        if field is not None:
+            if not isinstance(field, ForeignKey):
+                return None
+            model = field.rel.to
+        try:
+            field, _, direct, m2m = model._meta.get_field_by_name(part)
+        except FieldDoesNotExist:
+            return None
+        if not direct or m2m:
+            return None
+
+    if isinstance(field, ForeignKey) and field.rel.to._meta.ordering:
+        expanded = []
+        for related in field.rel.to._meta.ordering:
+            more = _expand_ordering(
+                field.rel.to,
+                related.lstrip("-"),
+                desc != related.startswith("-"),
+                )
+            if more is None:
+                return None
+            expanded.extend(
+                [("{0}__{1}".format(name, n), d) for n, d in more])
+        return expanded
+    return [(name, desc)]
+
+
+
+def _order_by(ordering):
+    """Return ``order_by`` arguments for list of (field, descending)."""
+    return [("-" if desc else "") + name for name, desc in ordering]
+
+
+
+def _jsonable(value):
+    """Convert a sort key value that json can't encode."""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError("{0!r} is not JSON serializable".format(value))
+
+
+
 def positive_integer(val, default):
     """Attempt to coerce ``val`` to a positive integer, with fallback."""
     try:
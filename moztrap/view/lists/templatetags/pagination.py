@@ -16,20 +16,38 @@ register = Library()
 
 
 class Paginate(Tag):
-    """Paginate the given queryset, placing a Pager in the template context."""
+    """
+    Paginate the given queryset, placing a Pager in the template context.
+
+    With a trailing ``keyset``, e.g. ``{% paginate qs as pager keyset %}``,
+    the pager uses keyset pagination and a capped count, for long lists.
+
+    """
     name = "paginate"
     options = Options(
         Argument("queryset"),
         "as",
         Argument("varname", resolve=False),
+        Argument("mode", required=False, resolve=False),
         )
 
 
-    def render_tag(self, context, queryset, varname):
+    def render_tag(self, context, queryset, varname, mode):
         """Place Pager for given ``queryset`` in context as ``varname``."""
         request = context["request"]
         pagesize, pagenum = pagination.from_request(request)
-        context[varname] = pagination.Pager(queryset, pagesize, pagenum)
+        if mode == "keyset":
+            pager = pagination.Pager(
+                queryset,
+                pagesize,
+                pagenum,
+                keyset=True,
+                after=pagination.after_from_request(request),
+                count_cap=pagination.COUNT_CAP,
+                )
+        else:
+            pager = pagination.Pager(queryset, pagesize, pagenum)
+        context[varname] = pager
         return u""
 
 
@@ -44,6 +62,13 @@ def pagenumber_url(request, pagenumber):
 
 
 
+@register.filter
+def next_page_url(request, pager):
+    """Return current full URL changed to point to the next page of pager."""
+    return pagination.next_page_url(request.get_full_path(), pager)
+
+
+
 @register.filter
 def pagesize_url(request, pagesize):
     """Return current full URL with pagesize replaced."""
@@ -245,7 +245,8 @@ def narrow_environments(request, object_type, object_id):
 
     obj = get_object_or_404(model_class, pk=object_id)
 
-    current_env_ids = set(obj.environments.values_list("id", flat=True))
+    current_env_ids = set(
+        obj.effective_environments.values_list("id", flat=True))
 
     if request.method == "POST":
         env_ids = set(map(int, request.POST.getlist("environments")))
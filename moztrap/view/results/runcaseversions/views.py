@@ -28,7 +28,7 @@ def runcaseversions_list(request):
         request,
         "results/case/cases.html",
         {
-            "runcaseversions": model.RunCaseVersion.objects.only(
+            "runcaseversions": model.RunCaseVersion.objects.with_progress().only(
                 "caseversion__name",
                 "caseversion__case__priority",
                 "run__name",
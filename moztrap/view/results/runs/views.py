@@ -28,7 +28,8 @@ def runs_list(request):
         request,
         "results/run/runs.html",
         {
-            "runs": model.Run.objects.filter(is_series=False).only(
+            "runs": model.Run.objects.with_progress().filter(
+                is_series=False).only(
                 "name",
                 "start",
                 "end",
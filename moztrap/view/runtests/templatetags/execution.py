@@ -11,6 +11,124 @@ from .... import model
 register = template.Library()
 
 
+# context key under which ``prefetch_results`` stores a ``PageResults``
+PREFETCHED = "_prefetched_results"
+
+# statuses of other testers' results shown alongside the user's
+OTHER_RESULT_STATES = (
+    model.Result.COMPLETED_STATES + [model.Result.STATUS.skipped])
+
+
+
+def _pk(obj):
+    """Return primary key of model instance ``obj``, or ``obj`` itself."""
+    return getattr(obj, "pk", obj)
+
+
+
+class PageResults(object):
+    """
+    Results for a page of runcaseversions, for one user and environment.
+
+    Loads the user's latest results, other testers' latest completed results,
+    and the step results of the user's results for all the runcaseversions in
+    three queries, so the ``result_for``, ``other_result_for`` and
+    ``stepresult_for`` tags can look them up instead of querying for each
+    runcaseversion and step.
+
+    """
+    def __init__(self, runcaseversions, user, environment):
+        """Load results for ``runcaseversions`` run by ``user`` in env."""
+        self.rcvs = dict((rcv.id, rcv) for rcv in runcaseversions)
+        self.user_id = _pk(user)
+        self.environment_id = _pk(environment)
+
+        self.results = {}
+        self.other_results = {}
+        self.stepresults = {}
+        if not self.rcvs:
+            return
+
+        for result in model.Result.objects.filter(
+                runcaseversion__in=self.rcvs,
+                environment=environment,
+                tester=user,
+                latest_for__isnull=False,
+                ):
+            result.runcaseversion = self.rcvs[result.runcaseversion_id]
+            self.results[result.runcaseversion_id] = result
+
+        # newest first, so the first one seen for each rcv is kept
+        for result in model.Result.objects.select_related("tester").filter(
+                runcaseversion__in=self.rcvs,
+                environment=environment,
+                latest_for__isnull=False,
+                status__in=OTHER_RESULT_STATES,
+                ).exclude(tester=user).order_by("-modified_on"):
+            self.other_results.setdefault(result.runcaseversion_id, result)
+
+        if self.results:
+            for stepresult in model.StepResult.objects.filter(
+                    result__in=[r.id for r in self.results.values()]):
+                self.stepresults[
+                    (stepresult.result_id, stepresult.step_id)] = stepresult
+
+
+    def covers(self, runcaseversion, user, environment):
+        """Return True if results for these were loaded."""
+        return (
+            _pk(runcaseversion) in self.rcvs and
+            _pk(user) == self.user_id and
+            _pk(environment) == self.environment_id
+            )
+
+
+    def covers_result(self, result):
+        """Return True if step results for ``result`` were loaded."""
+        if result.pk is None:
+            return result.runcaseversion_id in self.rcvs
+        return self.results.get(result.runcaseversion_id) is result
+
+
+
+class PrefetchResults(Tag):
+    """
+    Loads results for a page of runcaseversions for the tags below.
+
+    Use before rendering ``result_for``, ``other_result_for`` and
+    ``stepresult_for`` for each of the runcaseversions; any of them not
+    covered by the prefetch fall back to querying individually.
+
+    """
+    name = "prefetch_results"
+    options = Options(
+        Argument("runcaseversions"),
+        Argument("user"),
+        Argument("environment"),
+        )
+
+
+    def render_tag(self, context, runcaseversions, user, environment):
+        """Place ``PageResults`` for the runcaseversions in context."""
+        context[PREFETCHED] = PageResults(runcaseversions, user, environment)
+        return u""
+
+
+register.tag(PrefetchResults)
+
+
+
+def _default_result(runcaseversion, user, environment):
+    """Return unsaved default result for runcaseversion/user/env."""
+    return model.Result(
+        environment=environment,
+        tester=user,
+        runcaseversion=runcaseversion,
+        is_latest=True,
+        )
+
+
+
 class ResultFor(Tag):
     """
     Places Result for this runcaseversion/user/env in context.
@@ -31,23 +149,23 @@ class ResultFor(Tag):
 
     def render_tag(self, context, runcaseversion, user, environment, varname):
         """Get/construct Result and place it in context under ``varname``"""
-        result_kwargs = dict(
-            environment=environment,
-            tester=user,
-            runcaseversion=runcaseversion,
-            is_latest=True,
-            )
-        try:
-            result = model.Result.objects.get(**result_kwargs)
-        except model.Result.DoesNotExist:
-            result = model.Result(**result_kwargs)
-        except model.Result.MultipleObjectsReturned:
-            # find the latest one and set it to latest, which will set all
-            # others to is_latest=False
-            result = model.Result.objects.filter(**result_kwargs).order_by(
-                "-modified_on")[0]
-            result.set_latest()
-            result.save()
+        page = context.get(PREFETCHED)
+        if page is not None and page.covers(
+                runcaseversion, user, environment):
+            result = page.results.get(_pk(runcaseversion))
+            if result is None:
+                result = _default_result(runcaseversion, user, environment)
+        else:
+            try:
+                result = model.LatestResult.objects.select_related(
+                    "result").get(
+                    runcaseversion=runcaseversion,
+                    environment=environment,
+                    tester=user,
+                    result__deleted_on=None,
+                    ).result
+            except model.LatestResult.DoesNotExist:
+                result = _default_result(runcaseversion, user, environment)
 
         context[varname] = result
         return u""
@@ -75,28 +193,21 @@ class OtherResultFor(Tag):
     def render_tag(self, context, runcaseversion, user, environment, varname):
         """Get/construct Result and place it in context under ``varname``"""
 
+        page = context.get(PREFETCHED)
+        if page is not None and page.covers(
+                runcaseversion, user, environment):
+            context[varname] = page.other_results.get(_pk(runcaseversion))
+            return u""
+
         # check for any completed result states from other users for this
         # same case/env combo.
-        include_kwargs = dict(
-            environment=environment,
-            runcaseversion=runcaseversion,
-            is_latest=True,
-            status__in=(model.Result.COMPLETED_STATES +
-                [model.Result.STATUS.skipped]),
-            )
-        exclude_kwargs = dict(
-            tester=user,
-            )
-
         try:
-            result = model.Result.objects.only(
-                "id",
-                "status",
-                "tester",
-                "comment",
-                ).filter(
-                    **include_kwargs).exclude(**exclude_kwargs).order_by(
-                    "-modified_on")[0]
+            result = model.Result.objects.select_related("tester").filter(
+                environment=environment,
+                runcaseversion=runcaseversion,
+                latest_for__isnull=False,
+                status__in=OTHER_RESULT_STATES,
+                ).exclude(tester=user).order_by("-modified_on")[0]
         except IndexError:
             result = None
 
@@ -132,10 +243,16 @@ class StepResultFor(Tag):
             result=result,
             step=casestep,
             )
-        try:
-            stepresult = model.StepResult.objects.get(**stepresult_kwargs)
-        except model.StepResult.DoesNotExist:
-            stepresult = model.StepResult(**stepresult_kwargs)
+        page = context.get(PREFETCHED)
+        if page is not None and page.covers_result(result):
+            stepresult = page.stepresults.get((result.pk, casestep.pk))
+            if stepresult is None:
+                stepresult = model.StepResult(**stepresult_kwargs)
+        else:
+            try:
+                stepresult = model.StepResult.objects.get(**stepresult_kwargs)
+            except model.StepResult.DoesNotExist:
+                stepresult = model.StepResult(**stepresult_kwargs)
 
         context[varname] = stepresult
         return u""
@@ -138,6 +138,13 @@ def run(request, run_id, env_id):
             "Please select a different test run.")
         return redirect("runtests")
 
+    if run.is_locking:
+        messages.info(
+            request,
+            "That test run is still being prepared for testing. "
+            "Please try again in a few minutes.")
+        return redirect("runtests")
+
     # if the environment specified in the URL doesn't exist for this run,
     # then ask the user to specify one that does.
     try:
@@ -218,17 +225,10 @@ def run(request, run_id, env_id):
     envform = EnvironmentSelectionForm(
         current=environment.id, environments=run.environments.all())
 
-    current_result_select = (
-        "SELECT status from execution_result as r "
-        "WHERE r.runcaseversion_id = execution_runcaseversion.id "
-        "AND r.environment_id = {0} "
-        "AND r.status not in ({1}) "
-        "AND r.is_latest = 1 "
-        "ORDER BY r.created_on DESC LIMIT 1".format(
-            environment.id,
-            ", ".join(
-                ["'{0}'".format(x) for x in model.Result.PENDING_STATES]
-                )))
+    # status of the newest non-pending latest result by anyone, for sorting
+    current_result_select = model.LatestResult.current_status_sql()
+    current_result_params = model.LatestResult.current_status_params(
+        environment)
 
     return TemplateResponse(
         request,
@@ -247,8 +247,10 @@ def run(request, run_id, env_id):
                     "caseversion__steps",
                     ).filter(
                         environments=environment,
-                        ).extra(select={
-                            "current_result": current_result_select}),
+                        ).extra(
+                            select={"current_result": current_result_select},
+                            select_params=current_result_params,
+                            ),
             "finder": {
                 # finder decorator populates top column (products), we
                 # prepopulate the other two columns
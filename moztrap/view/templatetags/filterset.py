@@ -40,7 +40,8 @@ class FiltersetToJSONNode(template.Node):
                 "options": [],
             }
             # additional keys potentially assigned to the fields
-            for key in ("key", "cls", "switchable", "is_default_and"):
+            keys = ("key", "cls", "switchable", "is_default_and", "more")
+            for key in keys:
                 if hasattr(field, key):
                     field_struct[key] = getattr(field, key)
             for option in field:
@@ -33,6 +33,63 @@ var MT = (function (MT, $) {
         $(context).prepend(destination);
     };
 
+    // Filters with too many options list only some of them; the others are
+    // fetched a page at a time from the list page, optionally narrowed down
+    // to those starting with the text typed in the filter's search box.
+    MT.searchFilterOptions = function (context) {
+        var fetchOptions = function (group, page) {
+            var input = group.find('.optionsearch input'),
+                key = input.data('key'),
+                list = group.find('.filter-items'),
+                moreLink = list.find('.moreoptions a');
+
+            $.get(
+                window.location.pathname,
+                {filteroptions: key, text: input.val(), page: page},
+                function (response) {
+                    var options = [],
+                        found;
+
+                    // drop unselected options found by a previous search
+                    if (page === 1) {
+                        list.find('.filter-item.found').filter(function () {
+                            return !$(this).children('input').prop('checked');
+                        }).remove();
+                    }
+                    $.each(response.options, function (i, opt) {
+                        if (!list.find('input[value="' + opt[1] + '"]').length) {
+                            options.push({
+                                _counter: 'found-' + opt[1],
+                                label: opt[0],
+                                selected: false,
+                                value: opt[1]
+                            });
+                        }
+                    });
+                    found = ich.filter_group({
+                        'field': {key: key},
+                        'prefix': input.data('prefix'),
+                        '_options': options
+                    }).find('.filter-item').addClass('found');
+                    list.find('.moreoptions').before(found);
+                    moreLink.data('page', page + 1);
+                    moreLink.toggle(response.more);
+                }
+            );
+        };
+
+        $(context).on('keyup', '.filter-group .optionsearch input', function () {
+            var group = $(this).closest('.filter-group');
+            $(this).doTimeout('optionsearch', 300, function () {
+                fetchOptions(group, 1);
+            });
+        });
+        $(context).on('click', '.filter-group .moreoptions a', function (e) {
+            e.preventDefault();
+            fetchOptions($(this).closest('.filter-group'), $(this).data('page'));
+        });
+    };
+
     // Shows/hides the advanced filtering
     MT.toggleAdvancedFiltering = function (context) {
         var advanced = $(context).find('.visual'),
@@ -156,6 +156,7 @@ var MT = (function (MT, $) {
 
         // filtering.js
         MT.toggleAdvancedFiltering('.magicfilter');
+        MT.searchFilterOptions('.magicfilter');
         MT.preventCaching('#filter');
         MT.directFilterLinks();
         MT.filterFormAjax('.manage, .viewresults, .run');
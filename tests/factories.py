@@ -183,6 +183,14 @@ class CaseVersionFactory(EnvironmentsFactoryMixin, factory.Factory):
             lambda obj, containers: containers[0].productversion.product))
 
 
+    @classmethod
+    def create(cls, **kwargs):
+        """A caseversion given its own ``environments`` is env-narrowed."""
+        if "environments" in kwargs:
+            kwargs.setdefault("envs_narrowed", True)
+        return super(CaseVersionFactory, cls).create(**kwargs)
+
+
 
 class CaseAttachmentFactory(factory.Factory):
     FACTORY_FOR = model.CaseAttachment
@@ -0,0 +1,95 @@
+"""
+Tests for management command to archive the results of disabled runs.
+
+"""
+from cStringIO import StringIO
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from mock import patch
+
+from tests import case
+
+
+
+class ArchiveRunsTest(case.DBTestCase):
+    """Tests for archive_runs management command."""
+    def setUp(self):
+        """Archive into a temporary directory."""
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_root)
+        settings = self.settings(RUN_ARCHIVE_ROOT=archive_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+    def call_command(self, *args, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("archive_runs", *args, **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def disabled_run(self):
+        """Return a disabled run with one result."""
+        result = self.F.ResultFactory.create()
+        run = result.runcaseversion.run
+        run.status = "disabled"
+        run.save()
+        return run
+
+
+    def test_archive_and_restore(self):
+        """Archives the given runs' results, and restores them."""
+        run = self.disabled_run()
+
+        output = self.call_command(str(run.id))
+
+        self.assertEqual(
+            output, "Archived 1 results of run {0}.\n".format(run.id))
+
+        output = self.call_command(str(run.id), restore=True)
+
+        self.assertEqual(
+            output, "Restored 1 results of run {0}.\n".format(run.id))
+
+
+    def test_older_than(self):
+        """Archives disabled runs not modified for the given age."""
+        run = self.disabled_run()
+        self.F.RunFactory.create(status="active")
+
+        with patch(
+                "moztrap.model.core.management.commands.archive_runs.utcnow"
+                ) as mock_utcnow:
+            mock_utcnow.return_value = run.modified_on.replace(
+                year=run.modified_on.year + 2)
+            output = self.call_command(older_than="365d")
+
+        self.assertEqual(
+            output, "Archived 1 results of run {0}.\n".format(run.id))
+
+
+    def test_not_disabled(self):
+        """Archiving a run that isn't disabled is an error."""
+        result = self.F.ResultFactory.create()
+
+        with self.assertRaises(CommandError):
+            self.call_command(str(result.runcaseversion.run.id))
+
+
+    def test_no_runs(self):
+        """Run ids or --older-than are required."""
+        with self.assertRaises(CommandError):
+            self.call_command()
+
+
+    def test_restore_needs_ids(self):
+        """--restore takes run ids."""
+        with self.assertRaises(CommandError):
+            self.call_command(restore=True)
@@ -0,0 +1,62 @@
+"""
+Tests for management command to benchmark run activation.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+
+from mock import patch
+
+from tests import case
+
+
+
+class BenchmarkActivateTest(case.DBTestCase):
+    """Tests for benchmark_activate management command."""
+    def call_command(self, *args, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("benchmark_activate", *args, **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_reports_statements_and_time(self):
+        """Reports statement count and wall time of activating the run."""
+        output = self.call_command(cases=5, envs=2)
+
+        self.assertRegexpMatches(
+            output,
+            r"^Activated run with 5 cases x 2 environments: "
+            r"\d+ statements in \d+\.\d\d seconds\.\n$",
+            )
+
+
+    def test_rolls_back(self):
+        """No synthetic data is left behind."""
+        self.call_command(cases=5, envs=2)
+
+        self.assertEqual(self.model.Run.everything.count(), 0)
+        self.assertEqual(self.model.Case.everything.count(), 0)
+        self.assertEqual(self.model.Product.everything.count(), 0)
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_locks_synchronously(self):
+        """Activation is measured in full, not just queueing a lock job."""
+        target = "moztrap.model.execution.models.Run._lock_case_versions"
+        with patch(target) as lock:
+            self.call_command(cases=5, envs=2)
+
+        self.assertEqual(lock.call_count, 1)
+        self.assertEqual(self.model.Job.objects.count(), 0)
+
+
+    def test_bad_counts(self):
+        """Case and environment counts must be positive."""
+        with self.assertRaises(CommandError):
+            self.call_command(cases=0)
@@ -0,0 +1,50 @@
+"""
+Tests for management command to benchmark reordering product versions.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from mock import patch
+
+from tests import case
+
+
+
+class BenchmarkReorderTest(case.DBTestCase):
+    """Tests for benchmark_reorder management command."""
+    def call_command(self, *args, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("benchmark_reorder", *args, **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_reports_statements_and_time(self):
+        """Reports statement count and wall time of reordering versions."""
+        output = self.call_command(cases=5, versions=3)
+
+        self.assertRegexpMatches(
+            output,
+            r"^Reordered 3 versions with 5 cases: "
+            r"\d+ statements in \d+\.\d\d seconds\.\n$",
+            )
+
+
+    def test_rolls_back(self):
+        """No synthetic data is left behind."""
+        self.call_command(cases=5, versions=3)
+
+        self.assertEqual(self.model.Case.everything.count(), 0)
+        self.assertEqual(self.model.ProductVersion.everything.count(), 0)
+        self.assertEqual(self.model.Product.everything.count(), 0)
+
+
+    def test_bad_counts(self):
+        """Case and version counts must be positive."""
+        with self.assertRaises(CommandError):
+            self.call_command(versions=0)
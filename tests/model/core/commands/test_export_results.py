@@ -0,0 +1,67 @@
+"""
+Tests for management command to export results.
+
+"""
+from cStringIO import StringIO
+import json
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from mock import patch
+
+from tests import case
+
+
+
+class ExportResultsTest(case.DBTestCase):
+    """Tests for export_results management command."""
+    def call_command(self, *args, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("export_results", *args, **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_csv(self):
+        """Exports a run's results as CSV by default."""
+        result = self.F.ResultFactory.create(status="passed")
+
+        output = self.call_command(
+            run=result.runcaseversion.run.id, chunk_size=1)
+
+        lines = output.splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].startswith("id,run_id,"))
+        self.assertTrue(lines[1].startswith("{0},".format(result.id)))
+
+
+    def test_ndjson(self):
+        """Exports a product version's results as newline-delimited JSON."""
+        result = self.F.ResultFactory.create()
+
+        output = self.call_command(
+            productversion=result.runcaseversion.run.productversion.id,
+            format="ndjson",
+            )
+
+        self.assertEqual(
+            [json.loads(line)["id"] for line in output.splitlines()],
+            [result.id],
+            )
+
+
+    def test_bad_format(self):
+        """Format must be csv or ndjson."""
+        with self.assertRaises(CommandError):
+            self.call_command(run=1, format="xml")
+
+
+    def test_one_target(self):
+        """Exactly one of run, series or product version must be given."""
+        with self.assertRaises(CommandError):
+            self.call_command()
+        with self.assertRaises(CommandError):
+            self.call_command(run=1, series=2)
@@ -4,6 +4,7 @@ Tests for management command to import cases.
 """
 from contextlib import contextmanager
 from cStringIO import StringIO
+from importlib import import_module
 import json
 import os
 from tempfile import mkstemp, mkdtemp
@@ -217,3 +218,158 @@ class ImportCasesTest(case.DBTestCase):
 
         self.assertEqual(output, ("No files found to import.\n", ""))
         self.assertEqual(self.model.CaseVersion.objects.count(), 0)
+
+
+    def test_batches_progress(self):
+        """Cases are committed in batches, reporting progress as it goes."""
+        self.F.ProductVersionFactory.create(product__name="Foo", version="1.0")
+
+        data = {
+            "cases": [
+                {"name": name, "steps": [{"instruction": "do this"}]}
+                for name in ["Foo", "Bar", "Baz"]
+                ]
+            }
+
+        with self.tempfile(json.dumps(data)) as path:
+            output = self.call_command(
+                "Foo", "1.0", path, batch_size=2, verbosity=2)
+
+        lines = output[0].splitlines()
+        self.assertIn("read 2 cases, imported 2", lines[0])
+        self.assertIn("read 3 cases, imported 3", lines[1])
+        self.assertIn("cases/s", lines[1])
+        self.assertEqual(self.model.CaseVersion.objects.count(), 3)
+
+
+    def test_suites_after_cases(self):
+        """Suites listed after the cases in the file are imported too."""
+        self.F.ProductVersionFactory.create(product__name="Foo", version="1.0")
+
+        contents = (
+            '{"cases": [{"name": "Foo", "suites": ["S1"], '
+            '"steps": [{"instruction": "do this"}]}], '
+            '"suites": [{"name": "S2", "description": "second"}]}'
+            )
+
+        with self.tempfile(contents) as path:
+            output = self.call_command("Foo", "1.0", path)
+
+        self.assertEqual(output, ("Imported 1 cases\nImported 2 suites\n", ""))
+        self.assertEqual(
+            self.model.Suite.objects.get(name="S2").description, "second")
+
+
+    def test_checkpoint_resume(self):
+        """With a checkpoint, an import resumes after the committed cases."""
+        self.F.ProductVersionFactory.create(product__name="Foo", version="1.0")
+
+        data = {
+            "cases": [
+                {"name": name, "steps": [{"instruction": "do this"}]}
+                for name in ["Foo", "Bar", "Baz"]
+                ]
+            }
+        dir = mkdtemp()
+        checkpoint = os.path.join(dir, "checkpoint")
+
+        with self.tempfile(json.dumps(data)) as path:
+            with open(checkpoint, "w") as fh:
+                json.dump({path: {"cases": 2, "done": False}}, fh)
+
+            output = self.call_command(
+                "Foo", "1.0", path, batch_size=2, checkpoint=checkpoint)
+
+        self.assertEqual(output, ("Imported 1 cases\nImported 0 suites\n", ""))
+        self.assertEqual(self.model.CaseVersion.objects.get().name, "Baz")
+        self.assertFalse(os.path.exists(checkpoint))
+
+
+    def test_checkpoint_saved(self):
+        """Committed batches are checkpointed if a later batch fails."""
+        self.F.ProductVersionFactory.create(product__name="Foo", version="1.0")
+
+        contents = '{"cases": [{"name": "Foo"}, {"name": "Bar"}, {"name": '
+        dir = mkdtemp()
+        checkpoint = os.path.join(dir, "checkpoint")
+
+        with self.tempfile(contents) as path:
+            self.assertRaises(
+                CommandError,
+                self.call_command,
+                "Foo", "1.0", path, batch_size=1, checkpoint=checkpoint
+            )
+
+            with open(checkpoint) as fh:
+                self.assertEqual(
+                    json.load(fh), {path: {"cases": 2, "done": False}})
+
+
+
+class IterImportDataTest(case.TestCase):
+    """Tests for incremental parsing of import files."""
+    def parse(self, contents, read_size=3):
+        """Return list of items parsed from ``contents``."""
+        command = import_module(
+            "moztrap.model.core.management.commands.import")
+        return list(command.iter_import_data(StringIO(contents), read_size))
+
+
+    def test_items(self):
+        """Yields each case, and the values of other keys, in order."""
+        data = {
+            "suites": [{"name": "S", "description": u"\u2603"}],
+            "cases": [{"name": "One", "priority": 12345}, {"name": "Two"}],
+            }
+
+        self.assertEqual(
+            self.parse(json.dumps(data, sort_keys=True)),
+            [
+                ("case", {"name": "One", "priority": 12345}),
+                ("case", {"name": "Two"}),
+                ("suites", data["suites"]),
+                ],
+            )
+
+
+    def test_split_anywhere(self):
+        """Values are parsed whichever read they're cut off by."""
+        case = {
+            "name": u'[{"\\ \u2603 \U0001f600}]',
+            "priority": -1.5e+10,
+            "steps": [{"instruction": "a\nb", "expected": ""}],
+            }
+        contents = json.dumps(
+            {"cases": [case, case], "x": [1.25, True]}, sort_keys=True)
+
+        for read_size in range(1, 12):
+            self.assertEqual(
+                self.parse(contents, read_size),
+                [("case", case), ("case", case), ("x", [1.25, True])],
+                )
+
+
+    def test_empty(self):
+        """An empty object or cases list yields no cases."""
+        self.assertEqual(self.parse(" { } "), [])
+        self.assertEqual(self.parse('{"cases": []}'), [])
+
+
+    def test_invalid(self):
+        """Raises ValueError for invalid or truncated JSON."""
+        for contents in ["", "[]", '{"cases": [{}', '{"cases": [] x', "{} {}"]:
+            with self.assertRaises(ValueError):
+                self.parse(contents)
+
+
+    def test_invalid_fails_fast(self):
+        """Invalid JSON is reported without reading the rest of the file."""
+        command = import_module(
+            "moztrap.model.core.management.commands.import")
+        fh = StringIO(
+            '{"cases": [{"name": "Foo", "priority": x}, ' +
+            '{"name": "Bar"}, ' * 1000 + ']}')
+
+        with self.assertRaises(ValueError):
+            list(command.iter_import_data(fh, 3))
+        self.assertLess(fh.tell(), 100)
@@ -0,0 +1,91 @@
+"""
+Tests for management command to purge long soft-deleted rows.
+
+"""
+from cStringIO import StringIO
+import datetime
+import gzip
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from mock import patch
+
+from tests import case
+
+
+
+class PurgeDeletedTest(case.DBTestCase):
+    """Tests for purge_deleted management command."""
+    def call_command(self, *args, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        kwargs.setdefault("pause", 0)
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("purge_deleted", *args, **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def deleted_suite(self, days_ago, **kwargs):
+        """Return a suite soft-deleted ``days_ago`` days ago."""
+        s = self.F.SuiteFactory.create(**kwargs)
+        with patch("moztrap.model.mtmodel.datetime") as mock_dt:
+            mock_dt.datetime.utcnow.return_value = (
+                datetime.datetime.utcnow() - datetime.timedelta(days_ago))
+            s.delete()
+        return s
+
+
+    def test_purge(self):
+        """Purges rows deleted before the given age, reporting counts."""
+        old = self.deleted_suite(100)
+        recent = self.deleted_suite(10)
+
+        output = self.call_command(older_than="90d")
+
+        self.assertFalse(
+            self.model.Suite.everything.filter(pk=old.pk).exists())
+        self.assertTrue(
+            self.model.Suite.everything.filter(pk=recent.pk).exists())
+        self.assertEqual(
+            output, "library_suite: 1 rows purged.\nPurged 1 rows.\n")
+
+
+    def test_archive(self):
+        """Writes purged rows to a gzipped NDJSON file per table."""
+        self.deleted_suite(100, name="Old suite")
+        archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_dir)
+
+        self.call_command(older_than="90d", archive_dir=archive_dir)
+
+        filenames = os.listdir(archive_dir)
+        self.assertEqual(len(filenames), 1)
+        self.assertTrue(filenames[0].startswith("library_suite-"))
+        fh = gzip.open(os.path.join(archive_dir, filenames[0]))
+        rows = [json.loads(line) for line in fh]
+        fh.close()
+        self.assertEqual([r["name"] for r in rows], ["Old suite"])
+
+
+    def test_older_than_required(self):
+        """--older-than is required."""
+        with self.assertRaises(CommandError):
+            self.call_command()
+
+
+    def test_bad_older_than(self):
+        """--older-than must be a number and a unit."""
+        with self.assertRaises(CommandError):
+            self.call_command(older_than="90 days")
+
+
+    def test_bad_archive_dir(self):
+        """--archive-dir must be an existing directory."""
+        with self.assertRaises(CommandError):
+            self.call_command(older_than="90d", archive_dir="/does/not/exist")
@@ -0,0 +1,68 @@
+"""
+Tests for management command to rebuild run result rollups.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from mock import patch
+
+from tests import case
+
+
+
+class RebuildRollupsTest(case.DBTestCase):
+    """Tests for rebuild_rollups management command."""
+    def call_command(self, *args, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("rebuild_rollups", *args, **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_rebuilds_all(self):
+        """With no arguments, rollups are rebuilt for every run."""
+        r1 = self.F.RunFactory.create()
+        r2 = self.F.RunFactory.create()
+
+        output = self.call_command()
+
+        self.assertEqual(output, "Rebuilt rollups for 2 run(s).\n")
+        self.assertEqual(
+            set(self.model.RunRollup.objects.values_list("run", flat=True)),
+            set([r1.id, r2.id]),
+            )
+
+
+    def test_rebuilds_given_runs(self):
+        """Only the runs with the given ids are rebuilt."""
+        r1 = self.F.RunFactory.create()
+        self.F.RunFactory.create()
+
+        self.call_command(str(r1.id))
+
+        self.assertEqual(
+            set(self.model.RunRollup.objects.values_list("run", flat=True)),
+            set([r1.id]),
+            )
+
+
+    def test_replaces_stale_counts(self):
+        """Existing rollups are replaced by accurate counts."""
+        rcv = self.F.RunCaseVersionFactory.create()
+        self.F.ResultFactory.create(runcaseversion=rcv, status="passed")
+        self.model.RunRollup.objects.create(run=rcv.run, passed=7)
+
+        self.call_command(str(rcv.run.id))
+
+        self.assertEqual(self.model.RunRollup.get_for(rcv.run).passed, 1)
+
+
+    def test_bad_run_id(self):
+        """Non-integer run ids are a usage error."""
+        with self.assertRaises(CommandError):
+            self.call_command("foo")
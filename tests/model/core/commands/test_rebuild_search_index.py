@@ -0,0 +1,72 @@
+"""
+Tests for management command to rebuild the case text search tokens.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from mock import patch
+
+from tests import case
+
+
+
+class RebuildSearchIndexTest(case.DBTestCase):
+    """Tests for rebuild_search_index management command."""
+    def call_command(self, *args, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("rebuild_search_index", *args, **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    def test_rebuilds_all(self):
+        """With no arguments, all caseversions are reindexed."""
+        step = self.F.CaseStepFactory.create(instruction="click")
+        cv = self.F.CaseVersionFactory.create(name="other")
+        self.model.SearchToken.objects.all().delete()
+
+        output = self.call_command()
+
+        self.assertEqual(
+            output, "Rebuilt search tokens for 2 caseversion(s).\n")
+        self.assertEqual(
+            set(
+                self.model.SearchToken.objects.values_list(
+                    "caseversion", "field", "token")),
+            set([
+                    (step.caseversion.id, "name", "test"),
+                    (step.caseversion.id, "name", "case"),
+                    (step.caseversion.id, "name", "version"),
+                    (step.caseversion.id, "instruction", "click"),
+                    (cv.id, "name", "other"),
+                    ]),
+            )
+
+
+    def test_rebuilds_given(self):
+        """Can give ids of caseversions to reindex."""
+        cv1 = self.F.CaseVersionFactory.create(name="one")
+        self.F.CaseVersionFactory.create(name="two")
+        self.model.SearchToken.objects.all().delete()
+
+        output = self.call_command(str(cv1.id))
+
+        self.assertEqual(
+            output, "Rebuilt search tokens for 1 caseversion(s).\n")
+        self.assertEqual(
+            list(
+                self.model.SearchToken.objects.values_list(
+                    "caseversion", "token")),
+            [(cv1.id, "one")],
+            )
+
+
+    def test_bad_args(self):
+        """Non-integer arguments are an error."""
+        with self.assertRaises(CommandError):
+            self.call_command("foo")
@@ -0,0 +1,52 @@
+"""
+Tests for management command to run queued background jobs.
+
+"""
+from cStringIO import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test.utils import override_settings
+
+from mock import patch
+
+from tests import case
+
+
+
+class RunJobsTest(case.DBTestCase):
+    """Tests for run_jobs management command."""
+    def call_command(self, *args, **kwargs):
+        """Runs the management command under test and returns stdout output."""
+        with patch("sys.stdout", StringIO()) as stdout:
+            call_command("run_jobs", *args, **kwargs)
+
+        stdout.seek(0)
+        return stdout.read()
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_runs_queued_jobs(self):
+        """With --once, runs all queued jobs in-process and exits."""
+        r = self.F.RunFactory.create()
+        r.activate()
+
+        output = self.call_command(once=True, workers=1)
+
+        self.assertEqual(output, "Ran 1 job(s).\n")
+        self.assertEqual(
+            self.model.Job.objects.get().status, self.model.Job.STATUS.done)
+        self.assertFalse(self.refresh(r).is_locking)
+
+
+    def test_no_jobs(self):
+        """With --once and an empty queue, exits immediately."""
+        output = self.call_command(once=True, workers=1)
+
+        self.assertEqual(output, "Ran 0 job(s).\n")
+
+
+    def test_bad_workers(self):
+        """Worker count must be at least one."""
+        with self.assertRaises(CommandError):
+            self.call_command(once=True, workers=0)
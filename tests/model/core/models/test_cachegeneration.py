@@ -0,0 +1,145 @@
+"""
+Tests for CacheGeneration model.
+
+"""
+from django.core.signals import request_started, request_finished
+from django.test.utils import override_settings
+
+from tests import case
+
+
+
+@override_settings(CACHE_GENERATION_TTL=60)
+class CacheGenerationTest(case.DBTestCase):
+    """Tests for CacheGeneration model."""
+    @property
+    def CacheGeneration(self):
+        """The model under test."""
+        return self.model.CacheGeneration
+
+
+    def test_bump(self):
+        """Bumping moves on the model's generation, and only that model's."""
+        tag_gen = self.CacheGeneration.current(self.model.Tag)
+        run_gen = self.CacheGeneration.current(self.model.Run)
+
+        self.CacheGeneration.bump(self.model.Tag)
+
+        self.assertNotEqual(
+            self.CacheGeneration.current(self.model.Tag), tag_gen)
+        self.assertEqual(self.CacheGeneration.current(self.model.Run), run_gen)
+        self.assertEqual(
+            self.CacheGeneration.objects.get(name=u"model:tags.tag").generation,
+            1,
+            )
+
+
+    def test_other_process(self):
+        """A bump by another process is seen once the TTL has passed."""
+        gen = self.CacheGeneration.current(self.model.Tag)
+        # as done by another process
+        self.CacheGeneration.objects.create(
+            name=u"model:tags.tag", generation=5)
+
+        self.assertEqual(self.CacheGeneration.current(self.model.Tag), gen)
+        with self.settings(CACHE_GENERATION_TTL=0):
+            self.assertNotEqual(
+                self.CacheGeneration.current(self.model.Tag), gen)
+
+
+    def test_save_bumps(self):
+        """Saving an instance of a model with filter choices bumps it."""
+        gen = self.CacheGeneration.current(self.model.Tag)
+
+        self.F.TagFactory.create()
+
+        self.assertNotEqual(self.CacheGeneration.current(self.model.Tag), gen)
+
+
+    def test_edit_bumps(self):
+        """Saving changes to an existing instance bumps its model too."""
+        t = self.F.TagFactory.create(name="old")
+        gen = self.CacheGeneration.current(self.model.Tag)
+
+        t.name = "new"
+        t.save()
+
+        self.assertNotEqual(self.CacheGeneration.current(self.model.Tag), gen)
+
+
+    def test_delete_bumps(self):
+        """Soft-deleting an instance of a model with filter choices bumps it."""
+        t = self.F.TagFactory.create()
+        gen = self.CacheGeneration.current(self.model.Tag)
+
+        t.delete()
+
+        self.assertNotEqual(self.CacheGeneration.current(self.model.Tag), gen)
+
+
+    def test_other_models_dont_bump(self):
+        """Saving models that don't back filter choices doesn't bump."""
+        self.F.CategoryFactory.create()
+
+        self.assertFalse(self.CacheGeneration.objects.exists())
+
+
+    def test_unlisted_update_fields_dont_bump(self):
+        """Saving only fields choices don't show (e.g. last_login) doesn't."""
+        u = self.F.UserFactory.create()
+        gen = self.CacheGeneration.current(self.model.User)
+
+        u.save(update_fields=["last_login"])
+
+        self.assertEqual(self.CacheGeneration.current(self.model.User), gen)
+
+
+    def test_listed_update_fields_bump(self):
+        """Saving fields the choices do show bumps the model."""
+        u = self.F.UserFactory.create()
+        gen = self.CacheGeneration.current(self.model.User)
+
+        u.username = "new"
+        u.save(update_fields=["username"])
+
+        self.assertNotEqual(self.CacheGeneration.current(self.model.User), gen)
+
+
+    def test_deferred_bumps(self):
+        """Deferred bumps are seen in-process, but only stored when flushed."""
+        gen = self.CacheGeneration.current(self.model.Tag)
+
+        self.CacheGeneration.defer_bumps()
+        try:
+            self.CacheGeneration.bump(self.model.Tag)
+
+            self.assertNotEqual(
+                self.CacheGeneration.current(self.model.Tag), gen)
+            self.assertFalse(self.CacheGeneration.objects.exists())
+        finally:
+            self.CacheGeneration.flush_bumps()
+
+        self.assertEqual(
+            self.CacheGeneration.objects.get(name=u"model:tags.tag").generation,
+            1,
+            )
+        self.CacheGeneration.bump(self.model.Tag)
+        self.assertEqual(
+            self.CacheGeneration.objects.get(name=u"model:tags.tag").generation,
+            2,
+            )
+
+
+    def test_request_defers_bumps(self):
+        """Bumps made during a request are stored when it finishes."""
+        request_started.send(sender=None)
+        try:
+            self.F.TagFactory.create()
+
+            self.assertFalse(self.CacheGeneration.objects.exists())
+        finally:
+            request_finished.send(sender=None)
+
+        self.assertTrue(
+            self.CacheGeneration.objects.filter(
+                name=u"model:tags.tag").exists())
@@ -52,3 +52,53 @@ class ProductTest(case.DBTestCase):
 
         self.assertEqual(self.refresh(v1).order, 1)
         self.assertEqual(self.refresh(v2).order, 2)
+
+
+    def test_reorder_versions_sets_latest_caseversions(self):
+        """reorder_versions marks the latest version of each case."""
+        p = self.F.ProductFactory()
+        v1 = self.F.ProductVersionFactory(product=p, version="1")
+        v2 = self.F.ProductVersionFactory(product=p, version="2")
+        cv1 = self.F.CaseVersionFactory(productversion=v1)
+        cv2 = self.F.CaseVersionFactory(productversion=v2, case=cv1.case)
+        other = self.F.CaseVersionFactory(productversion=v1)
+
+        # version 2 becomes version 0, now the oldest
+        self.model.ProductVersion.objects.filter(pk=v2.pk).update(
+            version="0")
+        p.reorder_versions()
+
+        self.assertTrue(self.refresh(cv1).latest)
+        self.assertFalse(self.refresh(cv2).latest)
+        self.assertTrue(self.refresh(other).latest)
+        self.assertEqual(self.refresh(v2).order, 1)
+        self.assertFalse(self.refresh(v2).latest)
+        self.assertTrue(self.refresh(v1).latest)
+
+
+    def test_reorder_versions_skips_deleted_caseversions(self):
+        """Deleted caseversions' latest flags are left alone."""
+        p = self.F.ProductFactory()
+        v1 = self.F.ProductVersionFactory(product=p, version="1")
+        v2 = self.F.ProductVersionFactory(product=p, version="2")
+        cv1 = self.F.CaseVersionFactory(productversion=v1)
+        cv2 = self.F.CaseVersionFactory(productversion=v2, case=cv1.case)
+        cv2.delete()
+
+        p.reorder_versions()
+
+        self.assertTrue(self.refresh(cv1).latest)
+        self.assertTrue(
+            self.model.CaseVersion.everything.get(pk=cv2.pk).latest)
+
+
+    def test_reorder_versions_fixed_queries(self):
+        """Queries don't grow with the number of versions or cases."""
+        p = self.F.ProductFactory()
+        for version in ["1", "2", "3"]:
+            pv = self.F.ProductVersionFactory(product=p, version=version)
+            self.F.CaseVersionFactory.create_batch(2, productversion=pv)
+
+        # versions, case versions; nothing to reorder
+        with self.assertNumQueries(2):
+            p.reorder_versions()
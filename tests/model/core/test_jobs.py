@@ -0,0 +1,155 @@
+"""
+Tests for the database-backed background job queue.
+
+"""
+import datetime
+
+from django.test.utils import override_settings
+
+from moztrap.model.core import jobs
+
+from tests import case
+
+
+
+CALLS = []
+
+
+
+def record(*args):
+    """A task that records its arguments."""
+    CALLS.append(args)
+
+
+
+def explode():
+    """A task that fails."""
+    raise ValueError("Boom!")
+
+
+
+class JobsTest(case.DBTestCase):
+    """Tests for enqueueing, claiming and running jobs."""
+    def setUp(self):
+        """Clear recorded task calls."""
+        del CALLS[:]
+
+
+    @override_settings(ASYNC_JOBS=False)
+    def test_sync_runs_immediately(self):
+        """When jobs aren't asynchronous, the task is called right away."""
+        job = jobs.enqueue(record, 1, "two")
+
+        self.assertEqual(job, None)
+        self.assertEqual(CALLS, [(1, "two")])
+        self.assertEqual(self.model.Job.objects.count(), 0)
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_async_queues(self):
+        """When jobs are asynchronous, a queued job is created."""
+        u = self.F.UserFactory.create()
+
+        job = jobs.enqueue(record, 1, "two", user=u)
+
+        self.assertEqual(CALLS, [])
+        self.assertEqual(job.task, "tests.model.core.test_jobs.record")
+        self.assertEqual(job.args, '[1, "two"]')
+        self.assertEqual(job.status, "queued")
+        self.assertEqual(job.user, u)
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_identical_queued_job_reused(self):
+        """An identical job already waiting is returned, not duplicated."""
+        job = jobs.enqueue(record, 1)
+
+        self.assertEqual(jobs.enqueue(record, 1), job)
+        self.assertNotEqual(jobs.enqueue(record, 2), job)
+        self.assertEqual(self.model.Job.objects.count(), 2)
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_identical_running_job_reused(self):
+        """An identical job already running is returned, not duplicated."""
+        job = jobs.enqueue(record, 1)
+        jobs.claim()
+
+        self.assertEqual(jobs.enqueue(record, 1), job)
+        self.assertEqual(self.model.Job.objects.count(), 1)
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_is_queued(self):
+        """A job is queued until it is claimed."""
+        jobs.enqueue(record, 1)
+
+        self.assertTrue(jobs.is_queued(record, 1))
+        self.assertFalse(jobs.is_queued(record, 2))
+        jobs.claim()
+        self.assertFalse(jobs.is_queued(record, 1))
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_claim_oldest(self):
+        """Claiming marks the oldest queued job running and returns it."""
+        first = jobs.enqueue(record, 1)
+        second = jobs.enqueue(record, 2)
+
+        claimed = jobs.claim()
+
+        self.assertEqual(claimed, first)
+        self.assertEqual(claimed.status, "running")
+        self.assertIsNotNone(claimed.started_on)
+        self.assertEqual(jobs.claim(), second)
+        self.assertEqual(jobs.claim(), None)
+
+
+    @override_settings(ASYNC_JOBS=True, JOB_TIMEOUT=60)
+    def test_claim_requeues_stale(self):
+        """A job running for longer than JOB_TIMEOUT is claimed again."""
+        job = jobs.enqueue(record, 1)
+        jobs.claim()
+        self.model.Job.objects.filter(pk=job.pk).update(
+            started_on=datetime.datetime.utcnow()
+            - datetime.timedelta(seconds=61))
+
+        claimed = jobs.claim()
+
+        self.assertEqual(claimed, job)
+        self.assertEqual(claimed.status, "running")
+        self.assertEqual(jobs.claim(), None)
+
+
+    @override_settings(ASYNC_JOBS=True, JOB_TIMEOUT=60)
+    def test_claim_leaves_running(self):
+        """A job running for less than JOB_TIMEOUT is not claimed again."""
+        jobs.enqueue(record, 1)
+        jobs.claim()
+
+        self.assertEqual(jobs.claim(), None)
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_run_success(self):
+        """Running a job calls its task and marks it done."""
+        job = jobs.enqueue(record, 1)
+
+        self.assertTrue(jobs.run(jobs.claim().id))
+
+        job = self.refresh(job)
+        self.assertEqual(CALLS, [(1,)])
+        self.assertEqual(job.status, "done")
+        self.assertIsNotNone(job.finished_on)
+
+
+    @override_settings(ASYNC_JOBS=True)
+    def test_run_failure(self):
+        """A job whose task raises is marked failed, with the traceback."""
+        job = jobs.enqueue(explode)
+
+        self.assertFalse(jobs.run(jobs.claim().id))
+
+        job = self.refresh(job)
+        self.assertEqual(job.status, "failed")
+        self.assertIn("ValueError: Boom!", job.error)
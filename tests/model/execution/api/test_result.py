@@ -5,6 +5,8 @@ This is a write-only resource via ``patch``.  So no read for lists, etc.
 This works by providing results for an existing test run.
 
 """
+import json
+import urllib
 
 from tests import case
 
@@ -330,3 +332,246 @@ class ResultResourceTest(case.api.ApiTestCase):
             params=params,
             status=401,
             )
+
+
+    def test_submit_bulk_results(self):
+        """Submit a batch of results; each object gets its own outcome."""
+        user = self.F.UserFactory.create(
+            username="foo",
+            permissions=["execution.execute"],
+            )
+        apikey = self.F.ApiKeyFactory.create(owner=user)
+        envs = self.F.EnvironmentFactory.create_full_set(
+                {"OS": ["OS X", "Linux"]})
+        pv = self.F.ProductVersionFactory.create(environments=envs)
+        r1 = self.F.RunFactory.create(name="RunA", productversion=pv)
+
+        c_p = self.F.CaseVersionFactory.create(
+            case__product=pv.product,
+            productversion=pv,
+            name="PassCase",
+            )
+
+        self.factory.create(caseversion=c_p, run=r1, environments=envs)
+
+        params = {"username": user.username, "api_key": apikey.key}
+        payload = {
+            "objects": [
+                    {
+                    "case": c_p.case.id,
+                    "environment": envs[0].id,
+                    "run_id": r1.id,
+                    "status": "passed"
+                },
+                    {
+                    "case": c_p.case.id,
+                    "environment": envs[1].id,
+                    "run_id": r1.id,
+                    "status": "confused"
+                }
+            ]
+        }
+
+        res = self.post(
+            self.get_list_url(self.resource_name) + "bulk/",
+            params=params,
+            payload=payload,
+            status=200,
+            )
+
+        self.assertEqual(
+            res.json["objects"],
+            [
+                {u"created": 1},
+                {u"error": u"Unknown result status: confused"},
+                ]
+            )
+        result = self.model.Result.objects.get(runcaseversion__caseversion=c_p)
+        self.assertEqual(result.status, "passed")
+        self.assertEqual(result.environment, envs[0])
+        self.assertEqual(result.tester, user)
+
+
+    def test_submit_bulk_results_no_objects(self):
+        """A bulk submission without a list of objects is a bad request."""
+        user = self.F.UserFactory.create(
+            username="foo",
+            permissions=["execution.execute"],
+            )
+        apikey = self.F.ApiKeyFactory.create(owner=user)
+
+        params = {"username": user.username, "api_key": apikey.key}
+
+        self.post(
+            self.get_list_url(self.resource_name) + "bulk/",
+            params=params,
+            payload={"objects": "nope"},
+            status=400,
+            )
+
+
+    def test_submit_bulk_results_no_authorization(self):
+        """Results a user isn't authorized to submit get error outcomes."""
+        user = self.F.UserFactory.create(
+            username="foo",
+            )
+        apikey = self.F.ApiKeyFactory.create(owner=user)
+        envs = self.F.EnvironmentFactory.create_full_set(
+                {"OS": ["OS X"]})
+        pv = self.F.ProductVersionFactory.create(environments=envs)
+        r1 = self.F.RunFactory.create(name="RunA", productversion=pv)
+
+        c_p = self.F.CaseVersionFactory.create(
+            case__product=pv.product,
+            productversion=pv,
+            name="PassCase",
+            )
+
+        self.factory.create(caseversion=c_p, run=r1)
+
+        params = {"username": user.username, "api_key": apikey.key}
+        payload = {
+            "objects": [
+                    {
+                    "case": c_p.case.id,
+                    "environment": envs[0].id,
+                    "run_id": r1.id,
+                    "status": "passed"
+                }
+            ]
+        }
+
+        res = self.post(
+            self.get_list_url(self.resource_name) + "bulk/",
+            params=params,
+            payload=payload,
+            status=200,
+            )
+
+        self.assertIn("Not authorized", res.json["objects"][0]["error"])
+        self.assertEqual(self.model.Result.objects.count(), 0)
+
+
+    def test_submit_streamed_results(self):
+        """Submit newline-delimited results; a report streams back."""
+        user = self.F.UserFactory.create(
+            username="foo",
+            permissions=["execution.execute"],
+            )
+        apikey = self.F.ApiKeyFactory.create(owner=user)
+        envs = self.F.EnvironmentFactory.create_full_set(
+                {"OS": ["OS X", "Linux"]})
+        pv = self.F.ProductVersionFactory.create(environments=envs)
+        r1 = self.F.RunFactory.create(name="RunA", productversion=pv)
+
+        c_p = self.F.CaseVersionFactory.create(
+            case__product=pv.product,
+            productversion=pv,
+            name="PassCase",
+            )
+
+        self.factory.create(caseversion=c_p, run=r1, environments=envs)
+
+        params = {
+            "username": user.username,
+            "api_key": apikey.key,
+            "chunk_size": 1,
+            "upload_key": "ci-123",
+            }
+        body = "".join(
+            json.dumps({
+                    "case": c_p.case.id,
+                    "environment": env.id,
+                    "run_id": r1.id,
+                    "status": "passed",
+                    }) + "\n"
+            for env in envs
+            )
+
+        res = self.app.post(
+            "{0}?{1}".format(
+                self.get_list_url(self.resource_name) + "stream/",
+                urllib.urlencode(params),
+                ),
+            body,
+            headers={"content-type": "application/x-ndjson"},
+            )
+
+        self.assertEqual(res.content_type, "application/x-ndjson")
+        reports = [json.loads(line) for line in res.body.splitlines()]
+        self.assertEqual(
+            reports,
+            [
+                {u"lines": [1, 1], u"created": 1, u"errors": []},
+                {u"lines": [2, 2], u"created": 1, u"errors": []},
+                {u"done": True, u"lines": 2, u"created": 2},
+                ]
+            )
+        self.assertEqual(
+            self.model.Result.objects.filter(
+                runcaseversion__caseversion=c_p).count(),
+            2,
+            )
+
+
+    def test_submit_streamed_results_bad_chunk_size(self):
+        """A streamed upload needs a positive chunk size."""
+        user = self.F.UserFactory.create(
+            username="foo",
+            permissions=["execution.execute"],
+            )
+        apikey = self.F.ApiKeyFactory.create(owner=user)
+
+        params = {
+            "username": user.username,
+            "api_key": apikey.key,
+            "chunk_size": 0,
+            }
+
+        self.app.post(
+            "{0}?{1}".format(
+                self.get_list_url(self.resource_name) + "stream/",
+                urllib.urlencode(params),
+                ),
+            "",
+            headers={"content-type": "application/x-ndjson"},
+            status=400,
+            )
+
+
+    def test_export_results(self):
+        """Results of a run can be exported as newline-delimited JSON."""
+        envs = self.F.EnvironmentFactory.create_full_set({"OS": ["Linux"]})
+        rcv = self.factory.create(
+            caseversion__name="Export", run__name="RunX", environments=envs)
+        result = self.F.ResultFactory.create(
+            runcaseversion=rcv,
+            environment=envs[0],
+            tester__username="tester",
+            status="passed",
+            )
+
+        res = self.app.get(
+            self.get_list_url(self.resource_name) + "export/",
+            params={"run": rcv.run.id, "format": "ndjson"},
+            )
+
+        self.assertEqual(res.content_type, "application/x-ndjson")
+        rows = [json.loads(line) for line in res.body.splitlines()]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["id"], result.id)
+        self.assertEqual(rows[0]["run"], "RunX")
+        self.assertEqual(rows[0]["case"], "Export")
+        self.assertEqual(rows[0]["environment"], "Linux")
+        self.assertEqual(rows[0]["tester"], "tester")
+        self.assertEqual(rows[0]["status"], "passed")
+
+
+    def test_export_results_bad_params(self):
+        """Export needs exactly one integer id, and a known format."""
+        url = self.get_list_url(self.resource_name) + "export/"
+
+        self.app.get(url, status=400)
+        self.app.get(url, params={"run": "x"}, status=400)
+        self.app.get(url, params={"run": 1, "series": 2}, status=400)
+        self.app.get(url, params={"run": 1, "format": "xml"}, status=400)
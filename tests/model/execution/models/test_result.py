@@ -67,3 +67,58 @@ class ResultTest(case.DBTestCase):
         self.assertEqual(r2.status, "failed")
         self.assertEqual(r2.is_latest, True)
         self.assertEqual(r1.is_latest, False)
+
+
+    def test_new_result_updates_latest_pointer(self):
+        """A new result becomes its tester's latest for the rcv/env."""
+        r1 = self.F.ResultFactory.create()
+        r2 = self.F.ResultFactory.create(
+            runcaseversion=r1.runcaseversion,
+            environment=r1.environment,
+            tester=r1.tester,
+            )
+        other = self.F.ResultFactory.create(
+            runcaseversion=r1.runcaseversion,
+            environment=r1.environment,
+            )
+
+        pointers = self.model.LatestResult.objects.filter(
+            runcaseversion=r1.runcaseversion, environment=r1.environment)
+
+        self.assertEqual(
+            set(pointers.values_list("tester", "result")),
+            set([(r1.tester.id, r2.id), (other.tester.id, other.id)]),
+            )
+        self.assertFalse(self.refresh(r1).is_latest)
+        self.assertTrue(self.refresh(r2).is_latest)
+        self.assertTrue(self.refresh(other).is_latest)
+
+
+    def test_point_to_never_goes_back(self):
+        """Pointing to an older result doesn't replace a newer latest one."""
+        r1 = self.F.ResultFactory.create()
+        r2 = self.F.ResultFactory.create(
+            runcaseversion=r1.runcaseversion,
+            environment=r1.environment,
+            tester=r1.tester,
+            )
+
+        self.model.LatestResult.point_to(r1)
+
+        self.assertEqual(
+            self.model.LatestResult.objects.get(
+                runcaseversion=r1.runcaseversion).result,
+            r2,
+            )
+
+
+    def test_latest_pointer_status(self):
+        """The latest result pointer keeps a copy of the result's status."""
+        r = self.F.ResultFactory.create(status="started")
+        pointer = self.model.LatestResult.objects.get(result=r)
+        self.assertEqual(pointer.status, "started")
+
+        r.status = "passed"
+        r.save()
+
+        self.assertEqual(self.refresh(pointer).status, "passed")
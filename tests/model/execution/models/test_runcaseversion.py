@@ -202,6 +202,59 @@ class RunCaseVersionTest(case.DBTestCase):
         self.assertEqual(rcv.completion(), 0)
 
 
+    def test_with_progress(self):
+        """``with_progress`` attaches completion and result summary data."""
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]})
+        rcv = self.F.RunCaseVersionFactory.create(environments=envs)
+        self.F.ResultFactory(
+            runcaseversion=rcv, environment=envs[0], status="passed")
+        self.F.ResultFactory(
+            runcaseversion=rcv, environment=envs[1], status="skipped")
+
+        rcvs = list(
+            self.model.RunCaseVersion.objects.with_progress().filter(
+                pk=rcv.pk))
+
+        with self.assertNumQueries(0):
+            self.assertEqual(rcvs[0].completion(), 1.0)
+            self.assertEqual(rcvs[0].result_summary()["passed"], 1)
+
+
+    def test_with_progress_fixed_queries(self):
+        """Progress for many rcvs is loaded with a fixed number of queries."""
+        for i in range(3):
+            rcv = self.F.RunCaseVersionFactory.create()
+            self.F.ResultFactory(runcaseversion=rcv, status="failed")
+
+        with self.assertNumQueries(4):
+            rcvs = list(self.model.RunCaseVersion.objects.with_progress())
+            for rcv in rcvs:
+                rcv.completion()
+                rcv.result_summary()
+
+
+    def test_order_by_completion(self):
+        """Runcaseversions can be ordered by completion in SQL."""
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]})
+        half = self.F.RunCaseVersionFactory.create(environments=envs)
+        full = self.F.RunCaseVersionFactory.create(environments=envs)
+        none = self.F.RunCaseVersionFactory.create(environments=envs)
+        self.F.ResultFactory(
+            runcaseversion=half, environment=envs[0], status="passed")
+        self.F.ResultFactory(
+            runcaseversion=full, environment=envs[0], status="blocked")
+        self.F.ResultFactory(
+            runcaseversion=full, environment=envs[1], status="skipped")
+        self.F.ResultFactory(
+            runcaseversion=none, environment=envs[1], status="started")
+
+        rcvs = self.model.RunCaseVersion.objects.order_by("-completion")
+
+        self.assertEqual(list(rcvs), [full, half, none])
+
+
     def test_testers(self):
         """Testers method returns list of distinct testers of this rcv."""
         t1 = self.F.UserFactory.create()
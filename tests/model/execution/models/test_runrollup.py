@@ -0,0 +1,178 @@
+"""
+Tests for RunRollup model.
+
+"""
+from django.db import IntegrityError
+
+from tests import case
+
+
+
+class RunRollupTest(case.DBTestCase):
+    """Tests for RunRollup."""
+    def setUp(self):
+        """Set up a run with two runcaseversions in two environments."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Windows", "Linux"]})
+        pv = self.F.ProductVersionFactory(environments=self.envs)
+        self.run = self.F.RunFactory(productversion=pv)
+        self.rcv1 = self.F.RunCaseVersionFactory(
+            run=self.run, caseversion__productversion=pv)
+        self.rcv2 = self.F.RunCaseVersionFactory(
+            run=self.run, caseversion__productversion=pv)
+        self.tester = self.F.UserFactory()
+
+
+    def counts(self, rollup):
+        """Return dict of the count fields of ``rollup``."""
+        return dict(
+            (f, getattr(rollup, f)) for f in self.model.RunRollup.COUNT_FIELDS)
+
+
+    def assertMatchesRebuild(self):
+        """Assert current rollups for the run equal freshly-built ones."""
+        current = dict(
+            (r.environment_id, self.counts(r))
+            for r in self.model.RunRollup.objects.filter(run=self.run))
+        rebuilt = dict(
+            (r.environment_id, self.counts(r))
+            for r in self.model.RunRollup.rebuild(self.run))
+
+        self.assertEqual(current, rebuilt)
+
+
+    def test_unicode(self):
+        """Unicode representation names run and environment ids."""
+        r = self.model.RunRollup(run_id=3, environment_id=4)
+
+        self.assertEqual(unicode(r), u"Rollup for run 3, environment 4")
+
+
+    def test_built_on_first_read(self):
+        """Rollups are built when first read, with a row per env and run."""
+        self.F.ResultFactory(
+            runcaseversion=self.rcv1, environment=self.envs[0],
+            status="passed")
+
+        rollup = self.model.RunRollup.get_for(self.run)
+
+        self.assertEqual(rollup.environment_id, None)
+        self.assertEqual(rollup.total, 4)
+        self.assertEqual(rollup.completed, 1)
+        self.assertEqual(rollup.passed, 1)
+        self.assertEqual(
+            self.model.RunRollup.objects.filter(run=self.run).count(), 3)
+
+
+    def test_rebuild_replaces(self):
+        """Rebuilding a run's rollups replaces rather than duplicates them."""
+        self.model.RunRollup.get_for(self.run)
+
+        self.model.RunRollup.rebuild(self.run)
+
+        self.assertEqual(
+            self.model.RunRollup.objects.filter(run=self.run).count(), 3)
+
+
+    def test_unique_per_environment(self):
+        """There can be only one rollup per run and environment."""
+        self.model.RunRollup.get_for(self.run)
+
+        with self.assertRaises(IntegrityError):
+            self.model.RunRollup.objects.create(
+                run=self.run, environment=self.envs[0])
+
+
+    def test_missing_environment(self):
+        """An environment not in the run gets an empty, unsaved rollup."""
+        other = self.F.EnvironmentFactory()
+
+        rollup = self.model.RunRollup.get_for(self.run, other)
+
+        self.assertEqual(rollup.pk, None)
+        self.assertEqual(rollup.total, 0)
+        self.assertEqual(rollup.completion(), 0)
+
+
+    def test_incremental_results(self):
+        """New results adjust existing rollups to match a full rebuild."""
+        self.model.RunRollup.get_for(self.run)
+        other = self.F.UserFactory()
+
+        self.rcv1.result_pass(self.envs[0], user=self.tester)
+        self.rcv1.result_fail(self.envs[0], user=other)
+        self.rcv1.result_invalid(self.envs[0], user=self.tester)
+        self.rcv2.start(self.envs[1], user=self.tester)
+        self.rcv2.result_skip(user=other)
+
+        self.assertMatchesRebuild()
+
+        rollup = self.model.RunRollup.get_for(self.run)
+        self.assertEqual(rollup.completed, 1)
+        self.assertEqual(rollup.invalidated, 1)
+        self.assertEqual(rollup.failed, 1)
+        self.assertEqual(rollup.passed, 0)
+        self.assertEqual(rollup.skipped, 2)
+
+
+    def test_result_in_new_environment_invalidates(self):
+        """A result in an environment with no rollup drops the run's rollups."""
+        self.model.RunRollup.get_for(self.run)
+
+        self.F.ResultFactory(runcaseversion=self.rcv1, status="passed")
+
+        self.assertEqual(
+            self.model.RunRollup.objects.filter(run=self.run).count(), 0)
+        self.assertEqual(self.run.result_summary()["passed"], 1)
+
+
+    def test_edit_result_invalidates(self):
+        """Editing an existing result drops the run's rollups."""
+        r = self.rcv1.result_pass(self.envs[0], user=self.tester)
+        self.model.RunRollup.get_for(self.run)
+
+        r.status = "failed"
+        r.save()
+
+        self.assertEqual(
+            self.model.RunRollup.objects.filter(run=self.run).count(), 0)
+        self.assertEqual(self.run.result_summary()["failed"], 1)
+
+
+    def test_delete_result_invalidates(self):
+        """Soft-deleting a result drops the run's rollups."""
+        r = self.rcv1.result_pass(self.envs[0], user=self.tester)
+        self.assertEqual(self.run.completion(), 0.25)
+
+        r.delete()
+
+        self.assertEqual(self.run.completion(), 0)
+
+
+    def test_remove_envs_invalidates(self):
+        """Removing environments from runcaseversions drops rollups."""
+        self.assertEqual(self.model.RunRollup.get_for(self.run).total, 4)
+
+        self.rcv1.remove_envs(self.envs[0])
+
+        self.assertEqual(self.model.RunRollup.get_for(self.run).total, 3)
+
+
+    def test_new_runcaseversion_invalidates(self):
+        """Adding a runcaseversion to the run drops its rollups."""
+        self.assertEqual(self.model.RunRollup.get_for(self.run).total, 4)
+
+        self.F.RunCaseVersionFactory(
+            run=self.run,
+            caseversion__productversion=self.run.productversion,
+            )
+
+        self.assertEqual(self.model.RunRollup.get_for(self.run).total, 6)
+
+
+    def test_completion_single_env(self):
+        """Per-environment completion comes from that env's rollup."""
+        self.rcv1.result_pass(self.envs[0], user=self.tester)
+
+        self.assertEqual(self.run.completion_single_env(self.envs[0].id), 0.5)
+        self.assertEqual(self.run.completion_single_env(self.envs[1].id), 0.0)
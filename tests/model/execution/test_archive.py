@@ -0,0 +1,149 @@
+"""
+Tests for archiving the results of disabled runs.
+
+"""
+import os
+import shutil
+import tempfile
+
+from moztrap.model.execution import archive, export
+
+from tests import case
+
+
+
+class ArchiveTest(case.DBTestCase):
+    """Tests for archive_run and restore_run."""
+    def setUp(self):
+        """A disabled run with a passed and a failed result in one env."""
+        archive_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, archive_root)
+        settings = self.settings(RUN_ARCHIVE_ROOT=archive_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+        envs = self.F.EnvironmentFactory.create_full_set({"OS": ["Linux"]})
+        pv = self.F.ProductVersionFactory(environments=envs)
+        self.run = self.F.RunFactory(productversion=pv)
+        for status in ["passed", "failed"]:
+            rcv = self.F.RunCaseVersionFactory(
+                run=self.run, caseversion__productversion=pv)
+            result = self.F.ResultFactory(
+                runcaseversion=rcv, environment=envs[0], status=status)
+        self.step_result = self.F.StepResultFactory(
+            result=result,
+            step=self.F.CaseStepFactory(caseversion=rcv.caseversion),
+            )
+        self.run.status = "disabled"
+        self.run.save()
+
+
+    def results(self):
+        """Return queryset of the run's results."""
+        return self.model.Result.everything.filter(
+            runcaseversion__run=self.run)
+
+
+    def test_archive(self):
+        """Results move to the archive file; progress reads the same."""
+        completion = self.run.completion()
+        summary = self.run.result_summary()
+
+        count = archive.archive_run(self.run)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(self.results().count(), 0)
+        self.assertFalse(
+            self.model.StepResult.everything.filter(
+                pk=self.step_result.pk).exists())
+        self.assertTrue(os.path.exists(archive.archive_path(self.run)))
+        self.assertTrue(archive.is_archived(self.run))
+        run = self.refresh(self.run)
+        self.assertEqual(run.completion(), completion)
+        self.assertEqual(run.result_summary(), summary)
+
+
+    def test_frozen_rollups_kept(self):
+        """Rollups of an archived run aren't dropped by invalidation."""
+        archive.archive_run(self.run)
+
+        self.model.RunRollup.invalidate(self.run)
+
+        self.assertEqual(self.refresh(self.run).completion(), 1.0)
+
+
+    def test_restore(self):
+        """Restoring moves the rows back, with their ids."""
+        result_ids = set(self.results().values_list("id", flat=True))
+        archive.archive_run(self.run)
+
+        count = archive.restore_run(self.run)
+
+        self.assertEqual(count, 2)
+        self.assertEqual(
+            set(self.results().values_list("id", flat=True)), result_ids)
+        self.assertEqual(
+            self.model.StepResult.everything.get(
+                pk=self.step_result.pk).result_id,
+            self.step_result.result_id,
+            )
+        self.assertEqual(
+            self.model.LatestResult.objects.filter(
+                runcaseversion__run=self.run).count(),
+            2,
+            )
+        self.assertFalse(os.path.exists(archive.archive_path(self.run)))
+        self.assertFalse(archive.is_archived(self.run))
+
+
+    def test_activate_restores(self):
+        """Activating an archived run restores its results first."""
+        archive.archive_run(self.run)
+
+        self.run.activate()
+
+        self.assertFalse(archive.is_archived(self.run))
+        self.assertEqual(self.results().count(), 2)
+        self.assertEqual(self.refresh(self.run).status, "active")
+        self.assertEqual(self.refresh(self.run).completion(), 1.0)
+
+
+    def test_export_refused(self):
+        """Exporting results of an archived run is an error, not empty."""
+        archive.archive_run(self.run)
+
+        with self.assertRaises(ValueError):
+            export.results_for(run=self.run)
+        with self.assertRaises(ValueError):
+            export.results_for(productversion=self.run.productversion)
+
+
+    def test_not_disabled(self):
+        """Only disabled runs can be archived."""
+        self.run.status = "active"
+        self.run.save()
+
+        with self.assertRaises(ValueError):
+            archive.archive_run(self.run)
+
+
+    def test_already_archived(self):
+        """A run can't be archived twice."""
+        archive.archive_run(self.run)
+
+        with self.assertRaises(ValueError):
+            archive.archive_run(self.run)
+
+
+    def test_restore_not_archived(self):
+        """Only archived runs can be restored."""
+        with self.assertRaises(ValueError):
+            archive.restore_run(self.run)
+
+
+    def test_chunks(self):
+        """Results are archived and restored a chunk at a time."""
+        archive.archive_run(self.run, chunk_size=1)
+
+        self.assertEqual(archive.restore_run(self.run, chunk_size=1), 2)
+        self.assertEqual(self.results().count(), 2)
@@ -0,0 +1,340 @@
+"""
+Tests for bulk recording of results.
+
+"""
+import datetime
+import json
+
+from django.db import DatabaseError
+from mock import patch
+
+from moztrap.model.execution.bulk import record_results, ingest_stream
+
+from tests import case
+
+
+
+class RecordResultsTest(case.DBTestCase):
+    """Tests for record_results."""
+    def setUp(self):
+        """Set up a run with two runcaseversions in two environments."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["OS X", "Linux"]})
+        self.pv = self.F.ProductVersionFactory.create(environments=self.envs)
+        self.run = self.F.RunFactory.create(productversion=self.pv)
+        self.rcv1 = self.F.RunCaseVersionFactory.create(
+            run=self.run, caseversion__productversion=self.pv)
+        self.rcv2 = self.F.RunCaseVersionFactory.create(
+            run=self.run, caseversion__productversion=self.pv)
+        self.user = self.F.UserFactory.create()
+
+
+    def item(self, rcv, env, status, **kwargs):
+        """Return a result item dict for ``rcv`` in ``env``."""
+        kwargs.update({
+            "run_id": rcv.run.id,
+            "case": rcv.caseversion.case.id,
+            "environment": env.id,
+            "status": status,
+            })
+        return kwargs
+
+
+    def test_records_results(self):
+        """Results are created with the given statuses and comments."""
+        outcomes = record_results(
+            [
+                self.item(self.rcv1, self.envs[0], "passed"),
+                self.item(
+                    self.rcv2, self.envs[1], "invalidated", comment="huh?"),
+                ],
+            self.user,
+            )
+
+        self.assertEqual(outcomes, [{"created": 1}, {"created": 1}])
+        r1 = self.model.Result.objects.get(runcaseversion=self.rcv1)
+        self.assertEqual(r1.status, "passed")
+        self.assertEqual(r1.environment, self.envs[0])
+        self.assertEqual(r1.tester, self.user)
+        self.assertEqual(r1.created_by, self.user)
+        self.assertTrue(r1.is_latest)
+        r2 = self.model.Result.objects.get(runcaseversion=self.rcv2)
+        self.assertEqual(r2.status, "invalidated")
+        self.assertEqual(r2.comment, "huh?")
+
+
+    def test_fixed_queries(self):
+        """The number of queries doesn't grow with the number of results."""
+        items = [
+            self.item(rcv, env, "passed")
+            for rcv in [self.rcv1, self.rcv2] for env in self.envs
+            ]
+
+        with self.assertNumQueries(7):
+            record_results(items, self.user)
+
+
+    def test_skipped_all_envs(self):
+        """A skipped result is recorded in all the rcv's environments."""
+        outcomes = record_results(
+            [self.item(self.rcv1, self.envs[0], "skipped")], self.user)
+
+        self.assertEqual(outcomes, [{"created": 2}])
+        self.assertEqual(
+            set(self.rcv1.results.values_list("environment", flat=True)),
+            set([e.id for e in self.envs]),
+            )
+
+
+    def test_failed_step(self):
+        """A failed result can have a failed step with a bug URL."""
+        self.F.CaseStepFactory.create(caseversion=self.rcv1.caseversion)
+        step = self.F.CaseStepFactory.create(
+            caseversion=self.rcv1.caseversion, number=2)
+
+        record_results(
+            [
+                self.item(self.rcv1, self.envs[1], "failed"),
+                self.item(
+                    self.rcv1, self.envs[0], "failed",
+                    stepnumber=2, bug="http://example.com/bug"),
+                ],
+            self.user,
+            )
+
+        stepresult = self.model.StepResult.objects.get()
+        self.assertEqual(stepresult.step, step)
+        self.assertEqual(stepresult.status, "failed")
+        self.assertEqual(stepresult.bug_url, "http://example.com/bug")
+        self.assertEqual(stepresult.result.environment, self.envs[0])
+
+
+    @patch("moztrap.model.execution.bulk.utcnow")
+    def test_failed_step_same_time(self, mock_now):
+        """Step results go to their own result, even at the same timestamp."""
+        mock_now.return_value = datetime.datetime(2012, 1, 30)
+        step = self.F.CaseStepFactory.create(caseversion=self.rcv1.caseversion)
+
+        for comment in ["first", "second"]:
+            record_results(
+                [
+                    self.item(
+                        self.rcv1, self.envs[0], "failed", comment=comment,
+                        stepnumber=1, bug="http://example.com/" + comment),
+                    ],
+                self.user,
+                )
+
+        self.assertEqual(
+            sorted(
+                (sr.result.comment, sr.bug_url)
+                for sr in self.model.StepResult.objects.filter(step=step)),
+            [
+                ("first", "http://example.com/first"),
+                ("second", "http://example.com/second"),
+                ],
+            )
+
+
+    def test_sets_latest(self):
+        """Only the user's last result for an rcv/env is latest."""
+        old = self.F.ResultFactory.create(
+            runcaseversion=self.rcv1, environment=self.envs[0],
+            tester=self.user)
+        other = self.F.ResultFactory.create(
+            runcaseversion=self.rcv1, environment=self.envs[0])
+
+        record_results(
+            [
+                self.item(self.rcv1, self.envs[0], "failed"),
+                self.item(self.rcv1, self.envs[0], "passed"),
+                ],
+            self.user,
+            )
+
+        self.assertFalse(self.refresh(old).is_latest)
+        self.assertTrue(self.refresh(other).is_latest)
+        latest = self.model.Result.objects.get(
+            tester=self.user, is_latest=True)
+        self.assertEqual(latest.status, "passed")
+        self.assertEqual(
+            self.model.LatestResult.objects.get(tester=self.user).result,
+            latest,
+            )
+
+
+    def test_updates_rollup(self):
+        """Run completion reflects the new results."""
+        self.assertEqual(self.run.completion(), 0)
+
+        record_results(
+            [self.item(self.rcv1, self.envs[0], "passed")], self.user)
+
+        self.assertEqual(self.run.completion(), 0.25)
+
+
+    def test_item_errors(self):
+        """Bad items get errors without stopping the rest of the batch."""
+        self.rcv2.remove_envs(self.envs[1])
+        missing_env = self.item(self.rcv1, self.envs[0], "passed")
+        missing_env["environment"] = self.envs[1].id + 100
+
+        outcomes = record_results(
+            [
+                {"case": 1},
+                self.item(self.rcv1, self.envs[0], "bogus"),
+                missing_env,
+                self.item(self.rcv2, self.envs[1], "passed"),
+                self.item(self.rcv1, self.envs[0], "passed"),
+                ],
+            self.user,
+            )
+
+        self.assertEqual(
+            outcomes[0],
+            {"error": "bad result object data missing key: 'status'"},
+            )
+        self.assertEqual(
+            outcomes[1], {"error": "Unknown result status: bogus"})
+        self.assertIn("environment does not exist", outcomes[2]["error"])
+        self.assertIn("RunCaseVersion not found", outcomes[3]["error"])
+        self.assertEqual(outcomes[4], {"created": 1})
+        self.assertEqual(self.model.Result.objects.count(), 1)
+
+
+    def test_locking_run(self):
+        """Results can't be recorded in a run that is still locking."""
+        self.run.is_locking = True
+        self.run.save()
+
+        outcomes = record_results(
+            [self.item(self.rcv1, self.envs[0], "passed")], self.user)
+
+        self.assertIn("still being prepared", outcomes[0]["error"])
+
+
+    def test_archived_run(self):
+        """Results can't be recorded in a run whose results are archived."""
+        self.model.RunRollup.get_for(self.run)
+        self.model.RunRollup.objects.filter(run=self.run).update(frozen=True)
+
+        outcomes = record_results(
+            [self.item(self.rcv1, self.envs[0], "passed")], self.user)
+
+        self.assertIn("is archived", outcomes[0]["error"])
+        self.assertEqual(self.model.Result.objects.count(), 0)
+
+
+    def test_authorize_per_run(self):
+        """Authorization is checked once for each run."""
+        other_rcv = self.F.RunCaseVersionFactory.create(
+            caseversion__productversion=self.pv,
+            run__productversion=self.pv,
+            )
+        calls = []
+
+        def authorize(rcvs):
+            calls.append(set(rcvs))
+            return self.rcv1 in rcvs
+
+        outcomes = record_results(
+            [
+                self.item(self.rcv1, self.envs[0], "passed"),
+                self.item(self.rcv2, self.envs[0], "passed"),
+                self.item(other_rcv, self.envs[0], "passed"),
+                ],
+            self.user,
+            authorize,
+            )
+
+        self.assertEqual(len(calls), 2)
+        self.assertIn(set([self.rcv1, self.rcv2]), calls)
+        self.assertIn(set([other_rcv]), calls)
+        self.assertEqual(outcomes[:2], [{"created": 1}, {"created": 1}])
+        self.assertIn("Not authorized", outcomes[2]["error"])
+
+
+
+class IngestStreamTest(case.DBTestCase):
+    """Tests for ingest_stream."""
+    def setUp(self):
+        """Set up a run with a runcaseversion in two environments."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["OS X", "Linux"]})
+        pv = self.F.ProductVersionFactory.create(environments=self.envs)
+        self.rcv = self.F.RunCaseVersionFactory.create(
+            run__productversion=pv, caseversion__productversion=pv)
+        self.user = self.F.UserFactory.create()
+
+
+    def line(self, env, status):
+        """Return a newline-terminated JSON result for ``env``."""
+        return json.dumps({
+                "run_id": self.rcv.run.id,
+                "case": self.rcv.caseversion.case.id,
+                "environment": env.id,
+                "status": status,
+                }) + "\n"
+
+
+    def test_chunks(self):
+        """Results are committed and reported in chunks of lines."""
+        lines = [
+            self.line(self.envs[0], "passed"),
+            "\n",
+            "{not json\n",
+            self.line(self.envs[1], "bogus"),
+            self.line(self.envs[1], "failed"),
+            ]
+
+        reports = list(ingest_stream(lines, self.user, 2))
+
+        self.assertEqual(
+            reports[0], {"lines": [1, 2], "created": 1, "errors": []})
+        self.assertEqual(reports[1]["lines"], [3, 4])
+        self.assertEqual(reports[1]["created"], 0)
+        self.assertEqual(
+            [e["line"] for e in reports[1]["errors"]], [3, 4])
+        self.assertEqual(
+            reports[2], {"lines": [5, 5], "created": 1, "errors": []})
+        self.assertEqual(
+            reports[3], {"done": True, "lines": 5, "created": 2})
+        self.assertEqual(self.rcv.results.count(), 2)
+
+
+    def test_resume(self):
+        """With an upload key, committed lines are skipped when resending."""
+        lines = [
+            self.line(self.envs[0], "passed"),
+            self.line(self.envs[1], "failed"),
+            ]
+
+        # the connection drops after the first chunk
+        next(ingest_stream(iter(lines), self.user, 1, upload_key="ci-123"))
+
+        reports = list(
+            ingest_stream(lines, self.user, 1, upload_key="ci-123"))
+
+        self.assertEqual(reports[0], {"resumed": 1})
+        self.assertEqual(reports[1]["lines"], [2, 2])
+        self.assertEqual(
+            sorted(self.rcv.results.values_list("status", flat=True)),
+            ["failed", "passed"],
+            )
+        self.assertEqual(
+            self.model.ResultUpload.objects.get(key="ci-123").lines, 2)
+
+
+    @patch("moztrap.model.execution.bulk.record_results")
+    def test_database_error(self, mock_record):
+        """A chunk failing to commit is reported, and the stream abandoned."""
+        mock_record.side_effect = DatabaseError("Deadlock found")
+        lines = [
+            self.line(self.envs[0], "passed"),
+            self.line(self.envs[1], "passed"),
+            ]
+
+        reports = list(ingest_stream(lines, self.user, 1))
+
+        self.assertEqual(
+            reports, [{"lines": [1, 1], "error": "Deadlock found"}])
@@ -0,0 +1,117 @@
+"""
+Tests for exporting results.
+
+"""
+import json
+
+from moztrap.model.execution import export
+
+from tests import case
+
+
+
+class ExportTest(case.DBTestCase):
+    """Tests for results_for, iter_results and the output formats."""
+    def setUp(self):
+        """Set up a series with a member run, with results in two envs."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["OS X", "Linux"], "Browser": ["Firefox"]})
+        self.pv = self.F.ProductVersionFactory.create(environments=self.envs)
+        self.series = self.F.RunFactory.create(
+            productversion=self.pv, is_series=True)
+        self.run = self.F.RunFactory.create(
+            productversion=self.pv, series=self.series, name="Nightly")
+        self.rcv = self.F.RunCaseVersionFactory.create(
+            run=self.run,
+            caseversion__productversion=self.pv,
+            caseversion__name="Login",
+            )
+        self.r1 = self.F.ResultFactory.create(
+            runcaseversion=self.rcv,
+            environment=self.envs[0],
+            tester__username="one",
+            status="passed",
+            )
+        self.r2 = self.F.ResultFactory.create(
+            runcaseversion=self.rcv,
+            environment=self.envs[1],
+            tester__username="two",
+            status="failed",
+            comment=u"caf\xe9",
+            )
+        # not in the run
+        self.F.ResultFactory.create()
+
+
+    def test_results_for(self):
+        """Results can be selected by run, series or product version."""
+        expected = set([self.r1.id, self.r2.id])
+        for kwargs in [
+                {"run": self.run},
+                {"series": self.series.id},
+                {"productversion": self.pv},
+                ]:
+            self.assertEqual(
+                set(export.results_for(**kwargs).values_list(
+                        "id", flat=True)),
+                expected,
+                )
+
+
+    def test_results_for_one(self):
+        """Exactly one of run, series or product version is required."""
+        with self.assertRaises(ValueError):
+            export.results_for()
+        with self.assertRaises(ValueError):
+            export.results_for(run=self.run, series=self.series)
+
+
+    def test_iter_results(self):
+        """Results are yielded in id order with their related data."""
+        rows = list(
+            export.iter_results(export.results_for(run=self.run), 1))
+
+        self.assertEqual([r["id"] for r in rows], [self.r1.id, self.r2.id])
+        self.assertEqual(sorted(rows[0]), sorted(export.FIELDS))
+        self.assertEqual(rows[0]["run"], "Nightly")
+        self.assertEqual(rows[0]["run_id"], self.run.id)
+        self.assertEqual(rows[0]["case"], "Login")
+        self.assertEqual(rows[0]["case_id"], self.rcv.caseversion.case.id)
+        self.assertEqual(rows[0]["tester"], "one")
+        self.assertEqual(rows[0]["environment_id"], self.envs[0].id)
+        self.assertEqual(
+            rows[0]["environment"],
+            u", ".join(sorted(e.name for e in self.envs[0].elements.all())),
+            )
+        self.assertEqual(
+            rows[0]["created_on"], self.r1.created_on.isoformat())
+        self.assertEqual(rows[1]["status"], "failed")
+
+
+    def test_fixed_queries_per_chunk(self):
+        """Queries grow with the number of chunks, not of results."""
+        results = export.results_for(run=self.run)
+
+        # results, elements; then the empty chunk
+        with self.assertNumQueries(3):
+            list(export.iter_results(results, 10))
+
+
+    def test_csv(self):
+        """CSV output has a header line and UTF-8 encoded values."""
+        lines = list(export.csv_lines(
+                export.iter_results(export.results_for(run=self.run), 10)))
+
+        self.assertEqual(lines[0], ",".join(export.FIELDS) + "\r\n")
+        self.assertEqual(len(lines), 3)
+        self.assertIn("caf\xc3\xa9", lines[2])
+
+
+    def test_ndjson(self):
+        """NDJSON output has a JSON object per line."""
+        lines = list(export.ndjson_lines(
+                export.iter_results(export.results_for(run=self.run), 10)))
+
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(all(line.endswith("\n") for line in lines))
+        self.assertEqual(json.loads(lines[1])["comment"], u"caf\xe9")
@@ -137,5 +137,6 @@ class CaseVersionAdminTest(case.admin.AdminTestCase):
         form["_selected_action"] = str(cv1.id)
         form.submit("index", 0)
 
-        self.assertEqual(set(cv1.environments.all()), set(envs))
+        self.assertEqual(
+            set(self.refresh(cv1).effective_environments), set(envs))
 
@@ -100,7 +100,7 @@ class CaseVersionResourceTest(ApiCrudCases):
             self.get_detail_url(self.resource_name, str(backend_obj.id)))
         actual[u"environments"] = [unicode(
             self.get_detail_url("environment", str(env.id))
-                ) for env in backend_obj.environments.all()]
+                ) for env in backend_obj.effective_environments]
         actual[u"tags"] = [unicode(self.get_detail_url("tag", str(tag.id))
                                   ) for tag in backend_obj.tags.all()]
 #        actual[u"attachments"] = [unicode(self.get_detail_url("attachment",
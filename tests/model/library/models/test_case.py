@@ -5,6 +5,8 @@ Tests for Case and related models (CaseVersion, CaseStep).
 from datetime import datetime
 
 from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from mock import patch
 
@@ -105,6 +107,19 @@ class CaseVersionTest(case.DBTestCase):
             self.assertEqual(len(SuiteCase.objects.filter(suite=suites[i])), 2)
 
 
+    def test_clone_suite_order(self):
+        """Clone of case is added at the end of the case's suites."""
+        cv = self.F.CaseVersionFactory()
+        suite = self.F.SuiteFactory(product=cv.case.product)
+        self.F.SuiteCaseFactory(suite=suite, case=cv.case, order=3)
+        self.F.SuiteCaseFactory(suite=suite, order=5)
+
+        new = cv.clone(user=self.F.UserFactory.create())
+
+        self.assertEqual(
+            SuiteCase.objects.get(suite=suite, case=new.case).order, 6)
+
+
     def test_clone_steps(self):
         """Cloning a caseversion clones its steps."""
         cs = self.F.CaseStepFactory.create()
@@ -118,6 +133,22 @@ class CaseVersionTest(case.DBTestCase):
         self.assertEqual(cloned_step.instruction, cs.instruction)
 
 
+    def test_clone_steps_queries(self):
+        """Cloning steps takes the same queries however many there are."""
+        def clone_queries(num_steps):
+            cv = self.F.CaseVersionFactory.create()
+            for i in range(num_steps):
+                self.F.CaseStepFactory.create(caseversion=cv, number=i + 1)
+            pv = self.F.ProductVersionFactory.create(
+                product=cv.case.product, version="2.0")
+            with CaptureQueriesContext(connection) as queries:
+                new = cv.clone(overrides={"productversion": pv})
+            self.assertEqual(new.steps.count(), num_steps)
+            return len(queries)
+
+        self.assertEqual(clone_queries(1), clone_queries(10))
+
+
     def test_clone_attachments(self):
         """Cloning a caseversion clones its attachments."""
         ca = self.F.CaseAttachmentFactory.create()
@@ -168,10 +199,27 @@ class CaseVersionTest(case.DBTestCase):
         pv = self.F.ProductVersionFactory(environments={"OS": ["Windows", "Linux"]})
         cv = self.F.CaseVersionFactory(productversion=pv)
 
-        self.assertEqual(set(cv.environments.all()), set(pv.environments.all()))
+        self.assertEqual(
+            set(cv.effective_environments), set(pv.environments.all()))
         self.assertFalse(cv.envs_narrowed)
 
 
+    def test_inherited_envs_not_stored(self):
+        """A non-narrowed caseversion has no environments of its own."""
+        pv = self.F.ProductVersionFactory(environments={"OS": ["Windows", "Linux"]})
+        cv = self.F.CaseVersionFactory(productversion=pv)
+
+        self.assertEqual(cv.environments.count(), 0)
+
+
+    def test_narrowed_gets_productversion_envs(self):
+        """A new narrowed caseversion gets its own copy of pv environments."""
+        pv = self.F.ProductVersionFactory(environments={"OS": ["Windows", "Linux"]})
+        cv = self.F.CaseVersionFactory(productversion=pv, envs_narrowed=True)
+
+        self.assertEqual(set(cv.environments.all()), set(pv.environments.all()))
+
+
     def test_deleting_last_version_deletes_case(self):
         """Deleting the last case version deletes its case as well."""
         c = self.F.CaseFactory.create()
@@ -195,10 +243,21 @@ class CaseVersionTest(case.DBTestCase):
 
         pv.remove_envs(envs[0])
 
-        self.assertEqual(set(cv.environments.all()), set(envs[1:]))
+        self.assertEqual(set(cv.effective_environments), set(envs[1:]))
         self.assertFalse(cv.envs_narrowed)
 
 
+    def test_narrowed_inherits_env_removal(self):
+        """Removing an env from a productversion cascades to narrowed cv."""
+        envs = self.F.EnvironmentFactory.create_full_set({"OS": ["OS X", "Linux"]})
+        pv = self.F.ProductVersionFactory.create(environments=envs)
+        cv = self.F.CaseVersionFactory.create(productversion=pv, envs_narrowed=True)
+
+        pv.remove_envs(envs[0])
+
+        self.assertEqual(set(cv.environments.all()), set(envs[1:]))
+
+
     def test_non_narrowed_inherits_env_addition(self):
         """Adding env to productversion cascades to non-narrowed caseversion."""
         envs = self.F.EnvironmentFactory.create_full_set({"OS": ["OS X", "Linux"]})
@@ -207,7 +266,27 @@ class CaseVersionTest(case.DBTestCase):
 
         pv.add_envs(envs[0])
 
-        self.assertEqual(set(cv.environments.all()), set(envs))
+        self.assertEqual(set(cv.effective_environments), set(envs))
+        self.assertEqual(cv.environments.count(), 0)
+
+
+    def test_env_addition_queries(self):
+        """Cascading env addition takes same queries however many cases."""
+        def add_queries(num_cases):
+            envs = self.F.EnvironmentFactory.create_full_set(
+                {"OS": ["OS X", "Linux"]})
+            pv = self.F.ProductVersionFactory.create(environments=envs[1:])
+            cvs = [
+                self.F.CaseVersionFactory.create(productversion=pv)
+                for i in range(num_cases)
+                ]
+            with CaptureQueriesContext(connection) as queries:
+                pv.add_envs(envs[0])
+            for cv in cvs:
+                self.assertEqual(set(cv.effective_environments), set(envs))
+            return len(queries)
+
+        self.assertEqual(add_queries(1), add_queries(5))
 
 
     def test_narrowed_does_not_inherit_env_addition(self):
@@ -231,7 +310,9 @@ class CaseVersionTest(case.DBTestCase):
 
         cv.remove_env_narrowing()
 
-        self.assertEqual(set(cv.environments.all()), set(envs))
+        self.assertEqual(set(cv.effective_environments), set(envs))
+        self.assertEqual(cv.environments.count(), 0)
+        self.assertFalse(self.refresh(cv).envs_narrowed)
 
 
     def test_remove_narrowing_no_op_when_not_narrowed(self):
@@ -242,24 +323,69 @@ class CaseVersionTest(case.DBTestCase):
 
         pv.add_envs(envs[0])
 
-        self.assertEqual(set(cv.environments.all()), set(envs))
+        self.assertEqual(set(cv.effective_environments), set(envs))
 
         cv.remove_env_narrowing()
 
-        self.assertEqual(set(cv.environments.all()), set(envs))
+        self.assertEqual(set(cv.effective_environments), set(envs))
 
 
 
     def test_direct_env_narrowing_sets_envs_narrowed(self):
         """Removing an env from a caseversion directly sets envs_narrowed."""
         envs = self.F.EnvironmentFactory.create_full_set({"OS": ["OS X", "Linux"]})
-        cv = self.F.CaseVersionFactory.create(environments=envs)
+        pv = self.F.ProductVersionFactory.create(environments=envs)
+        cv = self.F.CaseVersionFactory.create(productversion=pv)
 
         self.assertFalse(cv.envs_narrowed)
 
         cv.remove_envs(envs[0])
 
         self.assertTrue(self.refresh(cv).envs_narrowed)
+        self.assertEqual(set(cv.environments.all()), set(envs[1:]))
+
+
+    def test_adding_inherited_env_does_not_narrow(self):
+        """Adding an env a caseversion inherits leaves it non-narrowed."""
+        envs = self.F.EnvironmentFactory.create_full_set({"OS": ["OS X", "Linux"]})
+        pv = self.F.ProductVersionFactory.create(environments=envs)
+        cv = self.F.CaseVersionFactory.create(productversion=pv)
+
+        cv.add_envs(envs[0])
+
+        self.assertFalse(self.refresh(cv).envs_narrowed)
+        self.assertEqual(cv.environments.count(), 0)
+
+
+    def test_adding_other_env_narrows(self):
+        """Adding an env a caseversion doesn't inherit narrows it."""
+        envs = self.F.EnvironmentFactory.create_full_set({"OS": ["OS X", "Linux"]})
+        pv = self.F.ProductVersionFactory.create(environments=envs[1:])
+        cv = self.F.CaseVersionFactory.create(productversion=pv)
+
+        cv.add_envs(envs[0])
+
+        self.assertTrue(self.refresh(cv).envs_narrowed)
+        self.assertEqual(set(cv.environments.all()), set(envs))
+
+
+    def test_effective_env_q(self):
+        """effective_env_q matches own envs if narrowed, else pv envs."""
+        envs = self.F.EnvironmentFactory.create_full_set({"OS": ["OS X", "Linux"]})
+        pv = self.F.ProductVersionFactory.create(environments=envs)
+        inherits = self.F.CaseVersionFactory.create(productversion=pv)
+        narrowed = self.F.CaseVersionFactory.create(
+            productversion__product=pv.product, environments=envs[1:])
+
+        def matching(env):
+            return set(
+                self.model.CaseVersion.objects.filter(
+                    self.model.CaseVersion.effective_env_q("in", [env])
+                    ).distinct()
+                )
+
+        self.assertEqual(matching(envs[0]), set([inherits]))
+        self.assertEqual(matching(envs[1]), set([inherits, narrowed]))
 
 
     def test_adding_new_version_sets_latest(self):
@@ -509,3 +635,97 @@ class CaseAttachmentTest(case.DBTestCase):
         ca = self.F.CaseAttachmentFactory()
 
         self.assertEqual(ca.url, ca.attachment.url)
+
+
+
+class SearchTokenTest(case.DBTestCase):
+    """Tests for SearchToken."""
+    def tokens(self, cv, field):
+        """Return set of ``cv``'s search tokens in ``field``."""
+        return set(
+            self.model.SearchToken.objects.filter(
+                caseversion=cv, field=field).values_list("token", flat=True))
+
+
+    def matches(self, field, text):
+        """Return set of ids of caseversions matching ``text`` in ``field``."""
+        ids = None
+        for qs in self.model.SearchToken.matching(field, text):
+            found = set(c["caseversion"] for c in qs)
+            ids = found if ids is None else ids & found
+        return ids
+
+
+    def test_tokenize(self):
+        """Text is split into lower-cased words, truncated."""
+        self.assertEqual(
+            self.model.SearchToken.tokenize(u"Open the \xdcber-menu, again!"),
+            set([u"open", u"the", u"\xfcber", u"menu", u"again"]),
+            )
+        self.assertEqual(
+            self.model.SearchToken.tokenize("x" * 50), set(["x" * 40]))
+
+
+    def test_caseversion_saved(self):
+        """Saving a caseversion indexes its name and description."""
+        cv = self.F.CaseVersionFactory.create(
+            name="Log in", description="With a password")
+
+        self.assertEqual(self.tokens(cv, "name"), set(["log", "in"]))
+        self.assertEqual(
+            self.tokens(cv, "description"), set(["with", "a", "password"]))
+
+        cv.name = "Log out"
+        cv.save()
+
+        self.assertEqual(self.tokens(cv, "name"), set(["log", "out"]))
+
+
+    def test_step_saved(self):
+        """Saving a step indexes the text of all its caseversion's steps."""
+        step = self.F.CaseStepFactory.create(
+            instruction="Click it", expected="It works")
+        self.F.CaseStepFactory.create(
+            caseversion=step.caseversion, instruction="Click again")
+
+        self.assertEqual(
+            self.tokens(step.caseversion, "instruction"),
+            set(["click", "it", "again"]),
+            )
+        self.assertEqual(
+            self.tokens(step.caseversion, "expected"), set(["it", "works"]))
+
+
+    def test_step_edited(self):
+        """Editing a step replaces its old words in the index."""
+        step = self.F.CaseStepFactory.create(instruction="Click it")
+
+        step.instruction = "Press it"
+        step.save()
+
+        self.assertEqual(
+            self.tokens(step.caseversion, "instruction"), set(["press", "it"]))
+
+
+    def test_steps_cloned(self):
+        """Cloning a caseversion indexes the text of its cloned steps."""
+        step = self.F.CaseStepFactory.create(instruction="Click it")
+        pv = self.F.ProductVersionFactory.create(
+            product=step.caseversion.case.product, version="2.0")
+
+        new = step.caseversion.clone(overrides={"productversion": pv})
+
+        self.assertEqual(
+            self.tokens(new, "instruction"), set(["click", "it"]))
+
+
+    def test_matching(self):
+        """Matches caseversions with words starting with all given words."""
+        cv1 = self.F.CaseVersionFactory.create(name="Open the menu")
+        cv2 = self.F.CaseVersionFactory.create(name="Open a menuitem")
+        self.F.CaseVersionFactory.create(name="Close the menu")
+
+        self.assertEqual(
+            self.matches("name", "menu open"), set([cv1.id, cv2.id]))
+        self.assertEqual(self.matches("name", "the OPEN"), set([cv1.id]))
+        self.assertEqual(self.matches("name", "pen"), set())
@@ -23,6 +23,22 @@ class SuiteTest(case.DBTestCase):
         self.assertEqual(new.cases.get(), sc.case)
 
 
+    def test_clone_cases_order(self):
+        """Cloned SuiteCases keep their order, and are new rows."""
+        sc1 = self.F.SuiteCaseFactory(order=2)
+        sc2 = self.F.SuiteCaseFactory(suite=sc1.suite, order=1)
+
+        new = sc1.suite.clone()
+
+        self.assertEqual(
+            [sc.case for sc in new.suitecases.all()], [sc2.case, sc1.case])
+        self.assertEqual(
+            self.model.SuiteCase.objects.filter(
+                case__in=[sc1.case, sc2.case]).count(),
+            4,
+            )
+
+
     def test_clone_sets_draft_state(self):
         """Clone of active suite is still draft."""
         s = self.F.SuiteFactory(status="active")
@@ -153,256 +153,28 @@ class ImporterTest(ImporterTestBase, case.DBTestCase):
 
     def test_create_two_caseversions_same_user(self):
         """
-        Two caseversions that both use the same user.  Test that import caches
-        the user and doesn't have to query for it a second time.
-
-        Expect 19 queries for this import:
-
-        Query 1: Ensure this caseversion does not already exist for this
-        productversion::
-
-            SELECT (1) AS `a` FROM `library_caseversion` WHERE
-            (`library_caseversion`.`deleted_on` IS NULL AND
-            `library_caseversion`.`name` = Foo AND
-            `library_caseversion`.`productversion_id` = 12 ) LIMIT 1
-
-        Query 2: Find the user for this email::
-
-            SELECT `auth_user`.`id`, `auth_user`.`username`,
-            `auth_user`.`first_name`, `auth_user`.`last_name`,
-            `auth_user`.`email`, `auth_user`.`password`,
-            `auth_user`.`is_staff`, `auth_user`.`is_active`,
-            `auth_user`.`is_superuser`, `auth_user`.`last_login`,
-            `auth_user`.`date_joined` FROM `auth_user` WHERE
-            `auth_user`.`email` = sumbudee@mozilla.com
-
-        Transaction: SAVEPOINT s140735243669888_x1
-
-        Query 3: Create the first new case object::
-
-            INSERT INTO `library_case` (`created_on`, `created_by_id`,
-            `modified_on`, `modified_by_id`, `deleted_on`, `deleted_by_id`,
-            `product_id`) VALUES (2012-03-07 19:35:34, None, 2012-03-07
-            19:35:34, None, None, None, 12)
-
-        Queries 4-8: Create the first new caseversion object::
-
-            INSERT INTO `library_caseversion` (`created_on`, `created_by_id`,
-            `modified_on`, `modified_by_id`, `deleted_on`, `deleted_by_id`,
-            `status`, `productversion_id`, `case_id`, `name`, `description`,
-            `latest`, `envs_narrowed`) VALUES (2012-03-07 19:35:34, 2,
-            2012-03-07 19:35:34, 2, None, None, draft, 12, 10, Foo, , False,
-            False)
-
-             SELECT `environments_environment`.`id`,
-            `environments_environment`.`created_on`,
-            `environments_environment`.`created_by_id`,
-            `environments_environment`.`modified_on`,
-            `environments_environment`.`modified_by_id`,
-            `environments_environment`.`deleted_on`,
-            `environments_environment`.`deleted_by_id`,
-            `environments_environment`.`profile_id` FROM
-            `environments_environment` INNER JOIN
-            `core_productversion_environments` ON
-            (`environments_environment`.`id` =
-            `core_productversion_environments`.`environment_id`) WHERE
-            (`environments_environment`.`deleted_on` IS NULL AND
-            `core_productversion_environments`.`productversion_id` = 12 )
-
-             SELECT `library_caseversion`.`id`,
-            `library_caseversion`.`created_on`,
-            `library_caseversion`.`created_by_id`,
-            `library_caseversion`.`modified_on`,
-            `library_caseversion`.`modified_by_id`,
-            `library_caseversion`.`deleted_on`,
-            `library_caseversion`.`deleted_by_id`,
-            `library_caseversion`.`status`,
-            `library_caseversion`.`productversion_id`,
-            `library_caseversion`.`case_id`, `library_caseversion`.`name`,
-            `library_caseversion`.`description`,
-            `library_caseversion`.`latest`,
-            `library_caseversion`.`envs_narrowed` FROM `library_caseversion`
-            INNER JOIN `core_productversion` ON
-            (`library_caseversion`.`productversion_id` =
-            `core_productversion`.`id`) WHERE
-            (`library_caseversion`.`deleted_on` IS NULL AND
-            `library_caseversion`.`case_id` = 10 ) ORDER BY
-            `core_productversion`.`order` DESC LIMIT 1
-
-             UPDATE `library_caseversion` SET `latest` = False WHERE
-            (`library_caseversion`.`deleted_on` IS NULL AND
-            `library_caseversion`.`case_id` = 10 )
-
-             UPDATE `library_caseversion` SET `created_on` = 2012-03-07
-            19:35:34, `created_by_id` = 2, `modified_on` = 2012-03-07 19:35:34,
-            `modified_by_id` = 2, `deleted_on` = NULL, `deleted_by_id` = NULL,
-            `status` = draft, `productversion_id` = 12, `case_id` = 10, `name`
-            = Foo, `description` = , `latest` = True, `envs_narrowed` = False
-            WHERE `library_caseversion`.`id` = 10
-
-        Query 9: During save, check if there are other caseversions for this
-                 case to sync names.
-            SELECT `library_caseversion`.`id`, `library_caseversion`
-            .`created_on`,
-            `library_caseversion`.`created_by_id`, `library_caseversion`
-            .`modified_on`,
-            `library_caseversion`.`modified_by_id`, `library_caseversion`
-            .`deleted_on`,
-            `library_caseversion`.`deleted_by_id`, `library_caseversion`
-            .`cc_version`,
-            `library_caseversion`.`status`, `library_caseversion`
-            .`productversion_id`,
-            `library_caseversion`.`case_id`, `library_caseversion`.`name`,
-            `library_caseversion`.`description`, `library_caseversion`
-            .`latest`,
-            `library_caseversion`.`envs_narrowed` FROM `library_caseversion`
-             INNER JOIN
-            `core_productversion` ON (`library_caseversion`
-            .`productversion_id` =
-            `core_productversion`.`id`) WHERE (`library_caseversion`
-            .`deleted_on` IS
-            NULL AND `library_caseversion`.`case_id` = 1 ) ORDER BY
-            `library_caseversion`.`case_id` ASC,
-            `core_productversion`.`order` ASC
-
-        Query 10: Add the new step to the caseversion::
-
-            INSERT INTO `library_casestep` (`created_on`, `created_by_id`,
-            `modified_on`, `modified_by_id`, `deleted_on`, `deleted_by_id`,
-            `caseversion_id`, `number`, `instruction`, `expected`) VALUES
-            (2012-03-07 19:35:34, None, 2012-03-07 19:35:34, None, None, None,
-            10, 1, do this, )
-
-        Transaction: RELEASE SAVEPOINT s140735243669888_x1
-
-        Query 11: Ensure the second caseversion with this name and pv doesn't
-        exist::
-
-            SELECT (1) AS `a` FROM `library_caseversion` WHERE
-            (`library_caseversion`.`deleted_on` IS NULL AND
-            `library_caseversion`.`name` = Bar AND
-            `library_caseversion`.`productversion_id` = 12 ) LIMIT 1
-
-        Transaction: SAVEPOINT s140735243669888_x2
-
-        **NOTE: We didn't have to search for the user again, since it was
-        cached**
-
-        Query 12: Create the second new case::
-
-            INSERT INTO `library_case` (`created_on`, `created_by_id`,
-            `modified_on`, `modified_by_id`, `deleted_on`, `deleted_by_id`,
-            `product_id`) VALUES (2012-03-07 19:35:34, None, 2012-03-07
-            19:35:34, None, None, None, 12)
-
-        Queries 13-17: Create the second new caseversion::
-
-             INSERT INTO `library_caseversion` (`created_on`, `created_by_id`,
-             `modified_on`, `modified_by_id`, `deleted_on`, `deleted_by_id`,
-             `status`, `productversion_id`, `case_id`, `name`, `description`,
-             `latest`, `envs_narrowed`) VALUES (2012-03-07 19:35:34, 2,
-             2012-03-07 19:35:34, 2, None, None, draft, 12, 11, Bar, , False,
-             False)
-
-              SELECT `environments_environment`.`id`,
-             `environments_environment`.`created_on`,
-             `environments_environment`.`created_by_id`,
-             `environments_environment`.`modified_on`,
-             `environments_environment`.`modified_by_id`,
-             `environments_environment`.`deleted_on`,
-             `environments_environment`.`deleted_by_id`,
-             `environments_environment`.`profile_id` FROM
-             `environments_environment` INNER JOIN
-             `core_productversion_environments` ON
-             (`environments_environment`.`id` =
-             `core_productversion_environments`.`environment_id`) WHERE
-             (`environments_environment`.`deleted_on` IS NULL AND
-             `core_productversion_environments`.`productversion_id` = 12 )
-
-              SELECT `library_caseversion`.`id`,
-             `library_caseversion`.`created_on`,
-             `library_caseversion`.`created_by_id`,
-             `library_caseversion`.`modified_on`,
-             `library_caseversion`.`modified_by_id`,
-             `library_caseversion`.`deleted_on`,
-             `library_caseversion`.`deleted_by_id`,
-             `library_caseversion`.`status`,
-             `library_caseversion`.`productversion_id`,
-             `library_caseversion`.`case_id`, `library_caseversion`.`name`,
-             `library_caseversion`.`description`,
-             `library_caseversion`.`latest`,
-             `library_caseversion`.`envs_narrowed` FROM `library_caseversion`
-             INNER JOIN `core_productversion` ON
-             (`library_caseversion`.`productversion_id` =
-             `core_productversion`.`id`) WHERE
-             (`library_caseversion`.`deleted_on` IS NULL AND
-             `library_caseversion`.`case_id` = 11 ) ORDER BY
-             `core_productversion`.`order` DESC LIMIT 1
-
-              UPDATE `library_caseversion` SET `latest` = False WHERE
-             (`library_caseversion`.`deleted_on` IS NULL AND
-             `library_caseversion`.`case_id` = 11 )
-
-              UPDATE `library_caseversion` SET `created_on` = 2012-03-07
-             19:35:34, `created_by_id` = 2, `modified_on` = 2012-03-07
-             19:35:34, `modified_by_id` = 2, `deleted_on` = NULL,
-             `deleted_by_id` = NULL, `status` = draft, `productversion_id` =
-             12, `case_id` = 11, `name` = Bar, `description` = , `latest` =
-             True, `envs_narrowed` = False WHERE `library_caseversion`.`id` =
-             11
-
-        Query 18: Check for other caseversions for the same case to sync names
-
-            SELECT `library_caseversion`.`id`, `library_caseversion`
-            .`created_on`,
-            `library_caseversion`.`created_by_id`, `library_caseversion`
-            .`modified_on`,
-            `library_caseversion`.`modified_by_id`, `library_caseversion`
-            .`deleted_on`,
-            `library_caseversion`.`deleted_by_id`, `library_caseversion`
-            .`cc_version`,
-            `library_caseversion`.`status`, `library_caseversion`
-            .`productversion_id`,
-            `library_caseversion`.`case_id`, `library_caseversion`.`name`,
-            `library_caseversion`.`description`, `library_caseversion`
-            .`latest`,
-            `library_caseversion`.`envs_narrowed` FROM `library_caseversion`
-             INNER JOIN
-            `core_productversion` ON (`library_caseversion`
-            .`productversion_id` =
-            `core_productversion`.`id`) WHERE (`library_caseversion`
-            .`deleted_on` IS
-            NULL AND `library_caseversion`.`case_id` = 2 ) ORDER BY
-            `library_caseversion`.`case_id` ASC,
-            `core_productversion`.`order` ASC
-
-        Query 19: Add the step to the second caseversion::
-
-            INSERT INTO `library_casestep` (`created_on`, `created_by_id`,
-            `modified_on`, `modified_by_id`, `deleted_on`, `deleted_by_id`,
-            `caseversion_id`, `number`, `instruction`, `expected`) VALUES
-            (2012-03-07 19:35:34, None, 2012-03-07 19:35:34, None, None, None,
-            11, 1, do this, )
-
-        Transaction: RELEASE SAVEPOINT s140735243669888_x2
-
-        Note: Django 1.4 now logs transaction points in the connection.queries
-
-        EXPECT: 19 Queries + 4 Transaction actions = 23 queries.
-
-        To re-capture this query list, use a block like this in place
-            of the "with self.assertNumQueries..." block::
-
-                from django.conf import settings
-                from django.db import connection
-                import json
-
-                settings.DEBUG = True
-                connection.queries = []
-                result = self.import_data(case_data)
-
-                print(json.dumps(connection.queries, indent=4))
-                settings.DEBUG = False
+        Two caseversions that both use the same user.  Test that import looks
+        up the user once, and creates the cases in a fixed number of queries.
+
+        Expect 12 queries for this import:
+
+        Query 1: Find existing caseversions with these names in this
+        productversion.
+
+        Query 2: Find the users for all the emails.
+
+        Queries 3-5: Create the new cases, with a unique idprefix; find their
+        ids by it; then set their real idprefix.
+
+        Queries 6-7: Create the new caseversions, and find their ids.
+
+        Query 8: Add the new steps to the caseversions.
+
+        Queries 9-12: Index the caseversions' text for keyword search: read
+        their text and their steps' text, delete old tokens, create new ones.
+
+        Note: transaction management is disabled in test cases, so there are
+        no savepoints.
 
         """
 
@@ -424,8 +196,7 @@ class ImporterTest(ImporterTestBase, case.DBTestCase):
                 ]
             }
 
-        # Test code as normal
-        with self.assertNumQueries(23):
+        with self.assertNumQueries(13):
             result = self.import_data(case_data)
 
         cv1 = self.model.CaseVersion.objects.get(name="Foo")
@@ -702,6 +473,106 @@ class ImporterTest(ImporterTestBase, case.DBTestCase):
             )
 
 
+    def test_create_caseversion_environments_latest(self):
+        """New caseversions get the productversion's envs and are latest."""
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["OS X", "Linux"]})
+        self.pv.add_envs(*envs)
+
+        self.import_data({"cases": [{"name": "Foo"}, {"name": "Bar"}]})
+
+        for cv in self.model.CaseVersion.objects.all():
+            self.assertEqual(set(cv.effective_environments), set(envs))
+            self.assertTrue(cv.latest)
+
+
+    def test_duplicate_names_in_import(self):
+        """A case with the same name as an earlier one is skipped."""
+        result = self.import_data(
+            {"cases": [{"name": "Foo"}, {"name": "foo"}]})
+
+        self.assertEqual(self.model.CaseVersion.objects.get().name, "Foo")
+        self.assertEqual(result.num_cases, 1)
+        self.assertIn(
+            ImportResult.SKIP_CASE_NAME_CONFLICT,
+            [w["reason"] for w in result.warnings],
+            )
+
+
+    def test_shared_tags_and_suites(self):
+        """Cases share the tags and suites they name, created once."""
+        result = self.import_data(
+            {
+                "cases": [
+                    {"name": "Foo", "tags": ["t1"], "suites": ["s1"]},
+                    {"name": "Bar", "tags": ["T1", "t2"], "suites": ["s1"]},
+                    ]
+                }
+            )
+
+        self.assertEqual(
+            sorted(
+                n.lower()
+                for n in self.model.Tag.objects.values_list("name", flat=True)
+                ),
+            ["t1", "t2"],
+            )
+        suite = self.model.Suite.objects.get()
+        self.assertEqual(suite.cases.count(), 2)
+        self.assertEqual(result.num_suites, 1)
+        bar = self.model.CaseVersion.objects.get(name="Bar")
+        self.assertEqual(bar.tags.count(), 2)
+
+
+    def test_search_tokens(self):
+        """Imported caseversions can be found by keyword."""
+        self.import_data(
+            {
+                "cases": [
+                    {"name": "Login", "steps": [{"instruction": "click"}]},
+                    ]
+                }
+            )
+
+        cv = self.model.CaseVersion.objects.get()
+        self.assertEqual(
+            set(self.model.SearchToken.objects.filter(
+                    caseversion=cv).values_list("token", flat=True)),
+            set(["login", "click"]),
+            )
+
+
+    def test_batches(self):
+        """With a batch size, a result is yielded for each batch."""
+        from moztrap.model.library.importer import Importer
+        results = list(
+            Importer().import_batches(
+                self.pv,
+                [{"name": "Foo"}, {"name": "Bar"}, {"name": "Baz"}],
+                [{"name": "Suite"}],
+                batch_size=2,
+                )
+            )
+
+        self.assertEqual([r.num_cases for r in results], [2, 1])
+        self.assertEqual([r.num_suites for r in results], [1, 0])
+        self.assertEqual(self.model.CaseVersion.objects.count(), 3)
+
+
+    @patch("moztrap.model.library.importer.uuid.uuid4")
+    def test_existing_case_with_marker(self, uuid4):
+        """Only cases created by the import are taken as the new ones."""
+        uuid4.return_value.hex = "marker"
+        existing = self.F.CaseFactory.create(idprefix="marker")
+
+        self.import_data({"cases": [{"name": "Foo"}]})
+
+        cv = self.model.CaseVersion.objects.get()
+        self.assertEqual(cv.name, "Foo")
+        self.assertNotEqual(cv.case, existing)
+        self.assertEqual(self.refresh(existing).idprefix, "marker")
+
+
     def test_result_object(self):
         """Successful import returns a result summary object."""
         result = self.import_data(
@@ -720,6 +591,16 @@ class ImporterTest(ImporterTestBase, case.DBTestCase):
         self.assertTrue("Imported 0 suites" in result_list)
 
 
+    def test_result_list_no_steps(self):
+        """A case without steps is listed by name in the result list."""
+        result = self.import_data({"cases": [{"name": u"Foo \u2603"}]})
+
+        self.assertEqual(
+            result.get_as_list()[0],
+            u"{0}: Foo \u2603".format(ImportResult.WARN_NO_STEPS),
+            )
+
+
 
 class ImporterTransactionTest(ImporterTestBase, case.TransactionTestCase):
     """Tests for ``Importer`` transactional behavior."""
@@ -766,7 +647,6 @@ class ImporterTransactionTest(ImporterTestBase, case.TransactionTestCase):
         self.assertEqual(self.model.CaseVersion.objects.count(), 0)
 
 
-    # @@@ This test won't work till we upgrade to Django 1.4
     def test_step_no_instruction_skip(self):
         """Skip import on case with step and no instruction."""
         result = self.import_data(
@@ -780,10 +660,8 @@ class ImporterTransactionTest(ImporterTestBase, case.TransactionTestCase):
                 }
             )
 
-        # @@@ The savepoint-rollback won't work until Django 1.4.
-        # cv = self.model.CaseVersion.objects.all()
-        # self.assertFalse(list(cv))
-        # self.assertEqual(result.num_cases, 0)
+        self.assertFalse(list(self.model.CaseVersion.objects.all()))
+        self.assertEqual(result.num_cases, 0)
         self.assertEqual(
             result.warnings[0]["reason"],
             ImportResult.SKIP_STEP_NO_INSTRUCTION,
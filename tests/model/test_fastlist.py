@@ -0,0 +1,106 @@
+"""
+Tests for FastList serializing of selection API list pages.
+
+"""
+import json
+
+from django.test import RequestFactory
+
+from tastypie.resources import ModelResource
+
+from moztrap.view.api.urls import v1_api
+
+from tests import case
+
+
+
+class SelectionCompatibilityTest(case.DBTestCase):
+    """The fast list pages are the same as Tastypie's."""
+    def setUp(self):
+        """Set up caseversions with tags and users, in suites and runs."""
+        self.user = self.F.UserFactory.create(username="somebody")
+        pv = self.F.ProductVersionFactory.create(codename="cody")
+        product_tag = self.F.TagFactory.create(product=pv.product)
+        global_tag = self.F.TagFactory.create(description="everywhere")
+        deleted_tag = self.F.TagFactory.create()
+        self.cv1 = self.F.CaseVersionFactory.create(
+            productversion=pv,
+            name="one",
+            case__priority=2,
+            created_by=self.user,
+            )
+        self.cv1.tags.add(product_tag, global_tag, deleted_tag)
+        deleted_tag.delete()
+        self.cv2 = self.F.CaseVersionFactory.create(
+            productversion=pv, name="two")
+        self.cv2.tags.add(global_tag)
+        self.suite = self.F.SuiteFactory.create(
+            product=pv.product, created_by=self.user)
+        self.F.SuiteCaseFactory.create(suite=self.suite, case=self.cv1.case)
+        self.F.SuiteFactory.create(product=pv.product)
+        self.F.RunSuiteFactory.create(
+            suite=self.suite, run__productversion=pv)
+
+
+    def assertSameList(self, resource_name, **params):
+        """Assert list pages are the same from FastList and from Tastypie."""
+        resource = v1_api.canonical_resource_for(resource_name)
+        self.assertIsNotNone(resource.fast_list)
+        request = RequestFactory().get(
+            "/api/v1/{0}/".format(resource_name), params)
+
+        fast = json.loads(resource.get_list(request).content)
+        slow = json.loads(ModelResource.get_list(resource, request).content)
+
+        self.assertTrue(slow["objects"])
+        self.maxDiff = None
+        self.assertEqual(_normalized(fast), _normalized(slow))
+
+
+    def test_caseselection(self):
+        """caseselection is compatible."""
+        self.assertSameList(
+            "caseselection", case__suites__ne=self.suite.id, order_by="name")
+
+
+    def test_caseversionselection(self):
+        """caseversionselection is compatible."""
+        self.assertSameList(
+            "caseversionselection", productversion=self.cv1.productversion.id)
+
+
+    def test_caseversionsearch(self):
+        """caseversionsearch is compatible."""
+        self.assertSameList("caseversionsearch", order_by="-modified_on")
+
+
+    def test_suiteselection(self):
+        """suiteselection is compatible."""
+        self.assertSameList("suiteselection", product=self.suite.product.id)
+
+
+    def test_paginated(self):
+        """Only the requested page is serialized."""
+        self.assertSameList(
+            "caseversionsearch", order_by="name", limit=1, offset=1)
+
+
+    def test_fixed_queries(self):
+        """Queries don't grow with the number of objects listed."""
+        resource = v1_api.canonical_resource_for("caseversionsearch")
+        request = RequestFactory().get("/api/v1/caseversionsearch/")
+        self.F.CaseVersionFactory.create_batch(3)
+
+        # count, page, tags
+        with self.assertNumQueries(3):
+            resource.get_list(request)
+
+
+
+def _normalized(data):
+    """Return list page data with lists of related objects sorted."""
+    for obj in data["objects"]:
+        for key, value in obj.items():
+            if isinstance(value, list):
+                obj[key] = sorted(value)
+    return data
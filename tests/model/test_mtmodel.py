@@ -8,6 +8,10 @@ a test-only model.
 """
 import datetime
 
+from django.db import connection
+from django.db.models.signals import post_save
+from django.test.utils import CaptureQueriesContext
+
 from mock import patch
 
 from tests import case
@@ -21,6 +25,15 @@ class MTModelTestCase(case.DBTestCase):
         self.user = self.F.UserFactory.create()
 
 
+    def step_result(self):
+        """Return a step result of a run and step of the same product."""
+        rcv = self.F.RunCaseVersionFactory.create()
+        return self.F.StepResultFactory.create(
+            result=self.F.ResultFactory.create(runcaseversion=rcv),
+            step=self.F.CaseStepFactory.create(caseversion=rcv.caseversion),
+            )
+
+
 
 class UserDeleteTest(MTModelTestCase):
     """Tests for deleting users, and the effect on MTModels."""
@@ -213,6 +226,20 @@ class SaveTest(MTModelMockNowTestCase):
         self.assertEqual(self.refresh(p).modified_by, self.user)
 
 
+    def test_update_sends_post_save(self):
+        """Saving an existing object sends post_save, with created False."""
+        p = self.model.Product.objects.create(name="Foo")
+        calls = []
+        def receiver(sender, instance, created, **kwargs):
+            calls.append((sender, instance, created))
+        post_save.connect(receiver, sender=self.model.Product)
+        self.addCleanup(post_save.disconnect, receiver)
+
+        p.save()
+
+        self.assertEqual(calls, [(self.model.Product, p, False)])
+
+
 
 class UpdateTest(MTModelMockNowTestCase):
     """Tests for modified_(by/on) when using queryset.update."""
@@ -434,6 +461,72 @@ class CascadeDeleteTest(MTModelTestCase):
 
 
 
+    def test_no_cascade_from_same_time(self):
+        """Rows deleted at the same time by others don't cascade."""
+        p1 = self.F.ProductFactory.create()
+        s1 = self.F.SuiteFactory.create(product=p1)
+        p2 = self.F.ProductFactory.create()
+        when = datetime.datetime(2011, 12, 13, 10, 23, 58)
+        # as deleted by another request, without cascading (yet)
+        self.model.Product.everything.filter(pk=p1.pk).update(
+            deleted_on=when, notrack=True)
+
+        with patch("moztrap.model.mtmodel.datetime") as mock_dt:
+            mock_dt.datetime.utcnow.return_value = when
+            p2.delete()
+
+        self.assertEqual(self.refresh(s1).deleted_on, None)
+
+
+    def test_deep_cascade(self):
+        """Cascade reaches dependents of dependents, with the same time."""
+        sr = self.step_result()
+        p = sr.result.runcaseversion.run.productversion.product
+
+        p.delete(user=self.user)
+
+        p = self.refresh(p)
+        self.assertIsNot(p.deleted_on, None)
+        for obj in [
+                sr,
+                sr.result,
+                sr.result.runcaseversion,
+                sr.result.runcaseversion.run,
+                sr.step,
+                sr.step.caseversion,
+                ]:
+            obj = self.refresh(obj)
+            self.assertEqual(obj.deleted_on, p.deleted_on)
+            self.assertEqual(obj.deleted_by, self.user)
+
+
+    def test_cascade_to_same_model(self):
+        """Deleting a series run deletes the runs in the series."""
+        series = self.F.RunFactory.create(is_series=True)
+        run = self.F.RunFactory.create(
+            series=series, productversion=series.productversion)
+
+        series.delete()
+
+        self.assertIsNot(self.refresh(run).deleted_on, None)
+
+
+    def test_queries_independent_of_dependents(self):
+        """Number of queries doesn't grow with the number of dependents."""
+        def delete_queries(num_cases):
+            s = self.F.SuiteFactory.create()
+            for i in range(num_cases):
+                self.F.SuiteCaseFactory.create(suite=s)
+            with CaptureQueriesContext(connection) as queries:
+                s.delete()
+            self.assertEqual(
+                self.model.SuiteCase.objects.filter(suite=s).count(), 0)
+            return len(queries)
+
+        self.assertEqual(delete_queries(1), delete_queries(5))
+
+
+
 class UndeleteMixin(object):
     """Utility assertions mixin for undelete tests."""
     def assertNotDeleted(self, obj):
@@ -490,6 +583,18 @@ class CascadeUndeleteTest(UndeleteMixin, MTModelTestCase):
         self.assertNotDeleted(self.refresh(s))
 
 
+    def test_deep_cascade(self):
+        """Undelete reaches dependents of dependents."""
+        sr = self.step_result()
+        p = sr.result.runcaseversion.run.productversion.product
+        p.delete()
+
+        self.refresh(p).undelete()
+
+        for obj in [sr, sr.result, sr.result.runcaseversion, sr.step]:
+            self.assertNotDeleted(self.refresh(obj))
+
+
     def test_cascade_limited(self):
         """Undelete only cascades to objs cascade-deleted with that object."""
         p = self.F.ProductFactory.create()
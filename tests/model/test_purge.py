@@ -0,0 +1,155 @@
+"""
+Tests for purging long soft-deleted rows.
+
+"""
+import datetime
+
+from mock import patch
+
+from tests import case
+
+
+
+class PurgeTestCase(case.DBTestCase):
+    """Common base class for purge tests."""
+    cutoff = datetime.datetime(2012, 1, 1)
+
+
+    def delete(self, obj, when=datetime.datetime(2011, 6, 1)):
+        """Soft-delete ``obj`` (with cascade) at time ``when``."""
+        with patch("moztrap.model.mtmodel.datetime") as mock_dt:
+            mock_dt.datetime.utcnow.return_value = when
+            obj.delete()
+
+
+    def purge(self, **kwargs):
+        """Purge rows deleted before ``self.cutoff``; return counts."""
+        from moztrap.model.purge import Purger
+        return Purger(self.cutoff, **kwargs).purge()
+
+
+    def exists(self, obj):
+        """Return True if ``obj``'s row still exists."""
+        return obj.__class__.everything.filter(pk=obj.pk).exists()
+
+
+
+class PurgerTest(PurgeTestCase):
+    """Tests for Purger."""
+    def test_purges_cascade(self):
+        """Purges a deleted row and the rows deleted along with it."""
+        sc = self.F.SuiteCaseFactory.create()
+        self.delete(sc.case.product)
+
+        counts = self.purge()
+
+        for obj in [sc, sc.suite, sc.case, sc.case.product]:
+            self.assertFalse(self.exists(obj))
+        self.assertEqual(counts["library_suitecase"], 1)
+        self.assertEqual(counts["core_product"], 1)
+
+
+    def test_purges_m2m_and_tokens(self):
+        """Purges through rows and search tokens of purged rows."""
+        cv = self.F.CaseVersionFactory.create(
+            name="Log in", environments={"OS": ["Linux"]})
+        self.delete(cv)
+
+        counts = self.purge()
+
+        self.assertFalse(self.exists(cv))
+        self.assertEqual(counts["library_caseversion_environments"], 1)
+        self.assertEqual(
+            self.model.SearchToken.objects.filter(caseversion=cv.id).count(),
+            0,
+            )
+
+
+    def test_keeps_recently_deleted(self):
+        """Rows deleted after the cutoff are kept."""
+        s = self.F.SuiteFactory.create()
+        self.delete(s, when=datetime.datetime(2012, 2, 1))
+
+        self.assertEqual(self.purge(), {})
+        self.assertTrue(self.exists(s))
+
+
+    def test_keeps_live(self):
+        """Rows not deleted are kept."""
+        s = self.F.SuiteFactory.create()
+
+        self.purge()
+
+        self.assertTrue(self.exists(s))
+
+
+    def test_keeps_referenced(self):
+        """A row still referenced by a row that isn't purged is kept."""
+        sc = self.F.SuiteCaseFactory.create()
+        self.model.Suite.everything.filter(pk=sc.suite.pk).update(
+            deleted_on=datetime.datetime(2011, 6, 1))
+
+        self.purge()
+
+        self.assertTrue(self.exists(sc.suite))
+
+
+    def test_self_reference(self):
+        """Series runs are purged after the runs of the series."""
+        series = self.F.RunFactory.create(is_series=True)
+        run = self.F.RunFactory.create(
+            series=series, productversion=series.productversion)
+        self.delete(series)
+
+        counts = self.purge(batch_size=1)
+
+        self.assertFalse(self.exists(series))
+        self.assertFalse(self.exists(run))
+        self.assertEqual(counts["execution_run"], 2)
+
+
+    def test_archive(self):
+        """Archive is called with each table's rows before deletion."""
+        s = self.F.SuiteFactory.create(name="Old suite")
+        self.delete(s)
+        archived = {}
+
+        def archive(model, rows):
+            archived.setdefault(model._meta.db_table, []).extend(rows)
+
+        self.purge(archive=archive)
+
+        self.assertEqual(
+            [r["name"] for r in archived["library_suite"]], ["Old suite"])
+
+
+    @patch("moztrap.model.purge.time.sleep")
+    def test_pause(self, sleep):
+        """Pauses after each batch."""
+        s1 = self.F.SuiteFactory.create()
+        s2 = self.F.SuiteFactory.create()
+        self.delete(s1)
+        self.delete(s2)
+
+        self.purge(batch_size=1, pause=0.5)
+
+        self.assertEqual(
+            [c[0] for c in sleep.call_args_list].count((0.5,)), 2)
+
+
+
+class PurgeOrderTest(case.TestCase):
+    """Tests for purge_order."""
+    def test_dependents_first(self):
+        """Models come after the models depending on them."""
+        from moztrap import model
+        from moztrap.model.purge import purge_order
+
+        order = purge_order()
+
+        self.assertLess(
+            order.index(model.StepResult), order.index(model.Result))
+        self.assertLess(
+            order.index(model.Result), order.index(model.RunCaseVersion))
+        self.assertLess(
+            order.index(model.CaseVersion), order.index(model.Product))
@@ -8,6 +8,7 @@ from django import template
 from django.core.exceptions import SuspiciousOperation
 
 from tests import case
+from tests.utils import Url
 
 
 
@@ -33,6 +34,33 @@ class PaginateTest(case.DBTestCase):
 
         self.assertEqual(output, "21 22 23 24 ")
 
+    def test_paginate_keyset(self):
+        """With ``keyset``, the pager seeks to the page after a token."""
+        from moztrap.model.tags.models import Tag
+
+        tpl = template.Template(
+            "{% load pagination %}{% paginate queryset as pager keyset %}"
+            "{% for obj in pager.objects %}{{ obj }} {% endfor %}")
+
+        for i in range(1, 25):
+            self.F.TagFactory.create(name=str(i))
+        qs = Tag.objects.order_by("id")
+        first = template.Context({"request": Mock(), "queryset": qs})
+        first["request"].GET = {"pagesize": 20}
+        tpl.render(first)
+
+        request = Mock()
+        request.GET = {
+            "pagesize": 20,
+            "pagenumber": 2,
+            "after": first["pager"].next_token,
+            }
+        output = tpl.render(
+            template.Context({"request": request, "queryset": qs}))
+
+        self.assertEqual(output, "21 22 23 24 ")
+
+
     def test_paginate_outsize_known_size(self):
         from moztrap.model.tags.models import Tag
 
@@ -64,6 +92,30 @@ class FilterTest(case.TestCase):
             "http://localhost/?pagenumber=1&pagesize=10")
 
 
+    def test_pagenumber_url_drops_token(self):
+        """``pagenumber_url`` filter removes any keyset page token."""
+        from moztrap.view.lists.templatetags.pagination import pagenumber_url
+        request = Mock()
+        request.get_full_path.return_value = (
+            "http://localhost/?pagenumber=2&after=abc")
+        self.assertEqual(
+            pagenumber_url(request, 1), "http://localhost/?pagenumber=1")
+
+
+    def test_next_page_url(self):
+        """``next_page_url`` sets the next page number and token."""
+        from moztrap.view.lists.templatetags.pagination import next_page_url
+        request = Mock()
+        request.get_full_path.return_value = (
+            "http://localhost/?pagenumber=2&after=abc")
+        pager = Mock()
+        pager.next = 3
+        pager.next_token = "def"
+        self.assertEqual(
+            Url(next_page_url(request, pager)),
+            Url("http://localhost/?pagenumber=3&after=def"))
+
+
     def test_pagesize_url(self):
         """``pagesize_url`` updates pagesize in URL (and jumps to page 1)."""
         from moztrap.view.lists.templatetags.pagination import pagesize_url
@@ -3,12 +3,12 @@ Tests for queryset-filtering.
 
 """
 
-from mock import Mock
+from mock import Mock, patch
 
 from django.http import QueryDict
-from django.core.cache import cache
 from django.template.response import TemplateResponse
 from django.test import RequestFactory
+from django.test.utils import override_settings
 from django.utils.datastructures import MultiValueDict
 
 from tests import case
@@ -311,6 +311,28 @@ class FilterSetTest(FiltersTestCase):
         self.assertEqual(fs.params_for(3), {})
 
 
+    def test_get(self):
+        """get returns the filter with a given key, or None."""
+        one = self.filters.Filter("one", key="first")
+        fs = self.filters.FilterSet([one, self.filters.Filter("two")])
+
+        self.assertIs(fs.get("first"), one)
+        self.assertIsNone(fs.get("one"))
+
+
+    @override_settings(FILTER_OPTIONS_LIMIT=3)
+    def test_bind_option_limit(self):
+        """``bind`` passes on the FILTER_OPTIONS_LIMIT setting."""
+        class MyBoundFilterSet(self.filters.BoundFilterSet):
+            def __init__(self, filterset, data=None, option_limit=None):
+                self.option_limit = option_limit
+
+        class MyFilterSet(self.filters.FilterSet):
+            bound_class = MyBoundFilterSet
+
+        self.assertEqual(MyFilterSet().bind().option_limit, 3)
+
+
 
 class BoundFilterSetTest(FiltersTestCase):
     """Tests for BoundFilterSet."""
@@ -501,6 +523,36 @@ class FilterTest(FiltersTestCase):
         self.assertEqual(qs2, qs.filter.return_value.filter.return_value.filter.return_value.distinct.return_value)
 
 
+    def test_conditions(self):
+        """Condition is ``self.lookup`` field value is in ``values``."""
+        f = self.filters.Filter("name", lookup="lookup")
+
+        conditions = f.conditions(["1", "2"])
+
+        self.assertEqual(
+            [q.children for q in conditions], [[("lookup__in", ["1", "2"])]])
+
+
+    def test_conditions_toggle(self):
+        """Switched to ANDed filtering, there's a condition for each value."""
+        f = self.filters.Filter("name", lookup="lookup", switchable=True)
+        f.values({"name-switch": ["on"]})
+
+        conditions = f.conditions(["1", "2"])
+
+        self.assertEqual(
+            [q.children for q in conditions],
+            [[("lookup__in", ["1"])], [("lookup__in", ["2"])]],
+            )
+
+
+    def test_no_conditions(self):
+        """No values, no conditions."""
+        f = self.filters.Filter("name")
+
+        self.assertEqual(f.conditions([]), [])
+
+
     def test_options(self):
         """Base Filter has no options."""
         f = self.filters.Filter("name")
@@ -563,8 +615,13 @@ class ModelFilterTest(FiltersTestCase):
     """Tests for ModelFilter."""
 
     def setUp(self):
+        """Patch out reading cache generations from the database."""
         super(ModelFilterTest, self).setUp()
-        cache.clear()
+        patcher = patch(
+            "moztrap.view.lists.filters.CacheGeneration.current",
+            new=Mock(return_value=(1, 0)))
+        self.current = patcher.start()
+        self.addCleanup(patcher.stop)
 
     @property
     def queryset(self):
@@ -613,6 +670,167 @@ class ModelFilterTest(FiltersTestCase):
         self.assertEqual(f.values({"name": ["1", "foo", None]}), [1])
 
 
+    def test_choices_cached(self):
+        """Choices are reused while the model's generation is unchanged."""
+        qs = self.queryset
+        f = self.filters.ModelFilter("name", queryset=qs)
+        f.get_choices()
+        qs.all.called = False
+
+        self.assertEqual(f.get_choices(), [(1, "one"), (2, "two")])
+        self.assertFalse(qs.all.called)
+        self.current.assert_called_with(qs.model)
+
+
+    def test_choices_rebuilt(self):
+        """Choices are rebuilt once the model's generation moves on."""
+        qs = self.queryset
+        f = self.filters.ModelFilter("name", queryset=qs)
+        f.get_choices()
+        qs.all.called = False
+        self.current.return_value = (2, 0)
+
+        self.assertEqual(f.get_choices(), [(1, "one"), (2, "two")])
+        self.assertTrue(qs.all.called)
+
+
+
+@override_settings(CACHE_GENERATION_TTL=60)
+class LimitedModelFilterTest(case.DBTestCase):
+    """Tests for listing and searching some of the options of a ModelFilter."""
+    @property
+    def filters(self):
+        """The module under test."""
+        from moztrap.view.lists import filters
+        return filters
+
+
+    def setUp(self):
+        """Set up a filter of tags, and tags named a to e."""
+        self.filter = self.filters.ModelFilter(
+            "tag",
+            queryset=self.model.Tag.objects.order_by("name"),
+            switchable=True)
+        self.tags = [self.F.TagFactory.create(name=n) for n in "abcde"]
+
+
+    def test_limited_options(self):
+        """Only the first options are listed; ``more`` if there are others."""
+        values, options, more = self.filter.limited_options({}, 2)
+
+        self.assertEqual(values, [])
+        self.assertEqual(
+            options, [(self.tags[0].id, u"a"), (self.tags[1].id, u"b")])
+        self.assertTrue(more)
+
+
+    def test_no_more_options(self):
+        """``more`` is False when all the options are listed."""
+        values, options, more = self.filter.limited_options({}, 5)
+
+        self.assertEqual(len(options), 5)
+        self.assertFalse(more)
+
+
+    def test_limited_options_selected(self):
+        """Valid selected options are listed too, even if not first."""
+        a, b, c, d, e = self.tags
+
+        values, options, more = self.filter.limited_options(
+            {"tag": [str(d.id), str(a.id), "foo", str(e.id + 100)]}, 2)
+
+        self.assertEqual(values, [d.id, a.id])
+        self.assertEqual(options, [(d.id, u"d"), (a.id, u"a"), (b.id, u"b")])
+
+
+    def test_limited_options_switch(self):
+        """A switchable filter is still toggled."""
+        self.filter.limited_options({"tag-switch": ["on"]}, 2)
+
+        self.assertTrue(self.filter.toggle)
+
+
+    def test_limited_options_cached(self):
+        """The first options aren't read again until the tags change."""
+        self.filter.limited_options({}, 2)
+
+        with self.assertNumQueries(0):
+            self.filter.limited_options({}, 2)
+
+        self.F.TagFactory.create(name="0")
+
+        values, options, more = self.filter.limited_options({}, 2)
+        self.assertEqual(options[0][1], u"0")
+
+
+    def test_search_options(self):
+        """Options starting with some text are found, a page at a time."""
+        bb = self.F.TagFactory.create(name="bb")
+        bc = self.F.TagFactory.create(name="bc")
+
+        self.assertEqual(
+            self.filter.search_options("B", 1, 2),
+            ([(self.tags[1].id, u"b"), (bb.id, u"bb")], True),
+            )
+        self.assertEqual(
+            self.filter.search_options("B", 2, 2), ([(bc.id, u"bc")], False))
+
+
+    def test_search_options_same_name(self):
+        """Options with the same name are paged in a stable order."""
+        first = self.F.TagFactory.create(name="bb")
+        second = self.F.TagFactory.create(name="bb")
+
+        self.assertEqual(
+            self.filter.search_options("bb", 1, 1),
+            ([(first.id, u"bb")], True),
+            )
+        self.assertEqual(
+            self.filter.search_options("bb", 2, 1),
+            ([(second.id, u"bb")], False),
+            )
+
+
+    def test_search_field(self):
+        """Search field can be given explicitly, if not ordered by it."""
+        f = self.filters.ModelFilter(
+            "tag",
+            queryset=self.model.Tag.objects.order_by("-id"),
+            search="name",
+            )
+
+        self.assertEqual(
+            f.search_options("c", 1, 2), ([(self.tags[2].id, u"c")], False))
+
+
+    def test_unordered_not_searchable(self):
+        """Without a search field or ordering, options can't be searched."""
+        f = self.filters.ModelFilter(
+            "tag", queryset=self.model.Tag.objects.all())
+
+        self.assertFalse(f.searchable)
+        self.assertTrue(self.filter.searchable)
+
+
+    def test_bound_filter(self):
+        """BoundFilter with an option limit lists limited options."""
+        bf = self.filters.BoundFilter(
+            self.filter, {"tag": [str(self.tags[4].id)]}, 1)
+
+        self.assertEqual(
+            [(o.label, o.selected) for o in bf], [(u"e", True), (u"a", False)])
+        self.assertEqual(bf.values, [self.tags[4].id])
+        self.assertTrue(bf.more)
+
+
+    def test_bound_filter_unlimited(self):
+        """BoundFilter without an option limit lists all options."""
+        bf = self.filters.BoundFilter(self.filter, {})
+
+        self.assertEqual(len(bf), 5)
+        self.assertFalse(bf.more)
+
+
 
 class KeywordExactFilterTest(FiltersTestCase):
     """Tests for KeywordExactFilter."""
@@ -651,6 +869,83 @@ class KeywordFilterTest(FiltersTestCase):
 
 
 
+class SemijoinTest(FiltersTestCase):
+    """Tests for semijoin function."""
+    def semijoin(self, model, q):
+        """Plan filtering ``model`` by ``q``."""
+        return self.filters.semijoin(model, q)
+
+
+    def test_to_one(self):
+        """Conditions not crossing a to-many relation are unchanged."""
+        from moztrap.model import CaseVersion
+        q = self.filters.Q(case__priority__in=[1], name="foo")
+
+        self.assertEqual(self.semijoin(CaseVersion, q), (q, False))
+
+
+    def test_many_to_many(self):
+        """A many-to-many condition is a subquery on the through table."""
+        from moztrap.model import CaseVersion
+
+        q, joined = self.semijoin(
+            CaseVersion, self.filters.Q(tags__name__in=["a"]))
+
+        self.assertFalse(joined)
+        [(lookup, subquery)] = q.children
+        self.assertEqual(lookup, "pk__in")
+        self.assertIs(subquery.model, CaseVersion.tags.through)
+
+
+    def test_reverse_foreign_key(self):
+        """A reverse foreign key condition is a subquery on the related table."""
+        from moztrap.model import RunCaseVersion, CaseStep
+
+        q, joined = self.semijoin(
+            RunCaseVersion,
+            self.filters.Q(caseversion__steps__instruction__icontains="a"),
+            )
+
+        self.assertFalse(joined)
+        [(lookup, subquery)] = q.children
+        self.assertEqual(lookup, "caseversion__in")
+        self.assertIs(subquery.model, CaseStep)
+
+
+    def test_ored(self):
+        """ORed conditions on different relations get their own subqueries."""
+        from moztrap.model import CaseVersion
+
+        q, joined = self.semijoin(
+            CaseVersion,
+            self.filters.Q(tags__in=[1]) | self.filters.Q(steps__number=2),
+            )
+
+        self.assertFalse(joined)
+        self.assertEqual(q.connector, "OR")
+        self.assertEqual([c[0] for c in q.children], ["pk__in", "pk__in"])
+
+
+    def test_mixed(self):
+        """Conditions not crossing the relation stay out of its subquery."""
+        from moztrap.model import CaseVersion
+
+        q, joined = self.semijoin(
+            CaseVersion, self.filters.Q(name="foo", tags__in=[1]))
+
+        self.assertFalse(joined)
+        self.assertEqual(sorted(c[0] for c in q.children), ["name", "pk__in"])
+
+
+    def test_negated(self):
+        """Negated to-many conditions are left joined."""
+        from moztrap.model import CaseVersion
+        q = ~self.filters.Q(tags__in=[1])
+
+        self.assertEqual(self.semijoin(CaseVersion, q), (q, True))
+
+
+
 class PinnedFilterTest(FiltersTestCase):
     """Tests for pinned filters"""
 
@@ -355,6 +355,179 @@ class TestPager(case.DBTestCase):
 
 
 
+class TestCappedCount(case.DBTestCase):
+    """Tests for ``Pager`` with a capped count."""
+    def setUp(self):
+        """Create five products."""
+        for i in range(1, 6):
+            self.F.ProductFactory.create(name="Product {0}".format(i))
+        self.qs = self.model.Product.objects.all()
+
+
+    def pager(self, pagenumber, count_cap):
+        """Return a pager with page size 2 for the products."""
+        from moztrap.view.lists.pagination import Pager
+        return Pager(self.qs, 2, pagenumber, count_cap=count_cap)
+
+
+    def test_capped(self):
+        """Counts no more than the cap, and flags that there are more."""
+        p = self.pager(1, 3)
+
+        self.assertEqual(p.total, 3)
+        self.assertTrue(p.total_capped)
+        self.assertEqual(p.next, 2)
+
+
+    def test_not_capped(self):
+        """If there aren't more than the cap, the count is exact."""
+        p = self.pager(1, 5)
+
+        self.assertEqual(p.total, 5)
+        self.assertFalse(p.total_capped)
+
+
+    def test_counts_from_page(self):
+        """The cap applies from the start of the current page."""
+        p = self.pager(2, 3)
+
+        self.assertEqual(p.total, 5)
+        self.assertFalse(p.total_capped)
+        self.assertEqual(list(p.objects), list(self.qs[2:4]))
+
+
+    def test_past_end(self):
+        """Past the last page, the total is still correct."""
+        p = self.pager(5, 3)
+
+        self.assertEqual(p.total, 5)
+        self.assertFalse(p.total_capped)
+
+
+
+class TestKeysetPager(case.DBTestCase):
+    """Tests for ``Pager`` in keyset mode."""
+    def pager(self, queryset, pagenumber=1, after=None, **kwargs):
+        """Return a keyset pager with page size 2."""
+        from moztrap.view.lists.pagination import Pager
+        return Pager(
+            queryset, 2, pagenumber, keyset=True, after=after, **kwargs)
+
+
+    def tags(self, *names):
+        """Create tags with given names; return queryset ordered by name."""
+        for name in names:
+            self.F.TagFactory.create(name=name)
+        return self.model.Tag.objects.order_by("name")
+
+
+    def test_first_page(self):
+        """Without a token, shows the first page."""
+        qs = self.tags("a", "b", "c")
+
+        p = self.pager(qs)
+
+        self.assertTrue(p.keyset)
+        self.assertEqual([t.name for t in p.objects], ["a", "b"])
+        self.assertEqual((p.low, p.high, p.total), (1, 2, 3))
+        self.assertEqual(p.next, 2)
+        self.assertIsNotNone(p.next_token)
+
+
+    def test_next_page(self):
+        """With the first page's token, shows the second page."""
+        qs = self.tags("a", "b", "c")
+
+        p = self.pager(qs, 2, self.pager(qs).next_token)
+
+        self.assertEqual([t.name for t in p.objects], ["c"])
+        self.assertEqual((p.low, p.high, p.total), (3, 3, 3))
+        self.assertEqual(p.prev, 1)
+        self.assertEqual(p.next, None)
+        self.assertEqual(p.next_token, None)
+
+
+    def test_ties(self):
+        """Objects with the same sort key are split between pages by id."""
+        qs = self.tags("b", "a", "b", "c")
+        b1, b2 = qs.filter(name="b").order_by("id")
+
+        first = self.pager(qs)
+        second = self.pager(qs, 2, first.next_token)
+
+        self.assertEqual([t.name for t in first.objects], ["a", "b"])
+        self.assertEqual(list(first.objects)[1], b1)
+        self.assertEqual([t.name for t in second.objects], ["b", "c"])
+        self.assertEqual(list(second.objects)[0], b2)
+
+
+    def test_descending(self):
+        """Descending sorts seek backwards."""
+        qs = self.tags("a", "b", "c").reverse()
+
+        p = self.pager(qs, 2, self.pager(qs).next_token)
+
+        self.assertEqual([t.name for t in p.objects], ["a"])
+
+
+    def test_sort_changed(self):
+        """A token for a different sort starts again at the first page."""
+        qs = self.tags("a", "b", "c")
+
+        p = self.pager(qs.reverse(), 2, self.pager(qs).next_token)
+
+        self.assertEqual(p.pagenumber, 1)
+        self.assertEqual([t.name for t in p.objects], ["c", "b"])
+
+
+    def test_bad_token(self):
+        """A garbled token starts again at the first page."""
+        qs = self.tags("a", "b", "c")
+
+        p = self.pager(qs, 2, "garbage")
+
+        self.assertEqual(p.pagenumber, 1)
+        self.assertEqual([t.name for t in p.objects], ["a", "b"])
+
+
+    def test_capped(self):
+        """Keyset mode can also cap the count."""
+        qs = self.tags("a", "b", "c", "d", "e")
+
+        p = self.pager(qs, 2, self.pager(qs).next_token, count_cap=2)
+
+        self.assertEqual(p.total, 4)
+        self.assertTrue(p.total_capped)
+        self.assertEqual(p.next, 3)
+
+
+    def test_unsupported_ordering(self):
+        """Falls back to offset pagination if ordering can't be seeked on."""
+        qs = self.tags("a", "b", "c").extra(
+            select={"rev": "-id"}).order_by("rev")
+
+        p = self.pager(qs, 2)
+
+        self.assertFalse(p.keyset)
+        self.assertEqual([t.name for t in p.objects], ["a"])
+
+
+    def test_ordering_expands_relations(self):
+        """Ordering by a relation seeks on the related model's ordering."""
+        from moztrap.view.lists.pagination import keyset_ordering
+
+        self.assertEqual(
+            keyset_ordering(
+                self.model.ProductVersion.objects.order_by("-product")),
+            [("product__name", True), ("id", False)],
+            )
+        self.assertEqual(
+            keyset_ordering(self.model.ProductVersion.objects.all()),
+            [("product__name", False), ("order", False), ("id", False)],
+            )
+
+
+
 class TestPositiveInteger(case.TestCase):
     """Tests for ``positive_integer`` function."""
     @property
@@ -140,4 +140,4 @@ class PopulateProductVersionEnvsFormTest(case.DBTestCase):
 
         self.assertEqual(pv, self.pv)
         self.assertEqual(
-            [unicode(e) for e in cv.environments.all()], [u"Windows"])
+            [unicode(e) for e in cv.effective_environments], [u"Windows"])
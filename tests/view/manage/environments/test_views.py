@@ -687,7 +687,7 @@ class EditProductVersionEnvironmentsViewTest(case.view.FormViewTestCase,
             headers={"X-Requested-With": "XMLHttpRequest"}
             )
 
-        self.assertEqual(cv.environments.count(), 0)
+        self.assertEqual(cv.effective_environments.count(), 0)
 
 
     def test_manage_products_permission_required(self):
@@ -758,7 +758,7 @@ class EditProductVersionEnvironmentsViewTest(case.view.FormViewTestCase,
             )
 
         env = self.productversion.environments.get()
-        self.assertEqual(cv.environments.get(), env)
+        self.assertEqual(cv.effective_environments.get(), env)
 
 
     def test_no_elements(self):
@@ -1076,5 +1076,25 @@ class NarrowCaseVersionEnvironmentsTest(NarrowEnvironmentsViewTests,
 
     @property
     def factory(self):
-        """CaseVersion factory."""
-        return self.F.CaseVersionFactory
+        """Narrowed CaseVersion factory (so it has its own environments)."""
+        return lambda: self.F.CaseVersionFactory(envs_narrowed=True)
+
+
+    def test_narrow_inherited(self):
+        """Narrowing an inheriting caseversion copies the remaining envs."""
+        self.add_perm(self.perm)
+        envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["Linux", "Windows"]})
+        cv = self.F.CaseVersionFactory.create()
+        cv.productversion.environments.add(*envs)
+        self.object = cv
+
+        form = self.get_form()
+        for field in form.fields["environments"]:
+            if field.value != str(envs[1].id):
+                field.value = None
+        form.submit(status=302)
+
+        cv = self.refresh(cv)
+        self.assertTrue(cv.envs_narrowed)
+        self.assertEqual(cv.environments.get(), envs[1])
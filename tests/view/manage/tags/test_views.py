@@ -77,6 +77,22 @@ class TagsTest(case.view.manage.ListViewTestCase,
         self.assertNotInList(res, "Foo 2")
 
 
+    def test_search_filter_options(self):
+        """Options of a filter can be searched by the start of their label."""
+        p = self.F.ProductFactory.create(name="Alpha")
+        self.F.ProductFactory.create(name="Beta")
+
+        res = self.get(params={"filteroptions": "product", "text": "al"})
+
+        self.assertEqual(
+            res.json, {"options": [["Alpha", p.id]], "more": False})
+
+
+    def test_search_filter_options_bad_key(self):
+        """Searching options of a nonexistent filter is a 404."""
+        self.get(params={"filteroptions": "foo"}, status=404)
+
+
     def test_sort_by_product(self):
         """Can sort by product."""
         pb = self.F.ProductFactory.create(name="B")
@@ -20,13 +20,149 @@ class CaseVersionFilterSetTest(case.DBTestCase):
 
     def test_filtered_by_productversion(self):
         """If filtered by productversion, doesn't filter by latest=True."""
-        pv = self.F.ProductVersionFactory.create()
+        pv = self.F.ProductVersionFactory.create(version="1")
+        cv = self.F.CaseVersionFactory.create(productversion=pv)
+        self.F.CaseVersionFactory.create(
+            case=cv.case,
+            productversion=self.F.ProductVersionFactory.create(
+                product=pv.product, version="2"),
+            )
+        self.F.CaseVersionFactory.create()
 
         fs = self.bound(MultiValueDict({"filter-productversion": [str(pv.id)]}))
 
-        qs = Mock()
-        qs2 = fs.filter(qs)
+        qs = fs.filter(self.model.CaseVersion.objects.all())
 
-        qs.filter.assert_called_with(productversion__in=[pv.id])
-        # no other filters intervening
-        self.assertIs(qs2, qs.filter.return_value.distinct.return_value)
+        self.assertEqual(list(qs), [cv])
+        # no to-many relation to join, so no need for distinct
+        self.assertFalse(qs.query.distinct)
+
+
+
+class RunCaseVersionFilterSetTest(case.DBTestCase):
+    """Tests for RunCaseVersionFilterSet."""
+    def setUp(self):
+        """Set up runcaseversions with tags, steps, and results."""
+        self.envs = self.F.EnvironmentFactory.create_full_set(
+            {"OS": ["OS X", "Linux"]})
+        self.elements = [e.elements.get() for e in self.envs]
+        pv = self.F.ProductVersionFactory.create(environments=self.envs)
+        run = self.F.RunFactory.create(productversion=pv)
+        self.rcvs = [
+            self.F.RunCaseVersionFactory.create(
+                run=run, environments=self.envs) for i in range(4)]
+        self.tags = [self.F.TagFactory.create(name=n) for n in ["a", "b"]]
+        self.users = [self.F.UserFactory.create() for i in range(2)]
+
+        self.rcvs[0].caseversion.tags.add(*self.tags)
+        self.rcvs[1].caseversion.tags.add(self.tags[0])
+        self.rcvs[2].caseversion.tags.add(self.tags[1])
+        for rcv in self.rcvs[:3]:
+            self.F.CaseStepFactory.create(
+                caseversion=rcv.caseversion, instruction="click it")
+            self.F.CaseStepFactory.create(
+                caseversion=rcv.caseversion, instruction="click again")
+        self.result(0, 0, 0, "passed")
+        self.result(0, 1, 0, "failed")
+        self.result(1, 1, 0, "failed")
+        self.result(2, 0, 0, "passed")
+        self.result(2, 0, 1, "passed")
+        self.result(2, 1, 1, "passed")
+
+
+    def result(self, rcv, env, tester, status):
+        """Create a result for rcv, env and tester (given by index)."""
+        self.F.ResultFactory.create(
+            runcaseversion=self.rcvs[rcv],
+            environment=self.envs[env],
+            tester=self.users[tester],
+            status=status,
+            )
+
+
+    def filtered(self, GET):
+        """
+        Return (planned, joined) querysets filtered by ``GET``.
+
+        ``planned`` is filtered by the filter set; ``joined`` by each filter
+        in turn, joining any to-many relations.
+
+        """
+        from moztrap.view.filters import RunCaseVersionFilterSet
+        bfs = RunCaseVersionFilterSet().bind(MultiValueDict(GET))
+        qs = self.model.RunCaseVersion.objects.all()
+        joined = qs
+        for boundfilter in bfs:
+            joined = boundfilter.filter(joined)
+        return bfs.filter(qs), joined
+
+
+    def assertSamePlans(self, GET, expected):
+        """Assert both plans give the ``expected`` rcvs (by index)."""
+        planned, joined = self.filtered(GET)
+        expected_ids = sorted(self.rcvs[i].id for i in expected)
+
+        self.assertEqual(sorted(r.id for r in joined), expected_ids)
+        self.assertEqual(sorted(r.id for r in planned), expected_ids)
+        self.assertFalse(planned.query.distinct)
+
+
+    def test_tags(self):
+        """Tags are ORed."""
+        self.assertSamePlans(
+            {"filter-tag": [str(t.id) for t in self.tags]}, [0, 1, 2])
+
+
+    def test_tags_switched(self):
+        """Switched, tags are ANDed, each on its own related row."""
+        self.assertSamePlans(
+            {
+                "filter-tag": [str(t.id) for t in self.tags],
+                "filter-tag-switch": ["on"],
+                },
+            [0],
+            )
+
+
+    def test_keywords(self):
+        """Keywords are ANDed, matching the starts of words in any step."""
+        self.assertSamePlans(
+            {"filter-instruction": ["click", "it"]}, [0, 1, 2])
+        self.assertSamePlans(
+            {"filter-instruction": ["it", "again"]}, [0, 1, 2])
+        self.assertSamePlans({"filter-instruction": ["lick"]}, [])
+
+
+    def test_keywords_switched(self):
+        """Switched, keywords are ORed."""
+        self.assertSamePlans(
+            {
+                "filter-name": ["nope", "test"],
+                "filter-name-switch": ["on"],
+                },
+            [0, 1, 2, 3],
+            )
+
+
+    def test_combined(self):
+        """Filters on different to-many relations are all applied."""
+        self.assertSamePlans(
+            {
+                "filter-tag": [str(self.tags[0].id)],
+                "filter-resultstatus": ["failed"],
+                "filter-envelement": [str(self.elements[1].id)],
+                "filter-instruction": ["click"],
+                "filter-tester": [str(self.users[0].id)],
+                "filter-name": [self.rcvs[1].caseversion.name],
+                },
+            [0, 1],
+            )
+        self.assertSamePlans(
+            {
+                "filter-resultstatus": ["passed"],
+                "filter-tester": [str(self.users[1].id)],
+                "filter-envelement": [str(e.id) for e in self.elements],
+                "filter-envelement-switch": ["on"],
+                },
+            [2],
+            )
@@ -76,8 +76,8 @@ class ResultForTest(case.DBTestCase):
         self.assertEqual(self.model.Result.objects.count(), 2)
 
 
-    def test_dupe_latest_results_sets_non_latest_to_false(self):
-        """If dupe latest results exists, keep the last-modified."""
+    def test_dupe_latest_flags_finds_latest(self):
+        """A stray is_latest flag doesn't hide the actual latest result."""
 
         with mock.patch("moztrap.model.mtmodel.utcnow") as mock_utcnow:
             mock_utcnow.return_value = datetime.datetime(2012, 3, 24)
@@ -92,9 +92,8 @@ class ResultForTest(case.DBTestCase):
                 status="passed",
                 )
 
-            # manually set a non-latest result to is_latest=True
-            # since res1 has already been saved, and has a pk assigned,
-            # it will not try to set all the other results to NOT latest.
+            # manually set a non-latest result to is_latest=True; the
+            # latest result pointer still points to res2.
             mock_utcnow.return_value = datetime.datetime(2012, 3, 24)
             self.model.Result.objects.filter(pk=res1.pk).update(
                 is_latest=True,
@@ -107,8 +106,18 @@ class ResultForTest(case.DBTestCase):
                 "{{ result.id }}",
                 ), str(res2.id))
         self.assertEqual(self.model.Result.objects.count(), 2)
+
+
+    def test_deleted_latest_result(self):
+        """If the latest result is deleted, a new unsaved one is returned."""
+        r = self.F.ResultFactory()
+        r.delete()
+
         self.assertEqual(
-            self.model.Result.objects.get(is_latest=True).pk, res2.pk)
+            self.result_for(
+                r.runcaseversion, r.tester, r.environment, "{{ result.id }}"),
+            "None",
+            )
 
 
     def test_result_does_not_exist(self):
@@ -129,6 +138,75 @@ class ResultForTest(case.DBTestCase):
 
 
 
+class PrefetchResultsTest(case.DBTestCase):
+    """Tests for the prefetch_results template tag."""
+    def render(self, rcvs, user, env, steps):
+        """Render all result tags for ``rcvs`` after prefetching."""
+        t = Template(
+            "{% load execution %}"
+            "{% prefetch_results rcvs user env %}"
+            "{% for rcv in rcvs %}"
+            "{% result_for rcv user env as result %}"
+            "{% other_result_for rcv user env as other %}"
+            "{{ rcv.id }}:{{ result.status }}:{{ other.tester.username }}"
+            "{% for step in steps %}"
+            "{% stepresult_for result step as stepresult %}"
+            ":{{ stepresult.status }}"
+            "{% endfor %} "
+            "{% endfor %}"
+            )
+        return t.render(
+            Context({"rcvs": rcvs, "user": user, "env": env, "steps": steps}))
+
+
+    def test_fixed_queries(self):
+        """All results for the page are loaded in three queries."""
+        env = self.F.EnvironmentFactory.create()
+        user = self.F.UserFactory.create()
+        other = self.F.UserFactory.create(username="other")
+        rcv1 = self.F.RunCaseVersionFactory.create()
+        rcv2 = self.F.RunCaseVersionFactory.create(run=rcv1.run)
+        step = self.F.CaseStepFactory.create(caseversion=rcv1.caseversion)
+        r = self.F.ResultFactory.create(
+            runcaseversion=rcv1, tester=user, environment=env,
+            status="failed")
+        self.F.StepResultFactory.create(result=r, step=step, status="failed")
+        self.F.ResultFactory.create(
+            runcaseversion=rcv2, tester=other, environment=env,
+            status="passed")
+
+        with self.assertNumQueries(3):
+            output = self.render([rcv1, rcv2], user, env, [step])
+
+        self.assertEqual(
+            output,
+            "{0}:failed::failed {1}:assigned:other:passed ".format(
+                rcv1.id, rcv2.id),
+            )
+
+
+    def test_not_covered(self):
+        """Tags for runcaseversions not prefetched still query for them."""
+        r = self.F.ResultFactory.create(status="passed")
+        t = Template(
+            "{% load execution %}"
+            "{% prefetch_results rcvs user env %}"
+            "{% result_for rcv user env as result %}{{ result.id }}"
+            )
+
+        output = t.render(
+            Context({
+                    "rcvs": [],
+                    "rcv": r.runcaseversion,
+                    "user": r.tester,
+                    "env": r.environment,
+                    })
+            )
+
+        self.assertEqual(output, str(r.id))
+
+
+
 class StepResultForTest(case.DBTestCase):
     """Tests for the step_result_for template tag."""
     def result_for(self, result, step, render):
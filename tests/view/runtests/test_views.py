@@ -343,6 +343,17 @@ class RunTestsTest(case.view.ListViewTestCase,
         res.follow().mustcontain("not open for testing")
 
 
+    def test_locking_run_redirects_to_selector(self):
+        """A run still being locked in redirects to run selector."""
+        self.testrun.is_locking = True
+        self.testrun.save()
+
+        res = self.get(status=302)
+
+        self.assertRedirects(res, reverse("runtests"))
+        res.follow().mustcontain("still being prepared")
+
+
     def test_invalid_environment_set(self):
         """If env is not valid for run, redirects to set-environment."""
         self.testrun.environments.remove(self.envs[0])
@@ -489,6 +500,23 @@ class RunTestsTest(case.view.ListViewTestCase,
         self.assertOrderInList(res, "t1", "t2")
 
 
+    def test_sort_by_status_newest_completed(self):
+        """Sorts by the newest completed latest result of any tester."""
+        user2 = self.F.UserFactory()
+        t1 = self.create_rcv(caseversion__name="t1")
+        t2 = self.create_rcv(caseversion__name="t2")
+        self.create_result(runcaseversion=t1, status="failed")
+        self.create_result(runcaseversion=t1, status="passed", tester=user2)
+        self.create_result(runcaseversion=t2, status="invalidated")
+        # a newer pending result doesn't hide the completed ones
+        self.create_result(runcaseversion=t2, status="started", tester=user2)
+
+        res = self.get(
+            params={"sortfield": "current_result", "sortdirection": "asc"})
+
+        self.assertOrderInList(res, "t2", "t1")
+
+
     def test_description(self):
         """Returns details HTML snippet for given caseversion"""
 
@@ -38,6 +38,12 @@ class TestUpdateQueryString(case.TestCase):
             "http://fake.base/")
 
 
+    def test_override_none_missing(self):
+        self.assertEqual(
+            self.func("http://fake.base/?arg=yo", blah=None),
+            "http://fake.base/?arg=yo")
+
+
     def test_basic_with_existing(self):
         self.assertEqual(
             self.func("http://fake.base/?arg=yo", blah="foo"),